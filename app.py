@@ -2,6 +2,7 @@ from flask import Flask
 from routes.offer import offer_bp
 from routes.leads import leads_bp
 from routes.score import score_bp
+from routes.metrics import metrics_bp
 import os
 
 app = Flask(__name__)
@@ -10,6 +11,7 @@ app = Flask(__name__)
 app.register_blueprint(offer_bp, url_prefix="/")
 app.register_blueprint(leads_bp, url_prefix="/")
 app.register_blueprint(score_bp, url_prefix="/")
+app.register_blueprint(metrics_bp, url_prefix="/")
 
 @app.route("/", methods=["GET"])
 def health_check():
@@ -0,0 +1,63 @@
+"""
+Wall-clock comparison of sequential vs bounded-concurrency scoring.
+
+Simulates Vertex latency by swapping the HTTP call for a sleep, so it can run
+without credentials:
+
+    python -m benchmarks.bench_concurrency --leads 200 --latency 0.05 --workers 1 4 8 16
+"""
+
+import argparse
+import csv
+import json
+import time
+
+import services.ai as ai
+from services.scoring import timed_score_leads
+
+SAMPLE_OFFER = {
+    "name": "AI Outreach Automation",
+    "value_props": ["24/7 outreach", "6x more meetings"],
+    "ideal_use_cases": ["B2B SaaS mid-market"]
+}
+
+
+def _load_sample_leads(path, count):
+    with open(path, newline="", encoding="utf-8") as f:
+        base = list(csv.DictReader(f))
+    return [dict(base[i % len(base)]) for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per AI call")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--csv", default="sample_leads.csv")
+    args = parser.parse_args()
+
+    def fake_vertex(prompt):
+        time.sleep(args.latency)
+        return {"predictions": [{"content": "Medium - simulated response."}]}
+
+    ai.AI_PROVIDER = "vertex_api_key"
+    ai._call_vertex_api_key = fake_vertex
+
+    leads = _load_sample_leads(args.csv, args.leads)
+    baseline_results, baseline = timed_score_leads(leads, SAMPLE_OFFER, max_workers=1)
+
+    report = []
+    for workers in args.workers:
+        results, elapsed = timed_score_leads(leads, SAMPLE_OFFER, max_workers=workers)
+        assert results == baseline_results, "concurrent results differ from sequential path"
+        report.append({
+            "max_workers": workers,
+            "elapsed_seconds": round(elapsed, 3),
+            "speedup": round(baseline / elapsed, 2) if elapsed else None
+        })
+
+    print(json.dumps({"leads": args.leads, "latency": args.latency, "runs": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Memory of leads + results, list of dicts vs LeadStore/ResultStore.
+
+    python -m benchmarks.bench_lead_store --rows 1000000
+"""
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from utils.lead_store import LeadStore, ResultStore
+
+ROLES = ["CEO", "Head of Growth", "Marketing Manager", "Software Engineer", "Intern",
+         "VP Sales", "Senior Analyst", "Account Executive", "Director of Ops", "Founder"]
+INDUSTRIES = ["SaaS", "B2B SaaS", "Technology", "Retail", "Healthcare", "Fintech"]
+LOCATIONS = ["Austin USA", "Bengaluru India", "London UK", "Berlin Germany", "Toronto Canada"]
+REASONINGS = ["Senior decision-maker role detected.", "No strong signals in role, industry or bio.",
+              "Relevant role, but not a confirmed decision-maker."]
+
+
+def _rows(count, seed):
+    # Strings are built per row like csv.DictReader does, so nothing is shared by accident
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": f"Lead {i}", "role": "".join(rng.choice(ROLES)), "company": f"Company {i}",
+            "industry": "".join(rng.choice(INDUSTRIES)), "location": "".join(rng.choice(LOCATIONS)),
+            "linkedin_bio": f"Profile {i}: growth leader scaling outbound teams."
+        }
+
+
+def _result(lead, i):
+    return {"intent": "High", "score": 50 + i % 50, "reasoning": "".join(REASONINGS[i % 3])}
+
+
+def _dict_layout(rows, seed):
+    leads = list(_rows(rows, seed))
+    results = []
+    for i, lead in enumerate(leads):
+        result = {"name": lead.get("name", ""), "role": lead.get("role", ""), "company": lead.get("company", "")}
+        result.update(_result(lead, i))
+        results.append(result)
+    return leads, results
+
+
+def _store_layout(rows, seed):
+    leads = LeadStore()
+    leads.extend(_rows(rows, seed))
+    results = ResultStore(leads)
+    results.extend(_result(lead, i) for i, lead in enumerate(leads))
+    return leads, results
+
+
+def _measure(build, rows, seed):
+    gc.collect()
+    tracemalloc.start()
+    data = build(rows, seed)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    dict_retained, dict_peak = _measure(_dict_layout, args.rows, args.seed)
+    store_retained, store_peak = _measure(_store_layout, args.rows, args.seed)
+    print(json.dumps({
+        "rows": args.rows,
+        "list_of_dicts_bytes": dict_retained,
+        "lead_store_bytes": store_retained,
+        "list_of_dicts_peak_bytes": dict_peak,
+        "lead_store_peak_bytes": store_peak,
+        "reduction": round(dict_retained / store_retained, 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
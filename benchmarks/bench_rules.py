@@ -0,0 +1,66 @@
+"""
+Per-lead calculate_rule_score vs the per-offer compiled RuleScorer vs the
+vectorised calculate_rule_scores_batch.
+
+    python -m benchmarks.bench_rules --leads 100000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from services.rules import RuleScorer, calculate_rule_score, calculate_rule_scores_batch
+
+ROLES = ["CEO", "Head of Growth", "Marketing Manager", "Software Engineer", "Intern",
+         "VP Sales", "Senior Analyst", "Account Executive", "Director of Ops", "Founder"]
+INDUSTRIES = ["SaaS", "B2B SaaS", "Technology", "Retail", "Healthcare", "Fintech",
+              "Manufacturing", "Software", "Education", "Logistics"]
+
+OFFER = {
+    "name": "AI Outreach Automation",
+    "value_props": ["24/7 outreach", "6x more meetings"],
+    "ideal_use_cases": ["B2B SaaS mid-market", "Revenue operations teams", "Outbound sales"]
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    leads = [{
+        "name": f"Lead {i}", "role": rng.choice(ROLES), "company": f"Co {i}",
+        "industry": rng.choice(INDUSTRIES), "location": rng.choice(["Austin", ""]),
+        "linkedin_bio": "bio"
+    } for i in range(args.leads)]
+
+    started = time.perf_counter()
+    scalar = [calculate_rule_score(lead, OFFER) for lead in leads]
+    scalar_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scorer = RuleScorer(OFFER)
+    compiled = [scorer.score(lead) for lead in leads]
+    compiled_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = calculate_rule_scores_batch(leads, OFFER).tolist()
+    batch_elapsed = time.perf_counter() - started
+
+    assert scalar == compiled, "compiled scores differ from calculate_rule_score"
+    assert scalar == batched, "batch scores differ from calculate_rule_score"
+    print(json.dumps({
+        "leads": args.leads,
+        "calculate_rule_score_seconds": round(scalar_elapsed, 3),
+        "rule_scorer_seconds": round(compiled_elapsed, 3),
+        "batch_seconds": round(batch_elapsed, 3),
+        "rule_scorer_speedup": round(scalar_elapsed / compiled_elapsed, 2),
+        "batch_speedup": round(scalar_elapsed / batch_elapsed, 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Restart time-to-ready of the memory backend: mapped snapshot vs a JSON dump.
+
+Both hold the same offer, leads and results (with their scoring inputs).
+"Ready" means the first page of GET /results?sort=-score&limit=50 is built.
+
+    python -m benchmarks.bench_snapshot --rows 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+from array import array
+
+from benchmarks.bench_lead_store import _result, _rows
+from utils.lead_store import DEDUPE_MODES, LeadStore, ResultStore
+from utils.storage import MemoryStorage
+
+OFFER = {"name": "AI Outreach Automation", "ideal_use_cases": ["B2B SaaS mid-market"]}
+PAGE = dict(sort="-score", limit=50)
+
+
+def _build(rows, seed):
+    leads = LeadStore(dedupe_fields=DEDUPE_MODES["name_company"])
+    leads.extend(_rows(rows, seed))
+    results = ResultStore(leads)
+    results.extend(_result(lead, i) for i, lead in enumerate(leads))
+    results.inputs.rules_fingerprint, results.inputs.ai_fingerprint = "rules", "ai"
+    for i in range(rows):
+        results.inputs.append(i * 2654435761 % 2 ** 64, 40)
+    return leads, results
+
+
+def _write_json(path, leads, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "offer": OFFER,
+            "leads": [dict(lead) for lead in leads],
+            "results": [dict(result) for result in results],
+            "inputs": [results.inputs.rules_fingerprint, results.inputs.ai_fingerprint,
+                       list(results.inputs.fingerprints), list(results.inputs.rule_scores)],
+        }, f)
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    leads = LeadStore(dedupe_fields=DEDUPE_MODES["name_company"])
+    leads.extend(data["leads"])
+    results = ResultStore(leads)
+    results.extend(data["results"])
+    rules_fingerprint, ai_fingerprint, fingerprints, rule_scores = data["inputs"]
+    results.inputs.rules_fingerprint, results.inputs.ai_fingerprint = rules_fingerprint, ai_fingerprint
+    results.inputs.fingerprints = array("Q", fingerprints)
+    results.inputs.rule_scores = array("H", rule_scores)
+    return results.query(**PAGE)
+
+
+def _load_snapshot(directory):
+    storage = MemoryStorage(directory)
+    return storage["results"].query(**PAGE)
+
+
+def _timed(call):
+    gc.collect()
+    started = time.perf_counter()
+    page = call()
+    return time.perf_counter() - started, page
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    leads, results = _build(args.rows, args.seed)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "storage.json")
+        json_write, _ = _timed(lambda: _write_json(json_path, leads, results))
+
+        snapshot_dir = os.path.join(tmpdir, "snapshot")
+        storage = MemoryStorage(snapshot_dir)
+        started = time.perf_counter()
+        storage["offer"] = OFFER
+        storage["leads"] = leads
+        storage["results"] = results
+        snapshot_write = time.perf_counter() - started
+        del storage
+
+        json_ready, json_page = _timed(lambda: _load_json(json_path))
+        snapshot_ready, snapshot_page = _timed(lambda: _load_snapshot(snapshot_dir))
+        assert json_page == snapshot_page
+
+        snapshot_bytes = sum(os.path.getsize(os.path.join(snapshot_dir, name)) for name in os.listdir(snapshot_dir))
+        print(json.dumps({
+            "rows": args.rows,
+            "json_bytes": os.path.getsize(json_path),
+            "snapshot_bytes": snapshot_bytes,
+            "json_write_seconds": round(json_write, 4),
+            "snapshot_write_seconds": round(snapshot_write, 4),
+            "json_ready_seconds": round(json_ready, 4),
+            "snapshot_ready_seconds": round(snapshot_ready, 4),
+            "speedup": round(json_ready / snapshot_ready, 1)
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
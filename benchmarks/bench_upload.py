@@ -0,0 +1,78 @@
+"""
+Transient memory of CSV upload parsing, old read-everything path vs CSVStream.
+
+Parses a spooled upload file from disk (what werkzeug hands to the route) and
+reports tracemalloc peak minus what the parsed leads retain, so a flat
+"transient" number means parsing overhead doesn't grow with the file.
+
+    python -m benchmarks.bench_upload --rows 10000 50000 200000
+"""
+
+import argparse
+import csv
+import gc
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+
+from utils.csv_stream import CSVStream
+
+HEADER = ["name", "role", "company", "industry", "location", "linkedin_bio"]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            writer.writerow([f"Lead {i}", "Head of Growth", f"Company {i}", "SaaS", "Austin USA",
+                             "Growth leader scaling SDR teams and outbound automation tools."])
+
+
+def _read_all(f):
+    stream = io.StringIO(f.read().decode("utf-8"))
+    return list(csv.DictReader(stream))
+
+
+def _streamed(f):
+    leads = []
+    for chunk in CSVStream(f).chunks():
+        leads.extend(chunk)
+    return leads
+
+
+def _measure(parse, path):
+    gc.collect()
+    tracemalloc.start()
+    with open(path, "rb") as f:
+        leads = parse(f)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(leads), peak - retained
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 200000])
+    args = parser.parse_args()
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for rows in args.rows:
+            path = os.path.join(tmpdir, f"leads_{rows}.csv")
+            _write_csv(path, rows)
+            _, old_transient = _measure(_read_all, path)
+            count, new_transient = _measure(_streamed, path)
+            report.append({
+                "rows": count,
+                "file_bytes": os.path.getsize(path),
+                "read_all_transient_bytes": old_transient,
+                "streamed_transient_bytes": new_transient
+            })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark of the API, run in-process against a stub Vertex server.
+
+For each lead count it generates a seeded CSV, then times /offer,
+/leads/upload, /score, /results and /results/export through the Flask test
+client and prints (or writes) one JSON report:
+
+    python -m benchmarks.run --rows 10000 100000 --provider vertex --latency 0.02 \\
+        --error-rate 0.01 --output bench.json
+
+Per endpoint: latency p50/p95/p99, throughput (rows/s, or requests/s for
+/offer and /results) and peak memory (process max RSS, plus the tracemalloc
+peak for the call when --trace-memory is given). The export is streamed, so
+it is measured in CSV/NDJSON, plain and gzip variants with time to first
+byte and bytes sent next to the full latency. /score is timed cold
+(incremental=false) and, as score_incremental, rescoring the unchanged upload.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.generate_leads import write_csv
+from benchmarks.stub_vertex import start_stub
+
+SAMPLE_OFFER = {
+    "name": "AI Outreach Automation",
+    "value_props": ["24/7 outreach", "6x more meetings"],
+    "ideal_use_cases": ["B2B SaaS mid-market"]
+}
+
+EXPORT_VARIANTS = [
+    ("results_export", "/results/export", None),
+    ("results_export_gzip", "/results/export", {"Accept-Encoding": "gzip"}),
+    ("results_export_ndjson", "/results/export?format=ndjson", None),
+    ("results_export_ndjson_gzip", "/results/export?format=ndjson", {"Accept-Encoding": "gzip"}),
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _max_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(call, repeat, items=1, trace_memory=False):
+    """Run ``call`` ``repeat`` times; it must return a response with a 2xx status"""
+    latencies = []
+    traced_peak = 0
+    for _ in range(repeat):
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        response = call()
+        latencies.append(time.perf_counter() - started)
+        if trace_memory:
+            traced_peak = max(traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+    total = sum(latencies)
+    report = {
+        "repeat": repeat,
+        "p50_seconds": round(percentile(latencies, 50), 6),
+        "p95_seconds": round(percentile(latencies, 95), 6),
+        "p99_seconds": round(percentile(latencies, 99), 6),
+        "throughput_per_second": round(items * repeat / total, 2) if total else None,
+        "max_rss_bytes": _max_rss_bytes(),
+    }
+    if trace_memory:
+        report["traced_peak_bytes"] = traced_peak
+    return report, response
+
+
+def measure_stream(client, url, repeat, items=1, headers=None):
+    """Time a streamed GET: time to first byte, time to last byte and bytes received"""
+    first_byte = []
+    latencies = []
+    sent = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers, buffered=False)
+        if not 200 <= response.status_code < 300:
+            raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+        chunks = iter(response.response)
+        sent = len(next(chunks, b""))
+        first_byte.append(time.perf_counter() - started)
+        sent += sum(len(chunk) for chunk in chunks)
+        response.close()
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "repeat": repeat,
+        "ttfb_p50_seconds": round(percentile(first_byte, 50), 6),
+        "ttfb_p95_seconds": round(percentile(first_byte, 95), 6),
+        "p50_seconds": round(percentile(latencies, 50), 6),
+        "p95_seconds": round(percentile(latencies, 95), 6),
+        "throughput_per_second": round(items * repeat / total, 2) if total else None,
+        "bytes": sent,
+        "max_rss_bytes": _max_rss_bytes(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _configure_environment(args, stub):
+    # services.ai reads its configuration at import time, so set it before importing the app
+    os.environ["AI_PROVIDER"] = "vertex_api_key" if args.provider == "vertex" else "mock"
+    os.environ["AI_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["STORAGE_BACKEND"] = args.storage
+    if args.storage == "sqlite":
+        os.environ["STORAGE_PATH"] = args.storage_path
+    if stub is not None:
+        os.environ["VERTEX_BASE_URL"] = f"http://127.0.0.1:{stub.server_port}"
+        os.environ.setdefault("VERTEX_API_KEY", "benchmark")
+        os.environ.setdefault("PROJECT_ID", "benchmark")
+        os.environ.setdefault("AI_RETRY_BACKOFF_SECONDS", "0.01")
+
+
+def run(args):
+    stub = None
+    if args.provider == "vertex":
+        stub = start_stub(latency=args.latency, error_rate=args.error_rate,
+                          throttle_rate=args.throttle_rate, seed=args.seed)
+    _configure_environment(args, stub)
+
+    from app import app
+    client = app.test_client()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "provider": args.provider,
+            "stub_latency_seconds": args.latency if stub else None,
+            "stub_error_rate": args.error_rate if stub else None,
+            "stub_throttle_rate": args.throttle_rate if stub else None,
+            "storage": args.storage,
+            "cache": args.cache,
+            "seed": args.seed,
+        },
+        "runs": []
+    }
+
+    for rows in args.rows:
+        buffer = io.StringIO()
+        write_csv(buffer, rows, args.seed)
+        payload = buffer.getvalue().encode("utf-8")
+        del buffer
+
+        endpoints = {}
+        endpoints["offer"], _ = measure(
+            lambda: client.post("/offer", json=SAMPLE_OFFER), args.repeat_fast)
+        endpoints["leads_upload"], _ = measure(
+            lambda: client.post("/leads/upload", data={"file": (io.BytesIO(payload), "leads.csv")}),
+            args.repeat, items=rows, trace_memory=args.trace_memory)
+        requests_before = stub.requests if stub else 0
+        # Cold runs: with incremental scoring every repeat after the first would reuse all rows
+        endpoints["score"], response = measure(
+            lambda: client.post(f"/score?max_workers={args.max_workers}&incremental=false"),
+            args.repeat, items=rows, trace_memory=args.trace_memory)
+        endpoints["score"]["last_response"] = response.get_json()
+        if stub:
+            endpoints["score"]["stub_requests"] = stub.requests - requests_before
+        # Warm runs: an unchanged upload rescored against the previous results
+        requests_before = stub.requests if stub else 0
+        endpoints["score_incremental"], response = measure(
+            lambda: client.post(f"/score?max_workers={args.max_workers}&incremental=true"),
+            args.repeat, items=rows, trace_memory=args.trace_memory)
+        endpoints["score_incremental"]["last_response"] = response.get_json()
+        if stub:
+            endpoints["score_incremental"]["stub_requests"] = stub.requests - requests_before
+        endpoints["results"], _ = measure(
+            lambda: client.get("/results"), args.repeat_fast, items=rows, trace_memory=args.trace_memory)
+        for name, url, headers in EXPORT_VARIANTS:
+            endpoints[name] = measure_stream(client, url, args.repeat, items=rows, headers=headers)
+
+        report["runs"].append({"rows": rows, "csv_bytes": len(payload), "endpoints": endpoints})
+
+    if stub is not None:
+        stub.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--provider", choices=["mock", "vertex"], default="mock",
+                        help="vertex sends AI calls to the local stub server")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests failing with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of stub requests failing with 429")
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of the heavy endpoints")
+    parser.add_argument("--repeat-fast", type=int, default=20, help="Runs of /offer and /results")
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--storage-path", default="bench_storage.sqlite3")
+    parser.add_argument("--cache", action="store_true", help="Keep the AI result cache enabled")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report tracemalloc peaks (slower)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
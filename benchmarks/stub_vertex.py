@@ -0,0 +1,99 @@
+"""
+Local stand-in for the Vertex predict endpoint.
+
+Answers single-lead and batch prompts in the formats services.ai expects,
+after a configurable latency, failing a configurable fraction of requests
+with 503 (or 429 when --throttle-rate is used).
+
+    python -m benchmarks.stub_vertex --port 8089 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_LABELS = ["High", "Medium", "Low"]
+
+
+class StubVertexHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as one buffered write (flushed after each request) with
+    # TCP_NODELAY, so keep-alive requests don't wait on a delayed ACK
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = ((body.get("instances") or [{}])[0]).get("content", "")
+        with server.lock:
+            server.requests += 1
+            roll = server.rng.random()
+        time.sleep(server.latency)
+
+        if roll < server.throttle_rate:
+            return self._reply(429, {"error": {"code": 429, "message": "Quota exceeded"}})
+        if roll < server.throttle_rate + server.error_rate:
+            return self._reply(503, {"error": {"code": 503, "message": "Unavailable"}})
+
+        ids = re.findall(r'"id": "(L\d+)"', prompt)
+        if ids:
+            content = "\n".join(f"{lead_id} | {self._label(lead_id + prompt)} | Stub batch reasoning." for lead_id in ids)
+        else:
+            content = f"{self._label(prompt)} - Stub reasoning for this lead."
+        return self._reply(200, {"predictions": [{"content": content}]})
+
+    @staticmethod
+    def _label(text):
+        # Deterministic per prompt so repeated runs agree
+        return _LABELS[sum(text.encode()) % 3]
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=42):
+    """Start the stub on a background thread and return the server (``server.server_port``)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubVertexHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.throttle_rate = throttle_rate
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency, args.error_rate, args.throttle_rate)
+    print(f"Stub Vertex listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,28 @@
 import csv
-import io
+import os
+import time
 from flask import Blueprint, request, jsonify
+from services.lead_features import FeatureExtractor
+from utils.csv_stream import CSVStream, UploadLimitExceeded
+from utils.lead_store import DEDUPE_MODES, LeadStore
+from utils.metrics import Counter, Histogram
 from utils.storage import storage
 
 leads_bp = Blueprint("leads", __name__)
 
+# Optional upload limits, 0 means unlimited
+UPLOAD_MAX_ROWS = int(os.getenv("UPLOAD_MAX_ROWS", "0"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", "0"))
+
+# Identity used to collapse duplicate leads into one scoring unit: "off", "name_company" or "name_company_bio"
+LEAD_DEDUPE = os.getenv("LEAD_DEDUPE", "off").lower()
+
+REQUIRED_COLUMNS = ["name", "role", "company", "industry", "location", "linkedin_bio"]
+
+CSV_PARSE_SECONDS = Histogram("leads_csv_parse_seconds", "Time spent parsing an uploaded CSV into leads")
+CSV_ROWS = Counter("leads_csv_rows", "Lead rows parsed from uploaded CSVs")
+CSV_BYTES = Counter("leads_csv_bytes", "Bytes read from uploaded CSVs")
+
 @leads_bp.route("/leads/upload", methods=["POST"])
 def upload_leads():
     """Upload CSV file with lead information"""
@@ -17,34 +35,75 @@ def upload_leads():
     
     if not file.filename.lower().endswith('.csv'):
         return jsonify({"error": "File must be a CSV"}), 400
+
+    # ?mode=append (or a "mode" form field) adds the rows to the current upload instead of replacing it
+    mode = (request.args.get("mode") or request.form.get("mode") or "replace").lower()
+    if mode not in ("replace", "append"):
+        return jsonify({"error": "mode must be 'replace' or 'append'"}), 400
+
+    # ?dedupe=off|name_company|name_company_bio (or a form field) overrides LEAD_DEDUPE
+    dedupe = (request.args.get("dedupe") or request.form.get("dedupe") or LEAD_DEDUPE).lower()
+    if dedupe not in DEDUPE_MODES:
+        return jsonify({"error": f"dedupe must be one of: {', '.join(DEDUPE_MODES)}"}), 400
     
     try:
-        stream = io.StringIO(file.stream.read().decode("utf-8"))
-        reader = csv.DictReader(stream)
-        leads = list(reader)
-        
-        # Validate required columns
-        required_columns = ["name", "role", "company", "industry", "location", "linkedin_bio"]
-        if not leads:
+        # Decode and parse incrementally so the file is never held in memory whole
+        stream = CSVStream(file.stream, max_rows=UPLOAD_MAX_ROWS, max_bytes=UPLOAD_MAX_BYTES)
+
+        # Validate required columns before reading any rows
+        if not stream.fieldnames:
             return jsonify({"error": "CSV file is empty"}), 400
-            
-        first_lead = leads[0]
-        missing_columns = [col for col in required_columns if col not in first_lead]
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in stream.fieldnames]
         if missing_columns:
             return jsonify({
                 "error": f"Missing required columns: {', '.join(missing_columns)}",
-                "required_columns": required_columns
+                "required_columns": REQUIRED_COLUMNS
             }), 400
 
+        started = time.perf_counter()
+        # Duplicates are indexed and scoring features extracted row by row while parsing
+        leads = LeadStore(stream.fieldnames, dedupe_fields=DEDUPE_MODES[dedupe], featurize=FeatureExtractor())
+        for chunk in stream.chunks():
+            leads.extend(chunk)
+        CSV_PARSE_SECONDS.observe(time.perf_counter() - started)
+        CSV_ROWS.inc(stream.rows_read)
+        CSV_BYTES.inc(stream.bytes_read)
+
+        if not leads:
+            return jsonify({"error": "CSV file is empty"}), 400
+
+        if mode == "append":
+            before = _duplicates(storage.get("leads"))
+            try:
+                total = storage.append_leads(leads)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({
+                "message": f"{len(leads)} leads appended successfully",
+                "appended_leads": len(leads),
+                "total_leads": total,
+                # Appended rows can also be duplicates of rows already stored
+                "duplicate_leads": _duplicates(storage.get("leads")) - before
+            }), 200
+
         storage["leads"] = leads
         return jsonify({
             "message": f"{len(leads)} leads uploaded successfully",
-            "total_leads": len(leads)
+            "total_leads": len(leads),
+            "unique_leads": len(leads) - _duplicates(leads),
+            "duplicate_leads": _duplicates(leads)
         }), 200
-        
+
+    except UploadLimitExceeded as e:
+        return jsonify({"error": str(e)}), 413
     except UnicodeDecodeError:
         return jsonify({"error": "Invalid file encoding. Please use UTF-8"}), 400
     except csv.Error as e:
         return jsonify({"error": f"CSV parsing error: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"File processing error: {str(e)}"}), 500
+
+def _duplicates(leads):
+    dedupe = getattr(leads, "dedupe", None)
+    return dedupe.duplicates if dedupe is not None else 0
@@ -0,0 +1,11 @@
+from flask import Blueprint, make_response
+from utils.metrics import REGISTRY
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text exposition of the scoring pipeline metrics, summed over all workers"""
+    response = make_response(REGISTRY.render())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
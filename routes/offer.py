@@ -28,10 +28,26 @@ def create_offer():
             return jsonify({"error": "ideal_use_cases must be a list"}), 400
         
         storage["offer"] = data
+        # Every stored offer is also kept by name for POST /score/matrix
+        offers_stored = storage.put_offer(str(data["name"]), data)
         return jsonify({
             "message": "Offer stored successfully", 
-            "offer": data
+            "offer": data,
+            "offers_stored": offers_stored
         }), 200
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@offer_bp.route("/offers", methods=["GET"])
+def list_offers():
+    """All stored offers, by name"""
+    return jsonify(storage.get("offers") or {}), 200
+
+@offer_bp.route("/offers/<name>", methods=["DELETE"])
+def delete_offer(name):
+    """Remove an offer from the stored set (the current offer for /score is kept)"""
+    offers_stored = storage.delete_offer(name)
+    if offers_stored is None:
+        return jsonify({"error": "Offer not found"}), 404
+    return jsonify({"message": f"Offer {name} deleted", "offers_stored": offers_stored}), 200
@@ -1,12 +1,53 @@
-from flask import Blueprint, request, jsonify, make_response
-from services.ai import ai_classify
-from services.rules import calculate_rule_score
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.ai import ai_classify, cache_stats, is_remote_provider, rate_limit_stats, vertex_breaker
+from services.jobs import ResultUpgrader, get_job, submit_job
+from services.process_scoring import score_into
+from services.offer_matrix import score_matrix
+from services.scoring import (
+    iter_classify_leads, score_provisionally, score_range_for_intent, CASCADE_MODES, SCORE_MAX_WORKERS
+)
+from utils.lead_store import RESULT_SORTS, ResultStore
+from utils.metrics import Counter, Histogram
+from utils.result_cache import GenerationCache
+from utils.result_export import EXPORT_FORMATS, gzip_chunks, iter_csv, iter_ndjson
 from utils.storage import storage
-import csv
-import io
+import hashlib
+import itertools
+import json
+import os
+import time
 
 score_bp = Blueprint("score", __name__)
 
+# Query parameters that turn GET /results into an indexed, paginated query
+RESULT_QUERY_ARGS = ("intent", "min_score", "max_score", "sort", "offset", "limit", "top")
+
+# Result rows serialised per chunk of a streamed export
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# Max leads per /classify/batch request, 0 means unlimited
+CLASSIFY_BATCH_MAX_LEADS = int(os.getenv("CLASSIFY_BATCH_MAX_LEADS", "10000"))
+
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Serialised /results and /results/export bodies kept per results generation (per process)
+RESULTS_CACHE_MAX_ENTRIES = int(os.getenv("RESULTS_CACHE_MAX_ENTRIES", "32"))
+RESULTS_CACHE_MAX_BYTES = int(os.getenv("RESULTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_results_cache = GenerationCache(RESULTS_CACHE_MAX_ENTRIES, RESULTS_CACHE_MAX_BYTES)
+
+RESULTS_CACHE_REQUESTS = Counter(
+    "results_cache_requests", "Result reads by cache outcome (hit, miss or not_modified)",
+    labelnames=("endpoint", "outcome")
+)
+EXPORT_SECONDS = Histogram(
+    "results_export_seconds", "Time spent streaming a results export", labelnames=("format", "encoding")
+)
+EXPORT_BYTES = Histogram(
+    "results_export_bytes", "Bytes sent for a results export", labelnames=("format", "encoding"),
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+)
+
 @score_bp.route("/score", methods=["POST"])
 def score_leads():
     """Run scoring on uploaded leads using rule-based + AI scoring"""
@@ -18,92 +59,442 @@ def score_leads():
     
     offer = storage["offer"]
     leads = storage["leads"]
-    results = []
-    
-    for lead in leads:
+
+    # Optional concurrency override: ?max_workers=N or {"max_workers": N}
+    body = request.get_json(silent=True) or {}
+    max_workers, error = _parse_max_workers(request.args, body)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Optional cascade override: ?cascade=adjacent or {"cascade": "off"}
+    cascade = request.args.get("cascade") or body.get("cascade")
+    if cascade is not None and cascade not in CASCADE_MODES:
+        return jsonify({"error": f"cascade must be one of: {', '.join(CASCADE_MODES)}"}), 400
+
+    # Reuse the previous run's results for unchanged leads unless ?incremental=false or {"incremental": false}
+    incremental = body.get("incremental")
+    if "incremental" in request.args:
+        incremental = request.args["incremental"].lower() in ("1", "true", "yes")
+    if incremental is not None and not isinstance(incremental, bool):
+        return jsonify({"error": "incremental must be true or false"}), 400
+    previous = storage.get("results") if incremental is not False else None
+
+    # Optional time budget: ?deadline=2.5 or {"deadline": 2.5} seconds
+    deadline = request.args.get("deadline", body.get("deadline"))
+    if deadline is not None:
         try:
-            # Calculate rule-based score (max 50 points)
-            rule_score = calculate_rule_score(lead, offer)
-            
-            # Get AI classification (max 50 points)
-            ai_intent, ai_reasoning, ai_points = ai_classify(lead, offer)
-            
-            # Calculate final score
-            final_score = rule_score + ai_points
-            
-            # Determine intent based on final score
-            if final_score >= 70:
-                intent = "High"
-            elif final_score >= 40:
-                intent = "Medium"
-            else:
-                intent = "Low"
-            
-            result = {
-                "name": lead.get("name", ""),
-                "role": lead.get("role", ""),
-                "company": lead.get("company", ""),
-                "intent": intent,
-                "score": final_score,
-                "reasoning": ai_reasoning
-            }
-            results.append(result)
-            
-        except Exception as e:
-            # Handle individual lead scoring errors
-            result = {
-                "name": lead.get("name", ""),
-                "role": lead.get("role", ""),
-                "company": lead.get("company", ""),
-                "intent": "Low",
-                "score": 0,
-                "reasoning": f"Error processing lead: {str(e)}"
-            }
-            results.append(result)
-    
+            deadline = float(deadline) if not isinstance(deadline, bool) else -1.0
+        except (TypeError, ValueError):
+            deadline = -1.0
+        if not deadline > 0:
+            return jsonify({"error": "deadline must be a positive number of seconds"}), 400
+
+    # Background mode: ?async=true or {"async": true} returns a job id straight away
+    run_async = request.args.get("async", "").lower() in ("1", "true", "yes") or body.get("async") is True
+    if run_async and deadline is not None:
+        return jsonify({"error": "deadline can't be combined with async"}), 400
+    if run_async:
+        job = submit_job(leads, offer, max_workers=max_workers, on_complete=_store_job_results, cascade=cascade,
+                         previous=previous, incremental=incremental)
+        return jsonify({
+            "message": f"Scoring job queued for {job.total} leads",
+            "job_id": job.id,
+            "status_url": f"/score/jobs/{job.id}",
+            "results_url": f"/results?job_id={job.id}"
+        }), 202
+
+    # Only the provider's answers can be slow; local scoring always finishes the whole upload
+    if deadline is not None and is_remote_provider():
+        return _score_with_deadline(leads, offer, deadline, max_workers, cascade, previous, incremental)
+
+    started = time.perf_counter()
+    results = ResultStore(leads)
+    stats = {}
+    score_into(results, leads, offer, max_workers=max_workers, cascade=cascade, stats=stats,
+               previous=previous, incremental=incremental)
+    elapsed = time.perf_counter() - started
+
     # Store results for later retrieval
-    storage["results"] = results
+    _publish_results(results)
     
     return jsonify({
         "message": f"Scored {len(results)} leads successfully",
-        "total_leads": len(results)
+        "total_leads": len(results),
+        "provisional": 0,
+        "max_workers": max_workers or SCORE_MAX_WORKERS,
+        "processes": stats["processes"],
+        "elapsed_seconds": round(elapsed, 3),
+        "cascade": stats["cascade"],
+        "incremental": stats["incremental"],
+        "dedupe": stats["dedupe"],
+        "ai_cache": cache_stats(),
+        "ai_circuit": vertex_breaker.info(),
+        "ai_rate_limit": rate_limit_stats()
+    }), 200
+
+def _parse_max_workers(args, body=None):
+    """max_workers from the query string, else the JSON body; returns (value or None, error or None)"""
+    if "max_workers" in args:
+        try:
+            max_workers = int(args["max_workers"])
+        except ValueError:
+            max_workers = 0
+    else:
+        max_workers = (body or {}).get("max_workers")
+    if max_workers is not None and (isinstance(max_workers, bool) or not isinstance(max_workers, int)
+                                    or max_workers < 1):
+        return None, "max_workers must be a positive integer"
+    return max_workers, None
+
+def _score_with_deadline(leads, offer, deadline, max_workers, cascade, previous, incremental):
+    """
+    Score within ``deadline`` seconds: every lead gets its rules + mock_ai
+    score, and the AI-backed scores the job hasn't produced by then are left
+    provisional and copied over the stored results in the background.
+    """
+    started = time.perf_counter()
+    job = submit_job(leads, offer, max_workers=max_workers, cascade=cascade, previous=previous,
+                     incremental=incremental)
+    results = ResultStore(leads)
+    score_provisionally(results, leads, offer)
+    # The job records each lead's inputs as it goes, so the next incremental run reuses what finished
+    results.inputs = job.results.inputs
+
+    finished = job.wait(max(0.0, deadline - (time.perf_counter() - started)))
+    upgrader = None
+    if finished and job.status == "completed":
+        results = job.results
+    else:
+        def apply(updates, persist):
+            if not storage.update_results(results, updates, persist=persist):
+                return False
+            job.results_generation = storage.results_generation()
+            return True
+
+        upgrader = ResultUpgrader(job, results, apply)
+        results.update(upgrader.pending())
+    _publish_results(results)
+    job.results_generation = storage.results_generation()
+    if upgrader is None:
+        job.sync(force=True)
+    else:
+        upgrader.start()
+    elapsed = time.perf_counter() - started
+
+    provisional = results.provisional_count()
+    return jsonify({
+        "message": f"Scored {len(results)} leads, {provisional} provisional until their AI scores arrive",
+        "total_leads": len(results),
+        "provisional": provisional,
+        "deadline_seconds": deadline,
+        "max_workers": max_workers or SCORE_MAX_WORKERS,
+        "elapsed_seconds": round(elapsed, 3),
+        "job_id": job.id,
+        "status_url": f"/score/jobs/{job.id}",
+        "job": job.progress(),
+        "ai_cache": cache_stats(),
+        "ai_circuit": vertex_breaker.info(),
+        "ai_rate_limit": rate_limit_stats()
     }), 200
 
+def _store_job_results(job):
+    """Publish a finished background job's results to storage"""
+    _publish_results(job.results)
+    job.results_generation = storage.results_generation()
+
+def _publish_results(results):
+    storage["results"] = results
+    stored = storage["results"]
+    if isinstance(stored, ResultStore):
+        # Build the /results query indexes now rather than on the first query
+        stored.index()
+
+@score_bp.route("/score/jobs/<job_id>", methods=["GET"])
+def get_score_job(job_id):
+    """Progress of a background scoring job"""
+    job = get_job(job_id)
+    if job is None:
+        # Started by another worker process: the progress it last synced to storage
+        record = storage.get_job_record(job_id)
+        if record is None:
+            return jsonify({"error": "Scoring job not found"}), 404
+        record.pop("results_generation", None)
+        return jsonify(record), 200
+    return jsonify(job.progress()), 200
+
+@score_bp.route("/score/jobs/<job_id>", methods=["DELETE"])
+def cancel_score_job(job_id):
+    """Cancel a background scoring job; results scored so far stay readable"""
+    job = get_job(job_id)
+    if job is None:
+        # Another worker process runs it and stops at its next sync
+        record = storage.get_job_record(job_id)
+        if record is None:
+            return jsonify({"error": "Scoring job not found"}), 404
+        record.pop("results_generation", None)
+        if not storage.request_job_cancel(job_id):
+            return jsonify({"error": f"Scoring job already {record['status']}", **record}), 409
+        return jsonify(record), 202
+    if not job.cancel():
+        return jsonify({"error": f"Scoring job already {job.status}", **job.progress()}), 409
+    return jsonify(job.progress()), 202
+
+@score_bp.route("/score/matrix", methods=["POST"])
+def score_offer_matrix():
+    """
+    Score every lead against every stored offer, or {"offers": [names]}, in one pass.
+
+    The leads × offers matrix replaces the previous one and is read back
+    from GET /results/matrix.
+    """
+    offers = storage.get("offers") or {}
+    if not offers:
+        return jsonify({"error": "No offers found. Please upload offers first."}), 400
+
+    if not storage.get("leads"):
+        return jsonify({"error": "No leads data found. Please upload leads first."}), 400
+
+    body = request.get_json(silent=True) or {}
+    names = body.get("offers", list(offers))
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        return jsonify({"error": "offers must be a non-empty list of offer names"}), 400
+    names = list(dict.fromkeys(names))
+    unknown = [name for name in names if name not in offers]
+    if unknown:
+        return jsonify({"error": f"Unknown offers: {', '.join(unknown)}"}), 400
+
+    started = time.perf_counter()
+    stats = {}
+    matrix = score_matrix(storage["leads"], [offers[name] for name in names], stats)
+    elapsed = time.perf_counter() - started
+    storage["matrix"] = matrix
+    # Build the best-offer query index now rather than on the first query
+    storage["matrix"].index()
+
+    return jsonify({
+        "message": f"Scored {len(matrix)} leads against {len(names)} offers",
+        "total_leads": len(matrix),
+        "offers": names,
+        "path": stats["path"],
+        "elapsed_seconds": round(elapsed, 3),
+        "best_offer_counts": {name: matrix.best.count(column) for column, name in enumerate(names)}
+    }), 200
+
+@score_bp.route("/results/matrix", methods=["GET"])
+def get_results_matrix():
+    """
+    Each lead's score against every offer of the last matrix run, plus its best offer.
+
+    Takes the /results query parameters, applied to the best score (intent
+    being the best score's band), and ?offer=<name> for the leads whose best
+    offer that is.
+    """
+    query, error = _parse_results_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    matrix = storage.get("matrix")
+    if matrix is None:
+        return jsonify({"error": "No offer matrix found. Please run POST /score/matrix first."}), 404
+
+    offer = request.args.get("offer")
+    if offer is not None:
+        if offer not in matrix.offers:
+            return jsonify({"error": f"offer must be one of: {', '.join(matrix.offers)}"}), 400
+        query = dict(query or {"sort": "row"}, offer=offer)
+    if query is not None and query.pop("intent", None) is not None:
+        try:
+            low, high = score_range_for_intent(request.args["intent"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        query["min_score"] = max(low, query.get("min_score", low))
+        query["max_score"] = min(high, query.get("max_score", high))
+    return _results_response(matrix, query), 200
+
 @score_bp.route("/results", methods=["GET"])
 def get_results():
-    """Return JSON array of scored leads"""
+    """
+    Return JSON array of scored leads.
+
+    Optional query: ?intent=High&min_score=60&max_score=90&sort=-score&offset=0&limit=100,
+    or ?top=200 for the 200 highest scores. Queried pages carry X-Total-Count
+    (matching results) and, when more follow, X-Next-Offset.
+    """
+    query, error = _parse_results_query(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    job_id = request.args.get("job_id")
+    if job_id:
+        # Rows a background job has finished so far, even while it is still running
+        job = get_job(job_id)
+        if job is None:
+            return _other_worker_job_results(job_id, query)
+        response = _results_response(job.results, query)
+        response.headers["X-Job-Status"] = job.status
+        response.headers["X-Job-Progress"] = f"{job.done}/{job.total}"
+        return response, 200
+
+    # Same generation and query means the same bytes: answer from the cache or with a 304
+    generation = storage.results_generation()
+    key = ("results", tuple(sorted(query.items())) if query else None)
+    etag = _results_etag(generation, key)
+    cached = _cached_response(generation, key, etag, "results")
+    if cached is not None:
+        return cached
+
     if not storage.get("results"):
         return jsonify({"error": "No results found. Please run scoring first."}), 404
     
-    return jsonify(storage["results"]), 200
+    response = _results_response(storage["results"], query)
+    if generation is not None:
+        _results_cache.put(generation, key, response.get_data(), _cached_headers(response))
+        _set_validators(response, etag)
+    return response, 200
+
+def _parse_results_query(args):
+    """(query kwargs or None for the plain full list, error message or None)"""
+    if not any(name in args for name in RESULT_QUERY_ARGS):
+        return None, None
+    query = {"intent": args.get("intent"), "sort": args.get("sort", "row")}
+    for name in ("min_score", "max_score", "offset", "limit", "top"):
+        if name in args:
+            value = args.get(name, type=int)
+            if value is None or value < 0:
+                return None, f"{name} must be a non-negative integer"
+            query[name] = value
+    if query["sort"] not in RESULT_SORTS:
+        return None, f"sort must be one of: {', '.join(RESULT_SORTS)}"
+    if query["intent"] is not None:
+        try:
+            score_range_for_intent(query["intent"])
+        except ValueError as e:
+            return None, str(e)
+    top = query.pop("top", None)
+    if top is not None:
+        # Top-k is the first page of the score-descending index
+        query["sort"] = "-score"
+        query["limit"] = top if "limit" not in query else min(top, query["limit"])
+    return query, None
+
+def _other_worker_job_results(job_id, query):
+    """/results?job_id= for a job another worker process runs: its rows once they are published"""
+    record = storage.get_job_record(job_id)
+    if record is None:
+        return jsonify({"error": "Scoring job not found"}), 404
+    generation = record.get("results_generation")
+    if record["status"] != "completed" or generation is None or generation != storage.results_generation():
+        return jsonify({
+            "error": f"Scoring job {record['status']} in another worker process; "
+                     "its rows are readable here once it completes",
+            **{key: value for key, value in record.items() if key != "results_generation"}
+        }), 409
+    response = _results_response(storage["results"], query)
+    response.headers["X-Job-Status"] = record["status"]
+    response.headers["X-Job-Progress"] = f"{record['done']}/{record['total']}"
+    return response, 200
+
+def _results_response(results, query):
+    if query is None:
+        return jsonify(results.to_list())
+    total, rows = results.query(**query)
+    response = jsonify(rows)
+    response.headers["X-Total-Count"] = str(total)
+    next_offset = query.get("offset", 0) + len(rows)
+    if rows and next_offset < total:
+        response.headers["X-Next-Offset"] = str(next_offset)
+    return response
+
+def _results_etag(generation, key):
+    """Strong ETag for one representation of one results generation"""
+    if generation is None:
+        return None
+    variant = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=6).hexdigest()
+    return f"{generation}-{variant}"
+
+def _cached_response(generation, key, etag, endpoint):
+    """A 304 or the cached body for this generation, or None when it has to be built"""
+    if etag is None:
+        return None
+    if request.if_none_match.contains(etag):
+        RESULTS_CACHE_REQUESTS.inc(endpoint=endpoint, outcome="not_modified")
+        response = Response(status=304)
+        _set_validators(response, etag)
+        return response
+    entry = _results_cache.get(generation, key)
+    if entry is None:
+        RESULTS_CACHE_REQUESTS.inc(endpoint=endpoint, outcome="miss")
+        return None
+    RESULTS_CACHE_REQUESTS.inc(endpoint=endpoint, outcome="hit")
+    body, headers = entry
+    response = Response(body, headers=headers)
+    _set_validators(response, etag)
+    return response
+
+def _cached_headers(response):
+    return {name: value for name, value in response.headers.items() if name != "Content-Length"}
+
+def _set_validators(response, etag):
+    response.set_etag(etag)
+    # Let browsers and proxies keep the body, but revalidate on every poll
+    response.headers["Cache-Control"] = "no-cache"
 
 @score_bp.route("/results/export", methods=["GET"])
 def export_results_csv():
-    """Export results as CSV file"""
+    """
+    Stream results as CSV (default) or NDJSON (?format=ndjson).
+
+    Rows are serialised in chunks while the response is sent, so memory stays
+    flat however many results there are; gzip is used when the client accepts it.
+    """
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    encoding = "gzip" if request.accept_encodings["gzip"] else "identity"
+    generation = storage.results_generation()
+    key = ("export", export_format, encoding)
+    etag = _results_etag(generation, key)
+    cached = _cached_response(generation, key, etag, "export")
+    if cached is not None:
+        return cached
+
     if not storage.get("results"):
         return jsonify({"error": "No results found. Please run scoring first."}), 404
     
     results = storage["results"]
-    
-    # Create CSV content
-    output = io.StringIO()
-    fieldnames = ["name", "role", "company", "intent", "score", "reasoning"]
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    
-    writer.writeheader()
-    for result in results:
-        writer.writerow(result)
-    
-    # Create response
-    csv_content = output.getvalue()
-    output.close()
-    
-    response = make_response(csv_content)
-    response.headers["Content-Disposition"] = "attachment; filename=lead_scores.csv"
-    response.headers["Content-Type"] = "text/csv"
-    
+    serialise = iter_ndjson if export_format == "ndjson" else iter_csv
+    chunks = serialise(results, chunk_rows=EXPORT_CHUNK_ROWS)
+    if encoding == "gzip":
+        chunks = gzip_chunks(chunks)
+
+    mimetype, filename = EXPORT_FORMATS[export_format]
+    headers = {
+        "Content-Type": mimetype,
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    chunks = _observed_export(chunks, export_format, encoding)
+    if generation is not None:
+        # Streamed the first time, then served from the cache until the next scoring run
+        chunks = _results_cache.tee(generation, key, chunks, headers)
+    response = Response(chunks, headers=headers)
+    if etag is not None:
+        _set_validators(response, etag)
     return response
 
+def _observed_export(chunks, export_format, encoding):
+    """Pass export chunks through, recording time and size once the stream is done"""
+    started = time.perf_counter()
+    sent = 0
+    for chunk in chunks:
+        sent += len(chunk)
+        yield chunk
+    EXPORT_SECONDS.observe(time.perf_counter() - started, format=export_format, encoding=encoding)
+    EXPORT_BYTES.observe(sent, format=export_format, encoding=encoding)
+
 @score_bp.route("/classify", methods=["POST"])
 def classify_lead():
     """Individual lead classification endpoint for testing"""
@@ -120,4 +511,67 @@ def classify_lead():
         "intent": ai_intent,
         "reasoning": ai_reason,
         "points": ai_points
-    }), 200
\ No newline at end of file
+    }), 200
+
+@score_bp.route("/classify/batch", methods=["POST"])
+def classify_batch():
+    """
+    Classify many leads against one offer, streaming one NDJSON line per lead.
+
+    The body is a JSON array of leads, {"offer": {...}, "leads": [...]}, or
+    NDJSON (one lead per line, optionally preceded by an {"offer": {...}} line).
+    Without an offer in the body the uploaded offer is used. Lines come back
+    as leads finish, each with the lead's input "index".
+    """
+    max_workers, error = _parse_max_workers(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    offer = None
+    if request.mimetype in NDJSON_MIMETYPES:
+        # Parsed lazily, so classification starts before the whole body has arrived
+        lines = _ndjson_items(request.stream)
+        first = next(lines, None)
+        if isinstance(first, dict) and set(first) == {"offer"}:
+            offer = first["offer"]
+        elif first is not None:
+            lines = itertools.chain([first], lines)
+        leads = lines
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and isinstance(data.get("leads"), list):
+            offer, leads = data.get("offer"), data["leads"]
+        elif isinstance(data, list):
+            leads = data
+        else:
+            return jsonify({
+                "error": "Body must be a JSON array of leads, {\"offer\": ..., \"leads\": [...]} or NDJSON"
+            }), 400
+        if CLASSIFY_BATCH_MAX_LEADS and len(leads) > CLASSIFY_BATCH_MAX_LEADS:
+            return jsonify({"error": f"At most {CLASSIFY_BATCH_MAX_LEADS} leads per request"}), 413
+
+    offer = offer or storage.get("offer")
+    if not isinstance(offer, dict):
+        return jsonify({"error": "No offer data found. Send one in the body or upload it first."}), 400
+
+    def generate():
+        limited = itertools.islice(leads, CLASSIFY_BATCH_MAX_LEADS) if CLASSIFY_BATCH_MAX_LEADS else leads
+        for lines in iter_classify_leads(limited, offer, max_workers=max_workers):
+            yield "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        if CLASSIFY_BATCH_MAX_LEADS and next(leads, None) is not None:
+            yield (json.dumps({"error": f"At most {CLASSIFY_BATCH_MAX_LEADS} leads per request; "
+                                        "the rest were not classified"}) + "\n").encode("utf-8")
+
+    leads = iter(leads)
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def _ndjson_items(stream):
+    """Parsed JSON value per non-blank line, or the ValueError for a line that isn't JSON"""
+    for raw in stream:
+        line = raw.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
@@ -1,8 +1,22 @@
 import os
 import json
 import re
+import hashlib
+import random
+import threading
+import time
 import requests
-from typing import Tuple
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.lead_features import (
+    BIO_MOCK_KEYWORD, INDUSTRY_SAAS_B2B_SOFTWARE, INDUSTRY_SAAS_SOFTWARE, MOCK_ROLE_DECISION_MAKER,
+    MOCK_ROLE_INFLUENCER, features_of
+)
+from utils.cache import TieredCache
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.metrics import Counter, Histogram
+from utils.rate_limit import AdaptiveConcurrency, TokenBucket
 
 # -------------------------
 # Environment variables
@@ -13,25 +27,80 @@ GOOGLE_PROJECT = os.getenv("PROJECT_ID")
 GOOGLE_LOCATION = os.getenv("GOOGLE_LOCATION", "us-central1")
 MODEL = os.getenv("MODEL", "publishers/google/models/gemini-2.5-flash")
 
+VERTEX_BASE_URL = os.getenv("VERTEX_BASE_URL", f"https://{GOOGLE_LOCATION}-aiplatform.googleapis.com")
+
 REQUEST_TIMEOUT = int(os.getenv("AI_REQUEST_TIMEOUT_SECONDS", "20"))
 
+# Keep-alive connection pool, retries with jittered exponential backoff, circuit breaker
+AI_HTTP_POOL_SIZE = int(os.getenv("AI_HTTP_POOL_SIZE", "16"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_RETRY_BACKOFF_SECONDS = float(os.getenv("AI_RETRY_BACKOFF_SECONDS", "0.5"))
+AI_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("AI_RETRY_MAX_BACKOFF_SECONDS", "8"))
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Client-side quota shared by every AI call in the process, 0 disables a bucket
+AI_RATE_LIMIT_RPS = float(os.getenv("AI_RATE_LIMIT_RPS", "0"))
+AI_RATE_LIMIT_TPM = float(os.getenv("AI_RATE_LIMIT_TPM", "0"))
+# AIMD in-flight limit: grows while calls are fast, halves on 429s or slow calls
+AI_MIN_CONCURRENCY = int(os.getenv("AI_MIN_CONCURRENCY", "1"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", str(AI_HTTP_POOL_SIZE)))
+AI_TARGET_LATENCY_SECONDS = float(os.getenv("AI_TARGET_LATENCY_SECONDS", "10"))
+
+# Cache of remote classifications. An empty AI_CACHE_PATH keeps it in memory only.
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "ai_cache.sqlite3")
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_CACHE_MAX_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MAX_MEMORY_ENTRIES", "10000"))
+AI_CACHE_MAX_DISK_ENTRIES = int(os.getenv("AI_CACHE_MAX_DISK_ENTRIES", "200000"))
+
+# Leads packed into one Vertex prompt; 1 sends one request per lead
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "10"))
+
+LEAD_PROMPT_FIELDS = ["name", "role", "company", "industry", "location", "linkedin_bio"]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+AI_REQUEST_SECONDS = Histogram(
+    "ai_classify_seconds", "AI classification latency (cache hits excluded)",
+    labelnames=("provider", "mode", "outcome"),
+    buckets=(1e-5, 1e-4, 1e-3, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 60.0)
+)
+AI_HTTP_ATTEMPTS = Counter("ai_http_attempts", "HTTP attempts to the AI provider by status", labelnames=("status",))
+
+vertex_breaker = CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_RESET_SECONDS)
+request_bucket = TokenBucket(AI_RATE_LIMIT_RPS)
+token_bucket = TokenBucket(AI_RATE_LIMIT_TPM / 60.0, capacity=AI_RATE_LIMIT_TPM)
+concurrency = AdaptiveConcurrency(
+    initial=max(AI_MIN_CONCURRENCY, AI_MAX_CONCURRENCY // 2),
+    minimum=AI_MIN_CONCURRENCY,
+    maximum=AI_MAX_CONCURRENCY,
+    target_latency=AI_TARGET_LATENCY_SECONDS
+)
+
 # -------------------------
 # Helper functions
 # -------------------------
-def _build_prompt(lead: dict, offer: dict) -> str:
-    lead_block = json.dumps({
-        "name": lead.get("name"),
-        "role": lead.get("role"),
-        "company": lead.get("company"),
-        "industry": lead.get("industry"),
-        "location": lead.get("location"),
-        "linkedin_bio": lead.get("linkedin_bio")
-    }, ensure_ascii=False)
-    offer_block = json.dumps({
+def _prompt_lead(lead: dict) -> dict:
+    return {field: lead.get(field) for field in LEAD_PROMPT_FIELDS}
+
+def _prompt_offer(offer: dict) -> dict:
+    return {
         "name": offer.get("name"),
         "value_props": offer.get("value_props"),
         "ideal_use_cases": offer.get("ideal_use_cases")
-    }, ensure_ascii=False)
+    }
+
+def _build_prompt(lead: dict, offer: dict) -> str:
+    lead_block = json.dumps(_prompt_lead(lead), ensure_ascii=False)
+    offer_block = json.dumps(_prompt_offer(offer), ensure_ascii=False)
 
     return (
         f"Offer:\n{offer_block}\n\n"
@@ -40,9 +109,12 @@ def _build_prompt(lead: dict, offer: dict) -> str:
         "Respond in 1 line with the label first followed by reasoning."
     )
 
+# Reasoning of a lead whose model response was empty; a placeholder, so never cached
+NO_RESPONSE_REASONING = "No response from model; default to Medium."
+
 def _parse_label_and_reasoning(text: str) -> Tuple[str, str]:
     if not text:
-        return "Medium", "No response from model; default to Medium."
+        return "Medium", NO_RESPONSE_REASONING
     m = re.search(r"\b(High|Medium|Low)\b", text, flags=re.IGNORECASE)
     label = m.group(1).capitalize() if m else "Medium"
     reasoning = re.sub(r"^\s*(High|Medium|Low)\s*[:\-\u2014]?\s*", "", text.strip(), flags=re.IGNORECASE).strip()
@@ -52,78 +124,343 @@ def _parse_label_and_reasoning(text: str) -> Tuple[str, str]:
         reasoning = "No explanation provided."
     return label, reasoning
 
+def _build_batch_prompt(leads: Sequence[dict], offer: dict) -> str:
+    offer_block = json.dumps(_prompt_offer(offer), ensure_ascii=False)
+    lead_lines = "\n".join(
+        json.dumps(dict(id=f"L{i + 1}", **_prompt_lead(lead)), ensure_ascii=False)
+        for i, lead in enumerate(leads)
+    )
+
+    return (
+        f"Offer:\n{offer_block}\n\n"
+        f"Leads:\n{lead_lines}\n\n"
+        "Task: For each lead, classify buying intent as High/Medium/Low and provide 1-2 sentence reasoning. "
+        "Respond with exactly one line per lead, in the same order, formatted as: "
+        "<id> | <label> | <reasoning>"
+    )
+
+_BATCH_LINE_RE = re.compile(
+    r"^\W*(L\d+)\W*?\s*[|:\-\u2014]\s*\**(High|Medium|Low)\b\**\s*[|:\-\u2014]?\s*(.*)$",
+    flags=re.IGNORECASE
+)
+
+def _parse_batch_response(text: str, count: int) -> Dict[int, Tuple[str, str]]:
+    """
+    Map lead index -> (label, reasoning) for every line of a batch response that
+    parses. Leads with a missing or malformed line are left out.
+    """
+    parsed = {}
+    for line in (text or "").splitlines():
+        m = _BATCH_LINE_RE.match(line.strip())
+        if not m:
+            continue
+        index = int(m.group(1)[1:]) - 1
+        if not 0 <= index < count or index in parsed:
+            continue
+        reasoning = m.group(3).strip()
+        if len(reasoning) > 350:
+            reasoning = reasoning[:347] + "..."
+        parsed[index] = (m.group(2).capitalize(), reasoning or "No explanation provided.")
+    return parsed
+
+def _cache_key(lead: dict, offer: dict) -> str:
+    """Stable hash of everything that goes into the prompt, plus the model"""
+    payload = json.dumps({
+        "model": MODEL,
+        "lead": _prompt_lead(lead),
+        "offer": _prompt_offer(offer)
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def ai_offer_fingerprint(offer: dict) -> str:
+    """
+    Hash of everything in the offer (and provider config) ai_classify depends on.
+
+    The mock only reads ideal_use_cases; Vertex prompts also carry the offer
+    name and value props, and answers depend on the model.
+    """
+    if AI_PROVIDER == "vertex_api_key":
+        payload = {"provider": AI_PROVIDER, "model": MODEL, "offer": _prompt_offer(offer)}
+    else:
+        payload = {"provider": "mock", "ideal_use_cases": offer.get("ideal_use_cases")}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _get_cache() -> Optional[TieredCache]:
+    global _cache
+    if not AI_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredCache(
+                    path=AI_CACHE_PATH or None,
+                    ttl=AI_CACHE_TTL_SECONDS,
+                    max_memory_entries=AI_CACHE_MAX_MEMORY_ENTRIES,
+                    max_disk_entries=AI_CACHE_MAX_DISK_ENTRIES
+                )
+    return _cache
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the classification cache"""
+    if _cache is None:
+        return {"enabled": AI_CACHE_ENABLED}
+    return dict(_cache.info(), enabled=True)
+
+# AI labels from least to most likely to buy
+AI_LABELS = ("Low", "Medium", "High")
+
+# Start of the reasoning of a lead classified by the mock after the provider failed
+FALLBACK_REASONING_PREFIX = "AI provider error:"
+
+def points_for_label(label: str) -> int:
+    """AI points (max 50) awarded for a High/Medium/Low label"""
+    return 50 if label=="High" else 30 if label=="Medium" else 10
+
 # -------------------------
 # Mock AI (fallback)
 # -------------------------
 def mock_ai(lead: dict, offer: dict) -> Tuple[str, str]:
-    role = (lead.get("role") or "").lower()
-    industry = (lead.get("industry") or "").lower()
-    bio = (lead.get("linkedin_bio") or "").lower()
-    icp_text = " ".join(offer.get("ideal_use_cases") or []).lower()
+    # Keyword hits come from the lead's feature bitmask (services.lead_features)
+    features = features_of(lead)
+    icp_saas = "saas" in " ".join(offer.get("ideal_use_cases") or []).lower()
 
-    if any(k in role for k in ["ceo", "founder", "cto", "cxo", "head", "vp", "director"]):
-        if "saas" in industry or "saas" in icp_text or "software" in industry:
+    if features & MOCK_ROLE_DECISION_MAKER:
+        if icp_saas or features & INDUSTRY_SAAS_SOFTWARE:
             return "High", "Decision-maker at an organization matching ICP (SaaS/software)."
         return "High", "Senior decision-maker role detected."
-    if any(k in role for k in ["manager", "lead", "senior"]):
-        if "saas" in industry or "b2b" in industry or "software" in industry or "saas" in icp_text:
+    if features & MOCK_ROLE_INFLUENCER:
+        if icp_saas or features & INDUSTRY_SAAS_B2B_SOFTWARE:
             return "Medium", "Mid-level role in relevant industry; may influence purchasing decisions."
         return "Medium", "Relevant role, but not a confirmed decision-maker."
-    if any(k in bio for k in ["growth", "sales", "revops", "outreach", "marketing"]):
+    if features & BIO_MOCK_KEYWORD:
         return "Medium", "Role or bio mentions growth/marketing—may be receptive to outreach."
     return "Low", "No strong signals in role, industry or bio."
 
 # -------------------------
 # Vertex via API key
 # -------------------------
-def _call_vertex_api_key(prompt: str) -> dict:
+def _get_session() -> requests.Session:
+    """Process-wide keep-alive session, recreated after a fork"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AI_HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+def _retry_delay(attempt: int, resp: Optional[requests.Response] = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when it sends one"""
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(AI_RETRY_MAX_BACKOFF_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(AI_RETRY_MAX_BACKOFF_SECONDS, AI_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+def _estimate_tokens(body: dict) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus the output budget"""
+    prompt_chars = sum(len(instance.get("content", "")) for instance in body.get("instances", []))
+    return prompt_chars // 4 + body.get("parameters", {}).get("maxOutputTokens", 0)
+
+def _rate_limited_post(session: requests.Session, url: str, body: dict) -> requests.Response:
+    """One HTTP attempt, waiting for quota and an AIMD slot rather than getting a 429"""
+    request_bucket.acquire()
+    token_bucket.acquire(_estimate_tokens(body))
+    with concurrency.slot() as outcome:
+        try:
+            resp = session.post(url, json=body, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            AI_HTTP_ATTEMPTS.inc(status=type(e).__name__)
+            raise
+        AI_HTTP_ATTEMPTS.inc(status=resp.status_code)
+        outcome["throttled"] = resp.status_code == 429
+    return resp
+
+def _post_with_retries(url: str, body: dict) -> dict:
+    session = _get_session()
+    for attempt in range(AI_MAX_RETRIES + 1):
+        try:
+            resp = _rate_limited_post(session, url, body)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= AI_MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(attempt))
+            continue
+        if resp.status_code in RETRY_STATUSES and attempt < AI_MAX_RETRIES:
+            time.sleep(_retry_delay(attempt, resp))
+            continue
+        resp.raise_for_status()
+        return resp.json()
+
+def _call_vertex_api_key(prompt: str, max_output_tokens: int = 256) -> dict:
     if not GEMINI_API_KEY or not GOOGLE_PROJECT:
         raise RuntimeError("VERTEX_API_KEY and PROJECT_ID must be set for vertex_api_key provider.")
 
+    # While Vertex is failing, skip straight to the mock fallback instead of waiting on timeouts
+    if not vertex_breaker.allow():
+        raise CircuitOpenError("Vertex circuit open after repeated failures")
+
     endpoint = (
-        f"https://{GOOGLE_LOCATION}-aiplatform.googleapis.com/v1/projects/{GOOGLE_PROJECT}"
+        f"{VERTEX_BASE_URL}/v1/projects/{GOOGLE_PROJECT}"
         f"/locations/{GOOGLE_LOCATION}/{MODEL}:predict?key={GEMINI_API_KEY}"
     )
 
     body = {
         "instances": [{"content": prompt}],
-        "parameters": {"temperature": 0.0, "maxOutputTokens": 256}
+        "parameters": {"temperature": 0.0, "maxOutputTokens": max_output_tokens}
     }
-    resp = requests.post(endpoint, json=body, timeout=REQUEST_TIMEOUT)
-    resp.raise_for_status()
-    return resp.json()
+    try:
+        resp_json = _post_with_retries(endpoint, body)
+    except Exception:
+        vertex_breaker.record_failure()
+        raise
+    vertex_breaker.record_success()
+    return resp_json
+
+def _response_text(resp_json: dict) -> str:
+    text_output = ""
+    preds = resp_json.get("predictions") or []
+    if preds and isinstance(preds, list):
+        p0 = preds[0]
+        if isinstance(p0, dict) and "content" in p0:
+            # An empty answer stays empty rather than becoming the raw JSON
+            return p0["content"] or ""
+        else:
+            text_output = str(p0)
+    if not text_output:
+        text_output = json.dumps(resp_json)
+    return text_output
 
 # -------------------------
 # Public AI function
 # -------------------------
 def ai_classify(lead: dict, offer: dict) -> Tuple[str, str, int]:
     provider = AI_PROVIDER
-    prompt = _build_prompt(lead, offer)
+
+    # Only remote results are worth caching; mock is cheaper than a lookup
+    cache = _get_cache() if provider == "vertex_api_key" else None
+    key = None
+    if cache is not None:
+        key = _cache_key(lead, offer)
+        cached = cache.get(key)
+        if cached is not None:
+            label, reasoning = cached
+            return label, reasoning, points_for_label(label)
+
+    started = time.perf_counter()
+    fallback = False
 
     try:
         if provider == "mock":
             label, reasoning = mock_ai(lead, offer)
         elif provider == "vertex_api_key":
-            resp_json = _call_vertex_api_key(prompt)
-            text_output = ""
-            preds = resp_json.get("predictions") or []
-            if preds and isinstance(preds, list):
-                p0 = preds[0]
-                if isinstance(p0, dict) and "content" in p0:
-                    text_output = p0["content"]
-                else:
-                    text_output = str(p0)
-            if not text_output:
-                text_output = json.dumps(resp_json)
-            label, reasoning = _parse_label_and_reasoning(text_output)
+            resp_json = _call_vertex_api_key(_build_prompt(lead, offer))
+            label, reasoning = _parse_label_and_reasoning(_response_text(resp_json))
         else:
             label, reasoning = mock_ai(lead, offer)
     except Exception as e:
-        label, reasoning = mock_ai(lead, offer)
-        reasoning = f"AI provider error: {e}. Fallback to mock."
+        try:
+            label, reasoning = mock_ai(lead, offer)
+        except Exception:
+            AI_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=provider, mode="single", outcome="error")
+            raise
+        reasoning = f"{FALLBACK_REASONING_PREFIX} {e}. Fallback to mock."
+        fallback = True
+    AI_REQUEST_SECONDS.observe(
+        time.perf_counter() - started, provider=provider, mode="single",
+        outcome="fallback" if fallback else "success"
+    )
+
+    # Never cache fallbacks or empty responses, otherwise a provider hiccup would stick around for TTL
+    if cache is not None and not fallback and reasoning != NO_RESPONSE_REASONING:
+        cache.set(key, [label, reasoning])
+
+    return label, reasoning, points_for_label(label)
+
+def rate_limit_stats() -> dict:
+    """Current AIMD limit, 429/slow counts and time spent waiting for quota"""
+    return dict(
+        concurrency.info(),
+        request_wait_seconds=round(request_bucket.waited_seconds, 3),
+        token_wait_seconds=round(token_bucket.waited_seconds, 3)
+    )
+
+def is_remote_provider() -> bool:
+    """Whether classifications go to a remote model rather than the local mock"""
+    return AI_PROVIDER == "vertex_api_key"
+
+def mock_classify(lead: dict, offer: dict) -> Tuple[str, str, int]:
+    """ai_classify with the local mock regardless of AI_PROVIDER"""
+    label, reasoning = mock_ai(lead, offer)
+    return label, reasoning, points_for_label(label)
+
+def batch_size() -> int:
+    """Leads per classification request for the configured provider"""
+    return max(1, AI_BATCH_SIZE) if AI_PROVIDER == "vertex_api_key" else 1
+
+def ai_classify_batch(leads: Sequence[dict], offer: dict) -> List[Tuple[str, str, int]]:
+    """
+    Classify several leads with one Vertex request.
+
+    Cached leads are skipped, and any lead whose response line is missing or
+    can't be parsed is re-sent on its own through ai_classify. If the request
+    itself fails (after its retries, or with the circuit open) the whole batch
+    gets the mock fallback rather than one more request per lead.
+    """
+    if AI_PROVIDER != "vertex_api_key" or len(leads) <= 1:
+        return [ai_classify(lead, offer) for lead in leads]
+
+    cache = _get_cache()
+    results = [None] * len(leads)
+    pending = []
+    for i, lead in enumerate(leads):
+        cached = cache.get(_cache_key(lead, offer)) if cache is not None else None
+        if cached is not None:
+            label, reasoning = cached
+            results[i] = (label, reasoning, points_for_label(label))
+        else:
+            pending.append(i)
+
+    if pending:
+        batch = [leads[i] for i in pending]
+        started = time.perf_counter()
+        error = None
+        try:
+            resp_json = _call_vertex_api_key(
+                _build_batch_prompt(batch, offer), max_output_tokens=96 * len(batch)
+            )
+            parsed = _parse_batch_response(_response_text(resp_json), len(batch))
+            outcome = "success"
+        except Exception as e:
+            parsed = {}
+            error = e
+            outcome = "error"
+        AI_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=AI_PROVIDER, mode="batch", outcome=outcome)
+        for position, i in enumerate(pending):
+            if error is not None:
+                try:
+                    label, _ = mock_ai(leads[i], offer)
+                except Exception:
+                    # A lead the mock can't read either; ai_classify reports it
+                    results[i] = ai_classify(leads[i], offer)
+                    continue
+                # Never cached, like ai_classify's fallbacks
+                reasoning = f"{FALLBACK_REASONING_PREFIX} {error}. Fallback to mock."
+                results[i] = (label, reasoning, points_for_label(label))
+            elif position in parsed:
+                label, reasoning = parsed[position]
+                if cache is not None:
+                    cache.set(_cache_key(leads[i], offer), [label, reasoning])
+                results[i] = (label, reasoning, points_for_label(label))
+            else:
+                results[i] = ai_classify(leads[i], offer)
 
-    points = 50 if label=="High" else 30 if label=="Medium" else 10
-    return label, reasoning, points
+    return results
 
 # -------------------------
 # Quick demo
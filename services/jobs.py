@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from services.process_scoring import score_into
+from utils.lead_store import ResultStore
+from utils.storage import storage
+
+# -------------------------
+# Environment variables
+# -------------------------
+# Scoring jobs run at the same time in one process; each still uses SCORE_MAX_WORKERS threads
+SCORE_JOB_WORKERS = int(os.getenv("SCORE_JOB_WORKERS", "2"))
+# Finished jobs kept around for GET /score/jobs/<id>
+SCORE_JOB_HISTORY = int(os.getenv("SCORE_JOB_HISTORY", "20"))
+# How often a deadline-bounded /score run copies finished AI scores over its provisional results
+PROVISIONAL_FLUSH_SECONDS = float(os.getenv("PROVISIONAL_FLUSH_SECONDS", "1"))
+# How often those copies are also persisted where that rewrites all results (the memory snapshot)
+PROVISIONAL_PERSIST_SECONDS = float(os.getenv("PROVISIONAL_PERSIST_SECONDS", "30"))
+# How often a running job writes its progress to storage, where every worker process can read it
+SCORE_JOB_SYNC_SECONDS = float(os.getenv("SCORE_JOB_SYNC_SECONDS", "1"))
+
+_executor = ThreadPoolExecutor(max_workers=SCORE_JOB_WORKERS, thread_name_prefix="score-job")
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+class ScoringJob:
+    """
+    A background scoring run whose results fill in as leads are scored.
+
+    The job's progress is synced to storage at least every
+    SCORE_JOB_SYNC_SECONDS, so other worker processes can report it, and a
+    cancel they request there stops the job at its next sync.
+    """
+
+    def __init__(self, leads, offer, max_workers: Optional[int] = None, cascade: Optional[str] = None,
+                 previous=None, incremental: Optional[bool] = None):
+        self.id = uuid.uuid4().hex
+        self.leads = leads
+        self.offer = offer
+        self.max_workers = max_workers
+        self.cascade = cascade
+        self.previous = previous
+        self.incremental = incremental
+        self.stats = {}
+        self.total = len(leads)
+        self.results = ResultStore(leads)
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Storage results generation this job's results were published under
+        self.results_generation = None
+        self._synced_at = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "cancelled", "failed")
+
+    def cancel(self) -> bool:
+        """Ask the job to stop; returns False if it had already finished"""
+        if self.finished:
+            return False
+        self._cancel.set()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished or ``timeout`` seconds passed; returns whether it finished"""
+        return self._finished.wait(timeout)
+
+    def sync(self, force: bool = False) -> None:
+        """Write the job's progress record to storage, at most every SCORE_JOB_SYNC_SECONDS unless forced"""
+        now = time.monotonic()
+        if not force and self._synced_at is not None and now - self._synced_at < SCORE_JOB_SYNC_SECONDS:
+            return
+        self._synced_at = now
+        try:
+            if storage.sync_job_record(self.id, dict(self.progress(), results_generation=self.results_generation)):
+                self._cancel.set()
+        except Exception:
+            # Other workers see a stale record; this process still tracks the job itself
+            pass
+
+    def _cancelled(self) -> bool:
+        self.sync()
+        return self._cancel.is_set()
+
+    def run(self, on_complete: Optional[Callable[["ScoringJob"], None]] = None) -> None:
+        if self._cancel.is_set():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+            self.sync(force=True)
+            self._finished.set()
+            return
+
+        self.status = "running"
+        self.started_at = time.time()
+        self.sync(force=True)
+        try:
+            score_into(
+                self.results, self.leads, self.offer, max_workers=self.max_workers, cascade=self.cascade,
+                stats=self.stats, previous=self.previous, incremental=self.incremental, cancelled=self._cancelled
+            )
+            if self._cancel.is_set():
+                self.status = "cancelled"
+            else:
+                if on_complete is not None:
+                    on_complete(self)
+                self.status = "completed"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.previous = None
+            self.finished_at = time.time()
+            self.sync(force=True)
+            self._finished.set()
+
+    def progress(self) -> dict:
+        done = self.done
+        started = self.started_at
+        elapsed = ((self.finished_at or time.time()) - started) if started else 0.0
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.status == "running" and throughput > 0:
+            eta = round((self.total - done) / throughput, 1)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "done": done,
+            "total": self.total,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(throughput, 2),
+            "eta_seconds": eta,
+            "cascade": dict(self.stats.get("cascade", {})),
+            "incremental": dict(self.stats.get("incremental", {})),
+            "dedupe": dict(self.stats.get("dedupe", {})),
+            "processes": self.stats.get("processes"),
+            "error": self.error
+        }
+
+
+class ResultUpgrader:
+    """
+    Copies a job's results over provisional ones as the job produces them.
+
+    ``results`` holds a provisional score for every lead; each flush passes
+    the rows the job finished since the last one to ``apply`` as (row,
+    intent, score, reasoning) tuples, plus whether to persist them (every
+    PROVISIONAL_PERSIST_SECONDS, and on the last flush). ``apply`` returns
+    False once ``results`` is no longer the stored run, which cancels the job.
+    """
+
+    def __init__(self, job: ScoringJob, results: ResultStore, apply: Callable[[list, bool], bool]):
+        self.job = job
+        self.results = results
+        self.apply = apply
+        self.copied = 0
+        self._thread = None
+        self._persisted_at = time.monotonic()
+
+    def pending(self) -> list:
+        """Rows the job finished since the last flush, as update tuples"""
+        done, rows = self.job.done, self.job.results
+        updates = [(row, rows[row]["intent"], rows[row]["score"], rows[row]["reasoning"])
+                   for row in range(self.copied, done)]
+        self.copied = done
+        return updates
+
+    def flush(self, last: bool = False) -> bool:
+        """Apply pending rows; returns False if the results were superseded"""
+        updates = self.pending()
+        if not updates:
+            return True
+        persist = last or time.monotonic() - self._persisted_at >= PROVISIONAL_PERSIST_SECONDS
+        if not self.apply(updates, persist):
+            self.job.cancel()
+            return False
+        if persist:
+            self._persisted_at = time.monotonic()
+        return True
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"upgrade-{self.job.id[:8]}", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            # Read before flushing, so the last flush sees every row the job wrote
+            finished = self.job.wait(PROVISIONAL_FLUSH_SECONDS)
+            try:
+                if not self.flush(last=finished):
+                    return
+                if finished:
+                    # Other workers serve the job's rows once its record carries the upgraded generation
+                    self.job.sync(force=True)
+                    return
+            except Exception:
+                # Storage failed: leave the remaining rows provisional
+                self.job.cancel()
+                return
+
+
+def submit_job(leads, offer, max_workers: Optional[int] = None,
+               on_complete: Optional[Callable[[ScoringJob], None]] = None,
+               cascade: Optional[str] = None, previous=None, incremental: Optional[bool] = None) -> ScoringJob:
+    """Queue a scoring job on the background executor"""
+    job = ScoringJob(leads, offer, max_workers=max_workers, cascade=cascade,
+                     previous=previous, incremental=incremental)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        _prune_finished()
+    job.sync(force=True)
+    _executor.submit(job.run, on_complete)
+    return job
+
+
+def get_job(job_id: str) -> Optional[ScoringJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _prune_finished() -> None:
+    finished = [job_id for job_id, job in _jobs.items() if job.finished]
+    for job_id in finished[:max(0, len(finished) - SCORE_JOB_HISTORY)]:
+        del _jobs[job_id]
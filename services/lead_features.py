@@ -0,0 +1,178 @@
+import re
+from collections.abc import Mapping
+from typing import Iterator, Optional
+
+# Decision maker roles (+20 points)
+DECISION_MAKER_KEYWORDS = [
+    "ceo", "cto", "cfo", "coo", "chief", "founder", "president",
+    "head of", "vp", "vice president", "director"
+]
+
+# Influencer roles (+10 points)
+INFLUENCER_KEYWORDS = [
+    "manager", "lead", "senior", "principal", "team lead"
+]
+
+# Adjacent industries (+10 points)
+ADJACENT_INDUSTRY_KEYWORDS = ["tech", "technology", "software", "b2b", "saas"]
+
+REQUIRED_FIELDS = ["name", "role", "company", "industry", "location", "linkedin_bio"]
+
+# Signals the mock classifier reads (services.ai.mock_ai)
+MOCK_DECISION_MAKER_KEYWORDS = ["ceo", "founder", "cto", "cxo", "head", "vp", "director"]
+MOCK_INFLUENCER_KEYWORDS = ["manager", "lead", "senior"]
+MOCK_BIO_KEYWORDS = ["growth", "sales", "revops", "outreach", "marketing"]
+
+# One bit per keyword group a lead matches
+ROLE_DECISION_MAKER = 1 << 0
+ROLE_INFLUENCER = 1 << 1
+MOCK_ROLE_DECISION_MAKER = 1 << 2
+MOCK_ROLE_INFLUENCER = 1 << 3
+INDUSTRY_ADJACENT = 1 << 4
+INDUSTRY_SAAS_SOFTWARE = 1 << 5
+INDUSTRY_SAAS_B2B_SOFTWARE = 1 << 6
+BIO_MOCK_KEYWORD = 1 << 7
+COMPLETE = 1 << 8
+
+# Stored for a lead whose features couldn't be extracted (e.g. a non-string role); scorers re-read the lead
+NO_FEATURES = 0xFFFF
+
+
+def compile_keywords(keywords):
+    """
+    Compile a keyword list into one alternation regex.
+
+    ``pattern.search(text)`` is equivalent to ``any(k in text for k in keywords)``.
+    Returns None for an empty list, which must never match.
+    """
+    keywords = sorted(set(keywords), key=len, reverse=True)
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+_DECISION_MAKER_RE = compile_keywords(DECISION_MAKER_KEYWORDS)
+_INFLUENCER_RE = compile_keywords(INFLUENCER_KEYWORDS)
+_MOCK_DECISION_MAKER_RE = compile_keywords(MOCK_DECISION_MAKER_KEYWORDS)
+_MOCK_INFLUENCER_RE = compile_keywords(MOCK_INFLUENCER_KEYWORDS)
+_ADJACENT_INDUSTRY_RE = compile_keywords(ADJACENT_INDUSTRY_KEYWORDS)
+_SAAS_SOFTWARE_RE = compile_keywords(["saas", "software"])
+_SAAS_B2B_SOFTWARE_RE = compile_keywords(["saas", "b2b", "software"])
+_MOCK_BIO_RE = compile_keywords(MOCK_BIO_KEYWORDS)
+
+_ROLE_GROUPS = (
+    (_DECISION_MAKER_RE, ROLE_DECISION_MAKER), (_INFLUENCER_RE, ROLE_INFLUENCER),
+    (_MOCK_DECISION_MAKER_RE, MOCK_ROLE_DECISION_MAKER), (_MOCK_INFLUENCER_RE, MOCK_ROLE_INFLUENCER),
+)
+_INDUSTRY_GROUPS = (
+    (_ADJACENT_INDUSTRY_RE, INDUSTRY_ADJACENT), (_SAAS_SOFTWARE_RE, INDUSTRY_SAAS_SOFTWARE),
+    (_SAAS_B2B_SOFTWARE_RE, INDUSTRY_SAAS_B2B_SOFTWARE),
+)
+
+
+def _matched(text: str, groups) -> int:
+    flags = 0
+    for pattern, bit in groups:
+        if pattern.search(text):
+            flags |= bit
+    return flags
+
+
+def role_features(role: Optional[str]) -> int:
+    """Bits of the role keyword groups (rules and mock) found in ``role``"""
+    return _matched((role or "").lower(), _ROLE_GROUPS)
+
+
+def industry_features(industry: Optional[str]) -> int:
+    """Bits of the offer-independent industry keyword groups found in ``industry``"""
+    return _matched((industry or "").lower(), _INDUSTRY_GROUPS)
+
+
+def bio_features(bio: Optional[str]) -> int:
+    """BIO_MOCK_KEYWORD if the bio mentions a mock bio keyword; non-string bios count as empty"""
+    return BIO_MOCK_KEYWORD if isinstance(bio, str) and _MOCK_BIO_RE.search(bio.lower()) else 0
+
+
+def is_complete(lead: Mapping) -> bool:
+    """Every required field present and not blank"""
+    for field in REQUIRED_FIELDS:
+        value = lead.get(field)
+        if not value or not str(value).strip():
+            return False
+    return True
+
+
+def lead_features(lead: Mapping) -> int:
+    """
+    Feature bitmask of a lead: every keyword group the rules or the mock
+    classifier check, from one lowercase pass over role, industry and bio.
+
+    Raises like the scorers do (AttributeError) for a non-string role or industry.
+    """
+    flags = role_features(lead.get("role")) | industry_features(lead.get("industry"))
+    flags |= bio_features(lead.get("linkedin_bio"))
+    return flags | COMPLETE if is_complete(lead) else flags
+
+
+class FeatureExtractor:
+    """
+    lead_features with the role and industry parts memoised per distinct
+    value, since those columns repeat a lot. Returns NO_FEATURES instead of
+    raising, so it can run at upload time. Not thread-safe beyond the GIL's
+    atomic dict updates, which is all it needs.
+    """
+
+    # Distinct values remembered per column before the memo starts over
+    MAX_MEMO = 65536
+
+    __slots__ = ("_roles", "_industries")
+
+    def __init__(self):
+        self._roles = {}
+        self._industries = {}
+
+    def __call__(self, lead: Mapping) -> int:
+        role, industry = lead.get("role"), lead.get("industry")
+        if len(self._roles) >= self.MAX_MEMO or len(self._industries) >= self.MAX_MEMO:
+            self._roles, self._industries = {}, {}
+        try:
+            flags = self._roles.get(role)
+            if flags is None:
+                flags = self._roles[role] = role_features(role)
+            industry_flags = self._industries.get(industry)
+            if industry_flags is None:
+                industry_flags = self._industries[industry] = industry_features(industry)
+            flags |= industry_flags | bio_features(lead.get("linkedin_bio"))
+        except (AttributeError, TypeError):
+            return NO_FEATURES
+        return flags | COMPLETE if is_complete(lead) else flags
+
+
+def features_of(lead: Mapping) -> int:
+    """The feature bitmask stored with a lead (``lead.features``), or extracted now if it has none"""
+    features = getattr(lead, "features", None)
+    if features is None or features == NO_FEATURES:
+        return lead_features(lead)
+    return features
+
+
+class FeaturedLead(Mapping):
+    """A lead paired with its feature bitmask, for leads stored without one"""
+
+    __slots__ = ("_lead", "features")
+
+    def __init__(self, lead: Mapping, features: int):
+        self._lead = lead
+        self.features = features
+
+    def get(self, field, default=None):
+        return self._lead.get(field, default)
+
+    def __getitem__(self, field):
+        return self._lead[field]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._lead)
+
+    def __len__(self) -> int:
+        return len(self._lead)
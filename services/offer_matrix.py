@@ -0,0 +1,110 @@
+from array import array
+from typing import Optional, Sequence
+
+import numpy as np
+
+from services.ai import is_remote_provider, points_for_label
+from services.lead_features import (
+    ADJACENT_INDUSTRY_KEYWORDS, DECISION_MAKER_KEYWORDS, INFLUENCER_KEYWORDS, MOCK_BIO_KEYWORDS,
+    MOCK_DECISION_MAKER_KEYWORDS, MOCK_INFLUENCER_KEYWORDS, REQUIRED_FIELDS
+)
+from services.rules import _contains_any, _factorize, _icp_keywords, _text_column
+from services.scoring import score_leads
+from utils.lead_store import ScoreMatrix
+
+
+class LeadFeatures:
+    """
+    Offer-independent signals of every lead, computed once and shared by all offers.
+
+    Role tier, data completeness and the mock classifier's role/bio keyword
+    hits don't read the offer, so only the ICP industry match is left per
+    offer, and that runs over distinct industries rather than leads. Raises
+    TypeError for non-string text columns, like calculate_rule_scores_batch.
+    """
+
+    def __init__(self, leads: Sequence[dict]):
+        roles, role_index = _text_column(leads, "role")
+        self.role_points = np.where(
+            _contains_any(roles, DECISION_MAKER_KEYWORDS), 20,
+            np.where(_contains_any(roles, INFLUENCER_KEYWORDS), 10, 0)
+        )[role_index]
+
+        complete = np.ones(len(leads), dtype=bool)
+        for field in REQUIRED_FIELDS:
+            values, inverse = _factorize(leads, field)
+            complete &= np.array([bool(value and str(value).strip()) for value in values], dtype=bool)[inverse]
+        self.completeness_points = np.where(complete, 10, 0)
+
+        # Kept per distinct industry: the ICP match against each offer runs over these
+        self.industries, self.industry_index = _text_column(leads, "industry")
+        self.adjacent = _contains_any(self.industries, ADJACENT_INDUSTRY_KEYWORDS)
+
+        # mock_ai's label depends on the role and bio only; the offer just changes its wording
+        bios, bio_index = _text_column(leads, "linkedin_bio")
+        medium = (_contains_any(roles, MOCK_INFLUENCER_KEYWORDS)[role_index]
+                  | _contains_any(bios, MOCK_BIO_KEYWORDS)[bio_index])
+        self.ai_points = np.where(
+            _contains_any(roles, MOCK_DECISION_MAKER_KEYWORDS)[role_index], points_for_label("High"),
+            np.where(medium, points_for_label("Medium"), points_for_label("Low"))
+        )
+
+    def scores(self, offer: dict) -> np.ndarray:
+        """Final score (rules + mock AI) of every lead against one offer"""
+        try:
+            icp = _contains_any(self.industries, _icp_keywords(offer.get("ideal_use_cases", [])))
+        except Exception:
+            # score_lead reports every lead of an offer it can't read as an error scoring 0
+            return np.zeros(len(self.role_points), dtype=np.int64)
+        industry_points = np.where(icp, 20, np.where(self.adjacent, 10, 0))[self.industry_index]
+        rule_scores = np.minimum(self.role_points + industry_points + self.completeness_points, 50)
+        return rule_scores + self.ai_points
+
+
+def score_matrix(leads: Sequence[dict], offers: Sequence[dict], stats: Optional[dict] = None) -> ScoreMatrix:
+    """
+    Score every lead against every offer (named by ``offer["name"]``) in one pass.
+
+    With the local mock provider the offer-independent work is shared through
+    LeadFeatures; a remote provider, or leads the vectorised path can't handle,
+    runs score_leads once per offer instead. Scores match score_leads either way,
+    including leads indexed as duplicates at upload, which take their first
+    copy's scores.
+    """
+    stats = {} if stats is None else stats
+    # Every feature is another pass over the leads, so read a storage view only once
+    rows = leads if hasattr(leads, "factorize") else list(leads)
+    columns = None
+    if not is_remote_provider():
+        try:
+            features = LeadFeatures(rows)
+            columns = [features.scores(offer) for offer in offers]
+            stats["path"] = "shared_features"
+        except TypeError:
+            columns = None
+    if columns is None:
+        columns = [_scored_column(rows, offer) for offer in offers]
+        stats["path"] = "per_offer"
+
+    matrix = np.column_stack(columns) if offers and len(leads) else np.zeros((len(leads), len(offers)), np.int64)
+    dedupe = getattr(leads, "dedupe", None)
+    if dedupe is not None and dedupe.duplicates:
+        # Fanned out like scoring._fan_out; rows appended after the index was read stay their own
+        canonical = np.arange(len(leads))
+        indexed = np.asarray(dedupe.canonical[:len(leads)], dtype=np.intp)
+        canonical[:len(indexed)] = indexed
+        matrix = matrix[canonical]
+    # argmax picks the first offer among equal scores
+    best = matrix.argmax(axis=1) if offers else np.zeros(len(leads), dtype=np.intp)
+    best_scores = matrix[np.arange(len(leads)), best] if offers else np.zeros(len(leads), dtype=np.int64)
+    return ScoreMatrix(
+        leads, [offer["name"] for offer in offers],
+        array("B", matrix.astype(np.uint8).tobytes()),
+        array("I", best.astype(np.uint32).tobytes()),
+        array("H", best_scores.astype(np.uint16).tobytes())
+    )
+
+
+def _scored_column(leads: Sequence[dict], offer: dict) -> np.ndarray:
+    results = score_leads(leads, offer, incremental=False)
+    return np.fromiter((result["score"] for result in results), dtype=np.int64, count=len(results))
@@ -0,0 +1,251 @@
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+import numpy as np
+
+from services.ai import is_remote_provider
+from services.lead_features import FeatureExtractor, FeaturedLead
+from services.scoring import (
+    CASCADE_MODES, LEADS_SCORED, SCORE_INCREMENTAL, _finish, _start_run, _timed_rule_score, batch_rule_scores,
+    compile_offer, iter_score_leads, run_fingerprints, score_lead
+)
+from utils.lead_store import InternedColumn, LeadStore, ResultStore, ScoreInputs, lead_fingerprint
+from utils.shared_columns import SharedLeadColumns, SharedLeadReader
+
+# -------------------------
+# Environment variables
+# -------------------------
+# Worker processes for scoring large uploads with a local (CPU-bound) provider. 0 = one per CPU, 1 = off
+SCORE_PROCESSES = int(os.getenv("SCORE_PROCESSES", "0"))
+# Smaller uploads stay on threads; starting the pool and sharing the columns isn't worth it for them
+SCORE_PROCESS_MIN_LEADS = int(os.getenv("SCORE_PROCESS_MIN_LEADS", "20000"))
+# Row ranges handed out per worker process, so a slow range doesn't leave the others idle
+SCORE_PROCESS_BLOCKS_PER_WORKER = max(1, int(os.getenv("SCORE_PROCESS_BLOCKS_PER_WORKER", "4")))
+
+# Leads sampled to tell whether a previous run scored any of an upload
+REUSE_SAMPLE_LEADS = 64
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def process_count() -> int:
+    """Worker processes to score with, 1 when process scoring is off"""
+    return max(1, SCORE_PROCESSES or os.cpu_count() or 1)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process-wide worker pool, started on first use and again after a fork"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # Forking a threaded server is unsafe, so workers come from a clean forkserver
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                _pool, _pool_pid = ProcessPoolExecutor(max_workers=process_count(), mp_context=context), os.getpid()
+    return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a pool whose worker died, so the next run starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def use_processes(leads, previous=None, incremental: Optional[bool] = None, offer: Optional[dict] = None) -> bool:
+    """
+    Whether a run should be scored in worker processes: a large in-memory
+    upload, a local provider, and no previous run whose results could be reused.
+    """
+    if process_count() <= 1 or not isinstance(leads, LeadStore) or len(leads) < SCORE_PROCESS_MIN_LEADS:
+        return False
+    if is_remote_provider():
+        # Remote scoring waits on the network, which threads already overlap
+        return False
+    incremental = SCORE_INCREMENTAL if incremental is None else incremental
+    return not (incremental and _reusable(leads, previous, offer))
+
+
+def _reusable(leads, previous, offer: Optional[dict]) -> bool:
+    """
+    Whether an incremental run could reuse anything from ``previous``: it
+    recorded inputs, one of its offer fingerprints matches (when ``offer`` is
+    given) and it scored some of an evenly spaced sample of the leads.
+    """
+    inputs = getattr(previous, "inputs", None)
+    if inputs is None or not len(inputs):
+        return False
+    if offer is not None:
+        # Local providers only, so the cascade is off
+        rules_fingerprint, ai_fingerprint = run_fingerprints(offer, "off")
+        if inputs.rules_fingerprint != rules_fingerprint and inputs.ai_fingerprint != ai_fingerprint:
+            return False
+    step = max(1, len(leads) // REUSE_SAMPLE_LEADS)
+    sample = np.array([lead_fingerprint(leads[row]) for row in range(0, len(leads), step)], dtype=np.uint64)
+    return bool(np.isin(sample, np.frombuffer(inputs.fingerprints, dtype=np.uint64)).any())
+
+
+def _score_block(path: str, layout: dict, size: int, offer: dict, start: int, stop: int,
+                 canonical: Optional[list], record_inputs: bool) -> tuple:
+    """
+    Score rows ``start`` to ``stop`` of a shared lead file in a worker process.
+
+    Returns the block's results as columns (intents, scores, reasonings), the
+    fingerprints and rule scores to record, the duplicates whose first copy
+    lies in an earlier block as (offset, first row), and the duplicate count.
+    """
+    reader = SharedLeadReader(path, layout, size)
+    try:
+        leads = list(reader.rows(start, stop))
+    finally:
+        reader.close()
+    scorer = compile_offer(offer)
+    featurize = FeatureExtractor()
+    rule_scores = batch_rule_scores(leads, offer) or [None] * len(leads)
+
+    intents, scores, reasonings = InternedColumn(), array("H"), InternedColumn()
+    fingerprints, recorded = array("Q"), array("H")
+    earlier, duplicates = [], 0
+    for offset, (lead, rule_score) in enumerate(zip(leads, rule_scores)):
+        first = canonical[offset] if canonical is not None else start + offset
+        if first != start + offset:
+            duplicates += 1
+            if first >= start:
+                intents.append(intents[first - start])
+                scores.append(scores[first - start])
+                reasonings.append(reasonings[first - start])
+            else:
+                # Filled in by the parent once the earlier block is merged
+                earlier.append((offset, first))
+                intents.append("Low")
+                scores.append(0)
+                reasonings.append("")
+            if record_inputs:
+                fingerprints.append(lead_fingerprint(lead))
+                recorded.append(ScoreInputs.NO_RULE_SCORE)
+            continue
+        lead = FeaturedLead(lead, featurize(lead))
+        try:
+            if rule_score is None:
+                rule_score = _timed_rule_score(lead, offer, scorer)
+        except Exception:
+            # Let score_lead report the error for this lead
+            pass
+        if record_inputs:
+            fingerprints.append(lead_fingerprint(lead))
+            recorded.append(ScoreInputs.NO_RULE_SCORE if rule_score is None else rule_score)
+        result = score_lead(lead, offer, scorer, rule_score=rule_score)
+        intents.append(result["intent"])
+        scores.append(result["score"])
+        reasonings.append(result["reasoning"])
+    return intents, scores, reasonings, fingerprints, recorded, earlier, duplicates
+
+
+def _merge_block(results: ResultStore, inputs: Optional[ScoreInputs], block: tuple) -> int:
+    """Append one worker's block to the results; returns its duplicate count"""
+    intents, scores, reasonings, fingerprints, recorded, earlier, duplicates = block
+    for offset, first in earlier:
+        original = results[first]
+        intents.codes[offset] = intents.code(original["intent"])
+        scores[offset] = original["score"]
+        reasonings.codes[offset] = reasonings.code(original["reasoning"])
+    if inputs is not None:
+        # Same order as ScoreInputs.append: the length follows fingerprints
+        inputs.rule_scores.extend(recorded)
+        inputs.fingerprints.extend(fingerprints)
+    results.extend_columns(intents, scores, reasonings)
+    for code, intent in enumerate(intents.values):
+        LEADS_SCORED.inc(intents.codes.count(code), intent=intent)
+    return duplicates
+
+
+def _score_in_processes(results: ResultStore, leads: LeadStore, offer: dict, shared: SharedLeadColumns,
+                        stats: dict, incremental: bool, cancelled: Optional[Callable[[], bool]]) -> None:
+    inputs, canonical = _start_run(leads, offer, "off", incremental, stats, results.inputs)
+    workers = process_count()
+    stats["processes"] = workers
+    size = shared.size
+    block = max(1, -(-size // (workers * SCORE_PROCESS_BLOCKS_PER_WORKER)))
+    blocks = [
+        (shared.path, shared.layout, size, offer, start, min(size, start + block),
+         list(canonical[start:start + block]) if canonical is not None else None, inputs is not None)
+        for start in range(0, size, block)
+    ]
+    pool = _get_pool()
+    futures = []
+    try:
+        try:
+            for args in blocks:
+                futures.append(pool.submit(_score_block, *args))
+        except BrokenProcessPool:
+            _drop_pool(pool)
+        # Blocks are merged in row order, so results fill in front to back like the threaded path
+        for number, args in enumerate(blocks):
+            scored = None
+            if number < len(futures):
+                try:
+                    scored = futures[number].result()
+                except BrokenProcessPool:
+                    _drop_pool(pool)
+            if scored is None:
+                # A worker died (killed for memory, say): this process scores the blocks left
+                stats["processes"] = 1
+                scored = _score_block(*args)
+            stats["dedupe"]["duplicates"] += _merge_block(results, inputs, scored)
+            if cancelled is not None and cancelled():
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+        shared.close()
+        _finish(stats)
+
+
+def score_into(results: ResultStore, leads, offer: dict, max_workers: Optional[int] = None,
+               cascade: Optional[str] = None, stats: Optional[dict] = None, previous=None,
+               incremental: Optional[bool] = None, cancelled: Optional[Callable[[], bool]] = None) -> None:
+    """
+    Score every lead into ``results``, in worker processes when use_processes()
+    allows it and on threads (iter_score_leads) otherwise.
+
+    Worker processes read the leads from a memory-mapped copy of their columns
+    (SharedLeadColumns) and each score a contiguous range of rows; if the pool
+    breaks, the blocks it didn't return are scored in this process. Scoring
+    stops early, between leads or blocks, once ``cancelled()`` returns True.
+    """
+    if cascade is not None and cascade not in CASCADE_MODES:
+        raise ValueError(f"cascade must be one of {', '.join(CASCADE_MODES)}")
+    stats = {} if stats is None else stats
+    if use_processes(leads, previous, incremental, offer):
+        try:
+            shared = SharedLeadColumns(leads)
+        except (TypeError, ValueError):
+            # Non-string (or unencodable) text values; the threaded path handles anything
+            shared = None
+        if shared is not None:
+            incremental = SCORE_INCREMENTAL if incremental is None else incremental
+            _score_in_processes(results, leads, offer, shared, stats, incremental, cancelled)
+            return
+
+    stats["processes"] = 1
+    scored = iter_score_leads(
+        leads, offer, max_workers=max_workers, cascade=cascade, stats=stats,
+        previous=previous, inputs=results.inputs, incremental=incremental
+    )
+    try:
+        for result in scored:
+            results.extend([result])
+            if cancelled is not None and cancelled():
+                break
+    finally:
+        scored.close()
@@ -1,3 +1,14 @@
+import hashlib
+import json
+
+import numpy as np
+
+from services.lead_features import (
+    ADJACENT_INDUSTRY_KEYWORDS, COMPLETE, DECISION_MAKER_KEYWORDS, INDUSTRY_ADJACENT, INFLUENCER_KEYWORDS,
+    REQUIRED_FIELDS, ROLE_DECISION_MAKER, ROLE_INFLUENCER, compile_keywords, features_of
+)
+
+
 def calculate_rule_score(lead, offer):
     """
     Calculate rule-based score for a lead (max 50 points)
@@ -14,20 +25,9 @@ def calculate_rule_score(lead, offer):
     # Role relevance (0-20 points)
     role = (lead.get("role") or "").lower()
     
-    # Decision maker roles (+20 points)
-    decision_maker_keywords = [
-        "ceo", "cto", "cfo", "coo", "chief", "founder", "president", 
-        "head of", "vp", "vice president", "director"
-    ]
-    
-    # Influencer roles (+10 points)
-    influencer_keywords = [
-        "manager", "lead", "senior", "principal", "team lead"
-    ]
-    
-    if any(keyword in role for keyword in decision_maker_keywords):
+    if any(keyword in role for keyword in DECISION_MAKER_KEYWORDS):
         score += 20
-    elif any(keyword in role for keyword in influencer_keywords):
+    elif any(keyword in role for keyword in INFLUENCER_KEYWORDS):
         score += 10
 
     # Industry match (0-20 points)
@@ -35,20 +35,154 @@ def calculate_rule_score(lead, offer):
     ideal_use_cases = offer.get("ideal_use_cases", [])
     
     # Convert ideal use cases to lowercase for matching
-    icp_keywords = []
-    for use_case in ideal_use_cases:
-        icp_keywords.extend(use_case.lower().split())
+    icp_keywords = _icp_keywords(ideal_use_cases)
     
     # Exact ICP match (+20 points)
     if any(keyword in industry for keyword in icp_keywords):
         score += 20
     # Adjacent industry match (+10 points)
-    elif any(word in industry for word in ["tech", "technology", "software", "b2b", "saas"]):
+    elif any(word in industry for word in ADJACENT_INDUSTRY_KEYWORDS):
         score += 10
 
     # Data completeness (0-10 points)
-    required_fields = ["name", "role", "company", "industry", "location", "linkedin_bio"]
-    if all(lead.get(field) and str(lead.get(field)).strip() for field in required_fields):
+    if all(lead.get(field) and str(lead.get(field)).strip() for field in REQUIRED_FIELDS):
         score += 10
 
     return min(score, 50)  # Ensure max score is 50
+
+
+def _icp_keywords(ideal_use_cases):
+    icp_keywords = []
+    for use_case in ideal_use_cases:
+        icp_keywords.extend(use_case.lower().split())
+    return icp_keywords
+
+
+def rules_offer_fingerprint(offer):
+    """Hash of the offer fields rule scores depend on (only ideal_use_cases)"""
+    payload = json.dumps(offer.get("ideal_use_cases", []), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Distinct industries a RuleScorer remembers ICP matches for before starting over
+_ICP_MEMO_SIZE = 65536
+
+
+class RuleScorer:
+    """
+    Rule scoring compiled once per offer and reused for every lead.
+
+    Gives exactly the same scores as calculate_rule_score, but the ICP keyword
+    list is built once and each keyword group is a single regex scan. The
+    offer-independent checks come from the lead's feature bitmask
+    (services.lead_features), so only the ICP match is left per offer, and
+    that is remembered per distinct industry.
+    """
+
+    __slots__ = ("icp_re", "_icp_matches")
+
+    def __init__(self, offer):
+        self.icp_re = compile_keywords(_icp_keywords(offer.get("ideal_use_cases", [])))
+        self._icp_matches = {}
+
+    def icp_match(self, industry):
+        """Whether the raw ``lead["industry"]`` matches this offer's ICP keywords"""
+        matched = self._icp_matches.get(industry)
+        if matched is None:
+            if len(self._icp_matches) >= _ICP_MEMO_SIZE:
+                self._icp_matches.clear()
+            matched = self.icp_re is not None and self.icp_re.search((industry or "").lower()) is not None
+            self._icp_matches[industry] = matched
+        return matched
+
+    def score(self, lead):
+        """Rule-based score for a lead (0-50)"""
+        features = features_of(lead)
+        score = 20 if features & ROLE_DECISION_MAKER else 10 if features & ROLE_INFLUENCER else 0
+        if self.icp_match(lead.get("industry")):
+            score += 20
+        elif features & INDUSTRY_ADJACENT:
+            score += 10
+        if features & COMPLETE:
+            score += 10
+        return min(score, 50)
+
+
+def _contains_any(values, keywords):
+    """Vectorised ``any(k in value for k in keywords)`` over a str array"""
+    mask = np.zeros(values.shape, dtype=bool)
+    for keyword in keywords:
+        mask |= np.char.find(values, keyword) >= 0
+    return mask
+
+
+def _factorize(leads, field):
+    """
+    Split ``lead.get(field)`` over all leads into (distinct values, inverse index).
+
+    Lead columns repeat a lot, so per-value work only runs over the distinct
+    values and is then gathered back to one entry per lead. A LeadStore already
+    keeps its low-cardinality columns factorised.
+    """
+    if hasattr(leads, "factorize"):
+        values, codes = leads.factorize(field)
+        return values, np.frombuffer(codes, dtype=np.uint32).astype(np.intp)
+
+    codes = {}
+    inverse = np.fromiter(
+        (codes.setdefault(lead.get(field), len(codes)) for lead in leads),
+        dtype=np.intp, count=len(leads)
+    )
+    return list(codes), inverse
+
+
+def _text_column(leads, field):
+    """Lowercased ``(lead.get(field) or "")`` as (distinct values array, inverse index)"""
+    values, inverse = _factorize(leads, field)
+    values = [value or "" for value in values]
+    if not all(isinstance(value, str) for value in values):
+        # The scalar path raises on .lower() here; let the caller fall back to it
+        raise TypeError(f"{field} must be a string")
+    # Lowercased before the fixed-width array is sized: some characters grow (e.g. "İ" -> "i̇")
+    return np.array([value.lower() for value in values], dtype=str), inverse
+
+
+def calculate_rule_scores_batch(leads, offer):
+    """
+    Vectorised calculate_rule_score over many leads at once
+
+    Args:
+        leads (list): Lead dicts
+        offer (dict): Offer/product information
+
+    Returns:
+        numpy.ndarray: Rule-based score (0-50) per lead, in input order
+    """
+    count = len(leads)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Role relevance (0-20 points)
+    roles, role_index = _text_column(leads, "role")
+    role_points = np.where(
+        _contains_any(roles, DECISION_MAKER_KEYWORDS), 20,
+        np.where(_contains_any(roles, INFLUENCER_KEYWORDS), 10, 0)
+    )
+
+    # Industry match (0-20 points)
+    industries, industry_index = _text_column(leads, "industry")
+    icp_keywords = _icp_keywords(offer.get("ideal_use_cases", []))
+    industry_points = np.where(
+        _contains_any(industries, icp_keywords), 20,
+        np.where(_contains_any(industries, ADJACENT_INDUSTRY_KEYWORDS), 10, 0)
+    )
+
+    # Data completeness (0-10 points)
+    complete = np.ones(count, dtype=bool)
+    for field in REQUIRED_FIELDS:
+        values, inverse = _factorize(leads, field)
+        filled = np.array([bool(value and str(value).strip()) for value in values], dtype=bool)
+        complete &= filled[inverse]
+
+    scores = role_points[role_index] + industry_points[industry_index] + np.where(complete, 10, 0)
+    return np.minimum(scores, 50).astype(np.int64)
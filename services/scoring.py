@@ -0,0 +1,586 @@
+import itertools
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from services import ai, rules
+from services.ai import (
+    AI_LABELS, FALLBACK_REASONING_PREFIX, ai_classify, ai_classify_batch, batch_size, is_remote_provider,
+    mock_classify, points_for_label
+)
+from services.lead_features import FeatureExtractor, FeaturedLead
+from services.rules import RuleScorer, calculate_rule_score, calculate_rule_scores_batch
+from utils.lead_store import ScoreInputs, lead_fingerprint
+from utils.metrics import Counter, Histogram
+
+# -------------------------
+# Environment variables
+# -------------------------
+# Max number of leads classified at the same time. 1 keeps the old sequential loop.
+SCORE_MAX_WORKERS = int(os.getenv("SCORE_MAX_WORKERS", "8"))
+
+# Uploads with at least this many leads get their rule scores computed in one vectorised batch
+RULE_BATCH_THRESHOLD = int(os.getenv("RULE_BATCH_THRESHOLD", "5000"))
+
+# Cascade for remote providers: rules + mock_ai first, then only leads whose intent could still
+# change go to the provider. "off" sends every lead; "adjacent" keeps a lead local when every label
+# within one step of mock_ai's gives the same intent
+SCORE_CASCADE = os.getenv("SCORE_CASCADE", "off").lower()
+CASCADE_MODES = ("off", "adjacent")
+
+# Reuse the previous run's rule and AI results for leads (and offer fields) that haven't changed
+SCORE_INCREMENTAL = os.getenv("SCORE_INCREMENTAL", "true").lower() == "true"
+
+# Time the rule score of one lead in every N; a rule score is only a few microseconds
+RULE_TIMING_SAMPLE = max(1, int(os.getenv("RULE_TIMING_SAMPLE", "16")))
+
+RULE_SCORE_SECONDS = Histogram(
+    "scoring_rule_seconds_per_lead", "Rule-based scoring time per lead (scalar path sampled, batch path averaged)",
+    labelnames=("path",), buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+)
+LEADS_SCORED = Counter("scoring_leads", "Leads scored", labelnames=("intent",))
+CASCADE_LEADS = Counter("scoring_cascade_leads", "Leads routed by the scoring cascade", labelnames=("tier",))
+DUPLICATE_LEADS = Counter(
+    "scoring_duplicate_leads", "Duplicate leads given their first copy's result instead of being scored"
+)
+REUSED_LEADS = Counter(
+    "scoring_reused_leads", "Rule/AI results reused from the previous run instead of recomputed", labelnames=("part",)
+)
+
+_rule_timing_counter = itertools.count()
+
+
+def intent_for_score(final_score: int) -> str:
+    """Map a final 0-100 score onto the High/Medium/Low intent band"""
+    if final_score >= 70:
+        return "High"
+    elif final_score >= 40:
+        return "Medium"
+    return "Low"
+
+
+def score_range_for_intent(intent: str) -> tuple:
+    """(min, max) final score of an intent band, the inverse of intent_for_score"""
+    if intent == "High":
+        return 70, 100
+    if intent == "Medium":
+        return 40, 69
+    if intent == "Low":
+        return 0, 39
+    raise ValueError("intent must be one of: High, Medium, Low")
+
+
+def compile_offer(offer: dict) -> Optional[RuleScorer]:
+    """
+    Build the per-offer RuleScorer, or None if the offer can't be compiled
+    (e.g. non-string use cases), in which case each lead reports its own error.
+    """
+    try:
+        return RuleScorer(offer)
+    except Exception:
+        return None
+
+
+def batch_rule_scores(leads: Sequence[dict], offer: dict) -> Optional[list]:
+    """
+    Vectorised rule scores for large uploads, or None to score lead by lead
+    (small uploads, or input the batch path can't handle such as non-string roles).
+    """
+    if len(leads) < RULE_BATCH_THRESHOLD:
+        return None
+    try:
+        started = time.perf_counter()
+        scores = calculate_rule_scores_batch(leads, offer).tolist()
+    except Exception:
+        return None
+    RULE_SCORE_SECONDS.observe((time.perf_counter() - started) / len(leads), path="batch")
+    return scores
+
+
+def _timed_rule_score(lead: dict, offer: dict, scorer: Optional[RuleScorer]) -> int:
+    if next(_rule_timing_counter) % RULE_TIMING_SAMPLE:
+        return scorer.score(lead) if scorer is not None else calculate_rule_score(lead, offer)
+    started = time.perf_counter()
+    rule_score = scorer.score(lead) if scorer is not None else calculate_rule_score(lead, offer)
+    RULE_SCORE_SECONDS.observe(time.perf_counter() - started, path="scalar")
+    return rule_score
+
+
+def score_lead(lead: dict, offer: dict, scorer: Optional[RuleScorer] = None,
+               rule_score: Optional[int] = None, ai_result: Optional[tuple] = None) -> dict:
+    """
+    Score a single lead using rule-based + AI scoring.
+
+    Errors are caught here so one bad lead never aborts the whole run.
+    """
+    try:
+        # Calculate rule-based score (max 50 points)
+        if rule_score is None:
+            rule_score = _timed_rule_score(lead, offer, scorer)
+
+        # Get AI classification (max 50 points)
+        if ai_result is None:
+            ai_result = ai_classify(lead, offer)
+        ai_intent, ai_reasoning, ai_points = ai_result
+
+        final_score = rule_score + ai_points
+        return {
+            "name": lead.get("name", ""),
+            "role": lead.get("role", ""),
+            "company": lead.get("company", ""),
+            "intent": intent_for_score(final_score),
+            "score": final_score,
+            "reasoning": ai_reasoning
+        }
+    except Exception as e:
+        return _error_result(lead, e)
+
+
+def _error_result(lead: dict, error: Exception) -> dict:
+    return {
+        "name": lead.get("name", ""),
+        "role": lead.get("role", ""),
+        "company": lead.get("company", ""),
+        "intent": "Low",
+        "score": 0,
+        "reasoning": f"Error processing lead: {str(error)}"
+    }
+
+
+def score_provisionally(results, leads: Sequence[dict], offer: dict) -> None:
+    """
+    Fill an empty ResultStore with every lead's local score (rules + mock_ai),
+    all rows flagged provisional. Never calls the AI provider, so it takes
+    the same time whichever provider is configured.
+    """
+    scorer = compile_offer(offer)
+    rule_scores = batch_rule_scores(leads, offer)
+    featurize = FeatureExtractor()
+
+    def local_results():
+        for row, lead in enumerate(leads):
+            if getattr(lead, "features", None) is None:
+                lead = FeaturedLead(lead, featurize(lead))
+            try:
+                ai_result = mock_classify(lead, offer)
+            except Exception as e:
+                yield _error_result(lead, e)
+                continue
+            rule_score = rule_scores[row] if rule_scores is not None else None
+            yield score_lead(lead, offer, scorer, rule_score=rule_score, ai_result=ai_result)
+
+    results.extend(local_results())
+    results.provisional = bytearray(b"\x01") * len(results)
+
+
+def score_chunk(chunk: Sequence[tuple], offer: dict, scorer: Optional[RuleScorer] = None) -> List[dict]:
+    """
+    Score (lead, rule_score[, ai_result]) entries with a single batched AI request.
+
+    Entries that already carry an AI result (decided by the cascade) are not
+    sent. If the batch call itself blows up, each lead is classified on its own.
+    """
+    entries = [entry if len(entry) == 3 else (*entry, None) for entry in chunk]
+    pending = [i for i, entry in enumerate(entries) if entry[2] is None]
+    ai_results = [entry[2] for entry in entries]
+    if pending:
+        try:
+            for i, ai_result in zip(pending, ai_classify_batch([entries[i][0] for i in pending], offer)):
+                ai_results[i] = ai_result
+        except Exception:
+            pass
+    return [
+        score_lead(lead, offer, scorer, rule_score=rule_score, ai_result=ai_result)
+        for (lead, rule_score, _), ai_result in zip(entries, ai_results)
+    ]
+
+
+def cascade_decides(rule_score: int, mock_label: str, mode: str) -> bool:
+    """
+    Whether the intent of a lead with this rule score is settled without the remote model.
+
+    "adjacent" checks mock_ai's label and its neighbours, trusting the provider
+    not to disagree by two steps. (Checking every label would settle nothing:
+    with 10/30/50 AI points and 40/70 cut-offs, Low and High are always in
+    different bands.)
+    """
+    if mode != "adjacent":
+        return False
+    position = AI_LABELS.index(mock_label)
+    labels = AI_LABELS[max(0, position - 1):position + 2]
+    return len({intent_for_score(rule_score + points_for_label(label)) for label in labels}) == 1
+
+
+_LABEL_FOR_POINTS = {points_for_label(label): label for label in AI_LABELS}
+
+
+class PreviousRun:
+    """
+    A finished run's results looked up by lead fingerprint.
+
+    A lead seen before gets its old rule score back if the offer's rule
+    fingerprint is unchanged, and its old AI label/reasoning if the AI
+    fingerprint is unchanged. Failed rows, provider fallbacks and provisional
+    rows (still holding the mock's answer) never have their AI part reused.
+    """
+
+    def __init__(self, results, rules_fingerprint: str, ai_fingerprint: str):
+        inputs = results.inputs
+        size = min(len(inputs), len(results))
+        fingerprints = np.frombuffer(inputs.fingerprints, dtype=np.uint64, count=size) if size else np.empty(0, np.uint64)
+        self._order = np.argsort(fingerprints, kind="stable")
+        self._sorted = array("Q", fingerprints[self._order].tobytes())
+        self._rule_scores = inputs.rule_scores
+        self._results = results
+        self.same_rules = inputs.rules_fingerprint == rules_fingerprint
+        self.same_ai = inputs.ai_fingerprint == ai_fingerprint
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Row of the previous results computed from the same lead, if any"""
+        position = bisect_left(self._sorted, fingerprint)
+        if position < len(self._sorted) and self._sorted[position] == fingerprint:
+            return int(self._order[position])
+        return None
+
+    def reuse(self, fingerprint: int) -> tuple:
+        """(rule_score, ai_result) still valid for this lead, None for parts to recompute"""
+        if not (self.same_rules or self.same_ai):
+            return None, None
+        row = self.find(fingerprint)
+        if row is None:
+            return None, None
+        rule_score = self._rule_scores[row]
+        if rule_score == ScoreInputs.NO_RULE_SCORE:
+            return None, None
+        ai_result = None
+        result = self._results[row] if self.same_ai else None
+        if result is not None and not result.get("provisional"):
+            ai_points = result["score"] - rule_score
+            label = _LABEL_FOR_POINTS.get(ai_points)
+            reasoning = result["reasoning"]
+            if label is not None and not reasoning.startswith(FALLBACK_REASONING_PREFIX):
+                ai_result = (label, reasoning, ai_points)
+        return (rule_score if self.same_rules else None), ai_result
+
+
+def _entries(pairs: Iterable[tuple], offer: dict, scorer: Optional[RuleScorer], mode: str,
+             inputs: Optional[ScoreInputs], previous: Optional[PreviousRun], stats: dict,
+             canonical: Optional[Sequence[int]] = None) -> Iterator[tuple]:
+    """
+    (lead, rule_score, ai_result) per lead, ai_result None for leads the provider must classify.
+
+    Reuses what the previous run computed, settles leads locally via the
+    cascade, and records each lead's fingerprint and rule score in ``inputs``.
+    Duplicates (``canonical[row] != row``) are recorded but not yielded.
+    Leads stored without a feature bitmask get one here, shared by the rules and the mock.
+    """
+    cascade, incremental = stats["cascade"], stats["incremental"]
+    featurize = FeatureExtractor()
+    for row, (lead, rule_score) in enumerate(pairs):
+        fingerprint = lead_fingerprint(lead) if inputs is not None else None
+        if canonical is not None and row < len(canonical) and canonical[row] != row:
+            stats["dedupe"]["duplicates"] += 1
+            if inputs is not None:
+                # Its result was computed from another row, so it is never reused by fingerprint
+                inputs.append(fingerprint, None)
+            continue
+        if getattr(lead, "features", None) is None:
+            lead = FeaturedLead(lead, featurize(lead))
+        ai_result = None
+        if previous is not None:
+            reused_rule, ai_result = previous.reuse(fingerprint)
+            if rule_score is None and reused_rule is not None:
+                rule_score = reused_rule
+                incremental["rules_reused"] += 1
+            if ai_result is not None:
+                incremental["ai_reused"] += 1
+        try:
+            if rule_score is None:
+                rule_score = _timed_rule_score(lead, offer, scorer)
+            if ai_result is None and mode != "off":
+                local = mock_classify(lead, offer)
+                if cascade_decides(rule_score, local[0], mode):
+                    cascade["local"] += 1
+                    ai_result = local
+                else:
+                    cascade["remote"] += 1
+        except Exception:
+            # Let score_lead report the error for this lead
+            pass
+        if inputs is not None:
+            inputs.append(fingerprint, rule_score)
+        yield lead, rule_score, ai_result
+
+
+def _fan_out(results: Iterable[dict], leads: Sequence[dict], canonical: Sequence[int]) -> Iterator[dict]:
+    """Results for every row, duplicates repeating their first copy's result under their own lead fields"""
+    referenced = {first for row, first in enumerate(canonical) if first != row}
+    kept = {}
+    unique = iter(results)
+    for row in range(len(canonical)):
+        first = canonical[row]
+        if first == row:
+            result = next(unique)
+            if row in referenced:
+                kept[row] = result
+        else:
+            lead = leads[row]
+            result = dict(kept[first], name=lead.get("name", ""), role=lead.get("role", ""),
+                          company=lead.get("company", ""))
+        yield result
+    # Rows appended to the leads after the index was read
+    yield from unique
+
+
+def _remote_chunks(entries: Iterable[tuple], size: int) -> Iterator[list]:
+    """Chunks holding ``size`` leads still to classify, plus the settled leads between them"""
+    chunk, pending = [], 0
+    for entry in entries:
+        chunk.append(entry)
+        if entry[2] is None:
+            pending += 1
+            if pending == size:
+                yield chunk
+                chunk, pending = [], 0
+    if chunk:
+        yield chunk
+
+
+def _flatten(chunks: Iterable[list]) -> Iterator:
+    for chunk in chunks:
+        yield from chunk
+
+
+def _counted(results: Iterable[dict], on_finish: Optional[Callable[[], None]] = None) -> Iterator[dict]:
+    """Pass results through, adding them to the leads-scored counter in batches"""
+    counts = {}
+    try:
+        for result in results:
+            counts[result["intent"]] = counts.get(result["intent"], 0) + 1
+            yield result
+    finally:
+        for intent, count in counts.items():
+            LEADS_SCORED.inc(count, intent=intent)
+        if on_finish is not None:
+            on_finish()
+
+
+def bounded_map(fn: Callable, items: Iterable, max_workers: int) -> Iterator:
+    """
+    Like ``executor.map`` but never has more than ``max_workers`` calls in flight
+    and never materialises the whole input as futures. Results come back in input order.
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fn, item))
+        while pending:
+            yield pending.popleft().result()
+
+
+def bounded_map_unordered(fn: Callable, items: Iterable, max_workers: int) -> Iterator:
+    """
+    Like ``bounded_map`` but yields each result as soon as its call finishes,
+    so one slow call doesn't hold back the ones after it.
+    """
+    if max_workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(fn, item))
+            # Hand over whatever already finished before blocking on the next input item
+            done = {future for future in pending if future.done()}
+            pending -= done
+            for future in done:
+                yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def _classified(index: int, lead, offer: dict, scorer: Optional[RuleScorer],
+                ai_result: Optional[tuple] = None, featurize: Optional[FeatureExtractor] = None) -> dict:
+    """One /classify/batch result line; errors are reported on the line, never raised"""
+    if isinstance(lead, ValueError):
+        return {"index": index, "error": f"Invalid JSON: {lead}"}
+    if not isinstance(lead, Mapping):
+        return {"index": index, "error": "Lead must be a JSON object"}
+    if featurize is not None:
+        lead = FeaturedLead(lead, featurize(lead))
+    try:
+        rule_score = _timed_rule_score(lead, offer, scorer)
+        ai_intent, ai_reasoning, ai_points = ai_result if ai_result is not None else ai_classify(lead, offer)
+    except Exception as e:
+        return {"index": index, "name": lead.get("name", ""), "error": f"Error processing lead: {str(e)}"}
+    final_score = rule_score + ai_points
+    return {
+        "index": index,
+        "name": lead.get("name", ""),
+        "intent": ai_intent,
+        "reasoning": ai_reasoning,
+        "points": ai_points,
+        "rule_score": rule_score,
+        "score": final_score,
+        "final_intent": intent_for_score(final_score)
+    }
+
+
+def _classify_chunk(chunk: Sequence[tuple], offer: dict, scorer: Optional[RuleScorer],
+                    featurize: Optional[FeatureExtractor] = None) -> List[dict]:
+    """Classify (index, lead) pairs, with one batched AI request when there are several leads"""
+    leads = [(index, lead) for index, lead in chunk if isinstance(lead, Mapping)]
+    ai_results = {}
+    if len(leads) > 1:
+        try:
+            ai_results = dict(zip([index for index, _ in leads], ai_classify_batch([lead for _, lead in leads], offer)))
+        except Exception:
+            # Each lead is classified on its own below
+            pass
+    return [_classified(index, lead, offer, scorer, ai_results.get(index), featurize) for index, lead in chunk]
+
+
+def iter_classify_leads(leads: Iterable, offer: dict, max_workers: Optional[int] = None) -> Iterator[List[dict]]:
+    """
+    Classify a stream of leads concurrently for /classify/batch.
+
+    Unlike iter_score_leads, results come back in completion order: each
+    yielded list holds the results of one AI request (AI_BATCH_SIZE leads for
+    remote providers), each result tagged with its lead's input ``index``.
+    Items that are not JSON objects (or ValueErrors from parsing) get an error line.
+    """
+    workers = max(1, SCORE_MAX_WORKERS if max_workers is None else max_workers)
+    scorer = compile_offer(offer)
+    # Role and industry features repeat across the stream, so they are memoised for all of it
+    featurize = FeatureExtractor()
+    indexed = enumerate(leads)
+    chunks = iter(lambda: list(itertools.islice(indexed, batch_size())), [])
+    return bounded_map_unordered(lambda chunk: _classify_chunk(chunk, offer, scorer, featurize), chunks, workers)
+
+
+def _finish(stats: dict) -> None:
+    cascade, incremental = stats["cascade"], stats["incremental"]
+    cascade["remote_calls_saved"] = cascade["local"]
+    if cascade["mode"] != "off":
+        for tier in ("local", "remote"):
+            CASCADE_LEADS.inc(cascade[tier], tier=tier)
+    REUSED_LEADS.inc(incremental["rules_reused"], part="rules")
+    REUSED_LEADS.inc(incremental["ai_reused"], part="ai")
+    DUPLICATE_LEADS.inc(stats["dedupe"]["duplicates"])
+
+
+def _start_run(leads: Sequence[dict], offer: dict, mode: str, incremental: bool, stats: dict,
+               inputs: Optional[ScoreInputs]) -> tuple:
+    """
+    Reset a run's stats and set up fingerprint recording.
+
+    Returns (inputs to record into, None unless incremental; canonical row per
+    lead, None unless the leads carry a duplicate index with duplicates).
+    """
+    stats["cascade"] = dict(mode=mode, local=0, remote=0, remote_calls_saved=0)
+    stats["incremental"] = dict(enabled=incremental, rules_reused=0, ai_reused=0)
+    # Leads indexed as duplicates at upload are scored once and the result fanned out
+    dedupe = getattr(leads, "dedupe", None)
+    canonical = dedupe.canonical[:len(leads)] if dedupe is not None and dedupe.duplicates else None
+    stats["dedupe"] = dict(fields=list(dedupe.fields) if dedupe is not None else [], duplicates=0)
+
+    if not incremental:
+        return None, canonical
+    inputs = ScoreInputs() if inputs is None else inputs
+    inputs.rules_fingerprint, inputs.ai_fingerprint = run_fingerprints(offer, mode)
+    return inputs, canonical
+
+
+def run_fingerprints(offer: dict, mode: str) -> tuple:
+    """(rules, AI) offer fingerprints a run with this cascade mode records in its ScoreInputs"""
+    # Settled-by-cascade leads carry mock answers, so the cascade mode is part of the AI inputs
+    return rules.rules_offer_fingerprint(offer), f"{ai.ai_offer_fingerprint(offer)}:{mode}"
+
+
+def iter_score_leads(leads: Sequence[dict], offer: dict, max_workers: Optional[int] = None,
+                     cascade: Optional[str] = None, stats: Optional[dict] = None,
+                     previous=None, inputs: Optional[ScoreInputs] = None,
+                     incremental: Optional[bool] = None) -> Iterator[dict]:
+    """
+    Score every lead against the offer, yielding results in input order.
+
+    Args:
+        leads: Leads to score
+        offer: Offer/product information
+        max_workers: Max leads classified concurrently (defaults to SCORE_MAX_WORKERS)
+        cascade: Cascade mode (defaults to SCORE_CASCADE); only used with a remote provider
+        stats: Optional dict filled with cascade, incremental (reuse) and dedupe counts
+        previous: Results of an earlier run (with ``inputs``) to reuse unchanged parts from
+        inputs: ScoreInputs to record this run's fingerprints in, usually the target ResultStore's
+        incremental: Reuse and record fingerprints (defaults to SCORE_INCREMENTAL)
+
+    Yields:
+        dict: One result per lead
+    """
+    workers = max(1, SCORE_MAX_WORKERS if max_workers is None else max_workers)
+    mode = SCORE_CASCADE if cascade is None else cascade
+    if mode not in CASCADE_MODES:
+        raise ValueError(f"cascade must be one of {', '.join(CASCADE_MODES)}")
+    if not is_remote_provider():
+        mode = "off"
+    incremental = SCORE_INCREMENTAL if incremental is None else incremental
+    stats = {} if stats is None else stats
+    inputs, canonical = _start_run(leads, offer, mode, incremental, stats, inputs)
+    if inputs is not None and previous is not None and getattr(previous, "inputs", None) is not None:
+        previous = PreviousRun(previous, inputs.rules_fingerprint, inputs.ai_fingerprint)
+    else:
+        previous = None
+
+    scorer = compile_offer(offer)
+    rule_scores = batch_rule_scores(leads, offer)
+    pairs = zip(leads, rule_scores if rule_scores is not None else itertools.repeat(None))
+    entries = _entries(pairs, offer, scorer, mode, inputs, previous, stats, canonical)
+
+    # Remote providers classify several leads per request (AI_BATCH_SIZE)
+    size = batch_size()
+    if size > 1:
+        chunks = bounded_map(lambda chunk: score_chunk(chunk, offer, scorer), _remote_chunks(entries, size), workers)
+        results = _flatten(chunks)
+    else:
+        results = bounded_map(
+            lambda entry: score_lead(entry[0], offer, scorer, rule_score=entry[1], ai_result=entry[2]),
+            entries, workers
+        )
+    if canonical is not None:
+        results = _fan_out(results, leads, canonical)
+    return _counted(results, on_finish=lambda: _finish(stats))
+
+
+def score_leads(leads: Sequence[dict], offer: dict, max_workers: Optional[int] = None,
+                cascade: Optional[str] = None, stats: Optional[dict] = None, **kwargs) -> List[dict]:
+    """Score every lead against the offer and return the results in input order"""
+    return list(iter_score_leads(leads, offer, max_workers=max_workers, cascade=cascade, stats=stats, **kwargs))
+
+
+def timed_score_leads(leads: Sequence[dict], offer: dict, max_workers: Optional[int] = None):
+    """Run score_leads and return (results, elapsed_seconds)"""
+    started = time.perf_counter()
+    results = score_leads(leads, offer, max_workers=max_workers)
+    return results, time.perf_counter() - started
@@ -0,0 +1,87 @@
+"""
+Unit tests for multi-lead batch classification
+"""
+
+import re
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.scoring as scoring
+from utils.cache import TieredCache
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7"], "ideal_use_cases": ["B2B SaaS"]}
+LEADS = [{"name": f"Lead {i}", "role": "CEO", "company": f"Co {i}", "industry": "SaaS",
+          "location": "Austin", "linkedin_bio": "bio"} for i in range(7)]
+
+def fake_vertex(prompt, max_output_tokens=256):
+    """Answer batch prompts with one line per lead, skipping L3"""
+    if "Leads:" not in prompt:
+        return {"predictions": [{"content": "Low - single call."}]}
+    ids = re.findall(r'"id": "(L\d+)"', prompt)
+    lines = [f"{lead_id} | High | Batch reasoning." for lead_id in ids if lead_id != "L3"]
+    return {"predictions": [{"content": "\n".join(lines)}]}
+
+class TestBatchClassification(unittest.TestCase):
+
+    def setUp(self):
+        """Use the vertex provider with a fresh in-memory cache"""
+        self.patches = [
+            mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"),
+            mock.patch.object(ai, "AI_BATCH_SIZE", 4),
+            mock.patch.object(ai, "_cache", TieredCache(path=None)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_parse_batch_response(self):
+        """Test parsing per-lead lines, ignoring junk and unknown ids"""
+        text = "L1 | High | Strong fit.\nL2: medium - maybe\nnot a lead line\nL9 | High | unknown"
+        self.assertEqual(ai._parse_batch_response(text, 3), {
+            0: ("High", "Strong fit."),
+            1: ("Medium", "maybe"),
+        })
+
+    def test_missing_line_falls_back_to_single_call(self):
+        """Test that only the lead without a line gets its own request"""
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=fake_vertex) as call:
+            results = ai.ai_classify_batch(LEADS[:4], OFFER)
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual([label for label, _, _ in results], ["High", "High", "Low", "High"])
+
+    def test_failed_request_falls_back_to_mock(self):
+        """Test that a failed batch request is not re-sent per lead and its fallbacks aren't cached"""
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=RuntimeError("429 quota")) as call:
+            results = ai.ai_classify_batch(LEADS[:4], OFFER)
+        self.assertEqual(call.call_count, 1)
+        for lead, (label, reasoning, points) in zip(LEADS, results):
+            self.assertEqual(label, ai.mock_ai(lead, OFFER)[0])
+            self.assertTrue(reasoning.startswith(ai.FALLBACK_REASONING_PREFIX))
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=fake_vertex) as call:
+            self.assertEqual(ai.ai_classify_batch(LEADS[:2], OFFER)[0][1], "Batch reasoning.")
+        self.assertEqual(call.call_count, 1)
+
+    def test_cached_leads_are_not_resent(self):
+        """Test that batch results are cached per lead"""
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=fake_vertex) as call:
+            first = ai.ai_classify_batch(LEADS[:2], OFFER)
+            second = ai.ai_classify_batch(LEADS[:2], OFFER)
+        self.assertEqual(first, second)
+        self.assertEqual(call.call_count, 1)
+
+    def test_pipeline_uses_batches_in_order(self):
+        """Test that score_leads packs leads per request and keeps order"""
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=fake_vertex) as call:
+            results = scoring.score_leads(LEADS, OFFER, max_workers=2)
+        # 2 batch requests (4 + 3 leads) plus a single call for L3 of each batch
+        self.assertEqual(call.call_count, 4)
+        self.assertEqual([r["name"] for r in results], [lead["name"] for lead in LEADS])
+        self.assertEqual(results[2]["reasoning"], "single call.")
+        self.assertEqual(results[6]["reasoning"], "single call.")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for the AI classification cache
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import services.ai as ai
+from utils.cache import TieredCache
+
+class TestTieredCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary cache file"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_memory_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TieredCache(path=None, max_memory_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.info()["evictions"], 1)
+
+    def test_disk_tier_survives_new_instance(self):
+        """Test that entries are read back from the SQLite tier"""
+        TieredCache(path=self.path).set("k", ["High", "reason"])
+        cache = TieredCache(path=self.path)
+        self.assertEqual(cache.get("k"), ["High", "reason"])
+        self.assertEqual(cache.get("k"), ["High", "reason"])
+        info = cache.info()
+        self.assertEqual(info["disk_hits"], 1)
+        self.assertEqual(info["memory_hits"], 1)
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are misses in both tiers"""
+        cache = TieredCache(path=self.path, ttl=10)
+        cache.set("k", 1)
+        with mock.patch("utils.cache.time.time", return_value=time.time() + 11):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.info()["misses"], 1)
+
+class TestClassifyCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a vertex provider with an in-memory cache"""
+        self.offer = {"name": "AI Outreach", "value_props": ["24/7"], "ideal_use_cases": ["B2B SaaS"]}
+        self.lead = {"name": "Ava", "role": "CEO", "company": "Flow", "industry": "SaaS",
+                     "location": "Pune", "linkedin_bio": "Founder"}
+        self.patches = [
+            mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"),
+            mock.patch.object(ai, "_cache", TieredCache(path=None)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_key_ignores_unused_fields(self):
+        """Test that fields outside the prompt do not change the key"""
+        other = dict(self.lead, email="x@example.com")
+        self.assertEqual(ai._cache_key(self.lead, self.offer), ai._cache_key(other, self.offer))
+        changed = dict(self.lead, role="Intern")
+        self.assertNotEqual(ai._cache_key(self.lead, self.offer), ai._cache_key(changed, self.offer))
+
+    def test_second_call_is_served_from_cache(self):
+        """Test that a repeated lead does not call the provider again"""
+        response = {"predictions": [{"content": "High - strong fit."}]}
+        with mock.patch.object(ai, "_call_vertex_api_key", return_value=response) as call:
+            first = ai.ai_classify(self.lead, self.offer)
+            second = ai.ai_classify(self.lead, self.offer)
+        self.assertEqual(first, second)
+        self.assertEqual(call.call_count, 1)
+
+    def test_fallback_is_not_cached(self):
+        """Test that provider errors are retried on the next call"""
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=RuntimeError("down")) as call:
+            ai.ai_classify(self.lead, self.offer)
+            _, reasoning, _ = ai.ai_classify(self.lead, self.offer)
+        self.assertEqual(call.call_count, 2)
+        self.assertIn("Fallback to mock", reasoning)
+
+    def test_empty_response_is_not_cached(self):
+        """Test that the placeholder for an empty model response is asked again on the next call"""
+        empty = {"predictions": [{"content": ""}]}
+        answer = {"predictions": [{"content": "High - strong fit."}]}
+        with mock.patch.object(ai, "_call_vertex_api_key", side_effect=[empty, answer]) as call:
+            self.assertEqual(ai.ai_classify(self.lead, self.offer)[1], ai.NO_RESPONSE_REASONING)
+            self.assertEqual(ai.ai_classify(self.lead, self.offer)[:2], ("High", "strong fit."))
+        self.assertEqual(call.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
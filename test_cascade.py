@@ -0,0 +1,108 @@
+"""
+Unit tests for cascade scoring (rules + mock first, remote model only when needed)
+"""
+
+import json
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.scoring as scoring
+from utils.cache import TieredCache
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7"], "ideal_use_cases": ["B2B SaaS"]}
+ROLES = ["CEO", "Marketing Manager", "Intern", "VP Sales", "Engineer", "Head of Growth"]
+INDUSTRIES = ["SaaS", "Retail", "Technology", "B2B SaaS", "Healthcare"]
+LEADS = [
+    {"name": f"Lead {i}", "role": ROLES[i % len(ROLES)], "company": f"Co {i}",
+     "industry": INDUSTRIES[i % len(INDUSTRIES)], "location": "Austin",
+     "linkedin_bio": "Growth leader" if i % 3 else ""}
+    for i in range(60)
+]
+
+def agreeing_vertex(prompt, max_output_tokens=256):
+    """A remote model that agrees with mock_ai, so every path must give the same intents"""
+    by_name = {lead["name"]: lead for lead in LEADS}
+    if "Leads:" in prompt:
+        lines = []
+        for line in prompt.split("Leads:\n", 1)[1].splitlines():
+            if line.startswith("{"):
+                entry = json.loads(line)
+                lines.append(f"{entry['id']} | {ai.mock_ai(by_name[entry['name']], OFFER)[0]} | remote")
+        return {"predictions": [{"content": "\n".join(lines)}]}
+    lead = next(l for l in LEADS if f'"name": "{l["name"]}"' in prompt)
+    label, _ = ai.mock_ai(lead, OFFER)
+    return {"predictions": [{"content": f"{label} - remote."}]}
+
+class TestCascadeDecision(unittest.TestCase):
+
+    def test_adjacent_matches_neighbouring_labels(self):
+        """Test that an adjacent decision holds for mock's label and its neighbours"""
+        decided = 0
+        for rule_score in range(51):
+            for position, mock_label in enumerate(ai.AI_LABELS):
+                if not scoring.cascade_decides(rule_score, mock_label, "adjacent"):
+                    continue
+                decided += 1
+                local = scoring.intent_for_score(rule_score + ai.points_for_label(mock_label))
+                for label in ai.AI_LABELS[max(0, position - 1):position + 2]:
+                    self.assertEqual(scoring.intent_for_score(rule_score + ai.points_for_label(label)), local)
+        self.assertGreater(decided, 0)
+
+    def test_off_never_decides(self):
+        """Test that the off mode sends everything to the provider"""
+        self.assertFalse(scoring.cascade_decides(50, "High", "off"))
+
+class TestCascadePipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Use the vertex provider"""
+        self.provider = mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key")
+        self.provider.start()
+
+    def tearDown(self):
+        self.provider.stop()
+
+    def _score(self, cascade, batch=1):
+        stats = {}
+        with mock.patch.object(ai, "AI_BATCH_SIZE", batch), \
+                mock.patch.object(ai, "_cache", TieredCache(path=None)), \
+                mock.patch.object(ai, "_call_vertex_api_key", side_effect=agreeing_vertex) as call:
+            results = scoring.score_leads(LEADS, OFFER, max_workers=4, cascade=cascade, stats=stats)
+        return results, stats, call.call_count
+
+    def test_adjacent_saves_calls_with_same_intents(self):
+        """Test that leads settled locally skip the provider but keep their intent"""
+        full, full_stats, full_calls = self._score("off")
+        cascaded, stats, calls = self._score("adjacent")
+        self.assertEqual(full_calls, len(LEADS))
+        self.assertEqual(full_stats["cascade"]["mode"], "off")
+        self.assertGreater(stats["cascade"]["remote_calls_saved"], 0)
+        self.assertEqual(stats["cascade"]["local"] + stats["cascade"]["remote"], len(LEADS))
+        self.assertEqual(calls, stats["cascade"]["remote"])
+        self.assertEqual([r["intent"] for r in cascaded], [r["intent"] for r in full])
+
+    def test_batched_cascade(self):
+        """Test that batches are filled with remote leads only"""
+        full, _, _ = self._score("off", batch=4)
+        cascaded, stats, calls = self._score("adjacent", batch=4)
+        self.assertEqual([r["intent"] for r in cascaded], [r["intent"] for r in full])
+        self.assertEqual(calls, -(-stats["cascade"]["remote"] // 4))
+        self.assertEqual([r["name"] for r in cascaded], [l["name"] for l in LEADS])
+
+    def test_mock_provider_disables_cascade(self):
+        """Test that the cascade is a no-op when classification is already local"""
+        stats = {}
+        with mock.patch.object(ai, "AI_PROVIDER", "mock"):
+            scoring.score_leads(LEADS[:5], OFFER, cascade="adjacent", stats=stats)
+        self.assertEqual(stats["cascade"]["mode"], "off")
+
+    def test_unknown_mode_rejected(self):
+        """Test that an unknown cascade mode raises straight away"""
+        with self.assertRaises(ValueError):
+            scoring.iter_score_leads(LEADS, OFFER, cascade="sometimes")
+        with self.assertRaises(ValueError):
+            scoring.iter_score_leads(LEADS, OFFER, cascade="strict")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for POST /classify/batch (JSON/NDJSON in, NDJSON streamed out)
+"""
+
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.scoring as scoring
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7 outreach"], "ideal_use_cases": ["B2B SaaS"]}
+LEADS = [
+    {"name": f"Lead {i}", "role": "CEO" if i % 2 else "Intern", "company": f"Co {i}", "industry": "SaaS",
+     "location": "Pune", "linkedin_bio": "growth"}
+    for i in range(12)
+]
+
+def lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+class TestBoundedMapUnordered(unittest.TestCase):
+
+    def test_fast_results_overtake_slow_ones(self):
+        """Test that results come back as calls finish, not in input order"""
+        def work(item):
+            time.sleep(0.2 if item == 0 else 0)
+            return item
+        self.assertEqual(sorted(scoring.bounded_map_unordered(work, range(6), 3)), list(range(6)))
+        self.assertNotEqual(next(scoring.bounded_map_unordered(work, range(6), 3)), 0)
+
+    def test_in_flight_is_bounded(self):
+        """Test that no more than max_workers calls run at once"""
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def work(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return item
+        self.assertEqual(sorted(scoring.bounded_map_unordered(work, range(20), 4)), list(range(20)))
+        self.assertLessEqual(peak[0], 4)
+
+class TestClassifyBatchEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        storage["offer"] = OFFER
+
+    def test_json_array_uses_stored_offer(self):
+        """Test that each lead gets one line with AI and rule scores, matching /classify"""
+        response = self.client.post("/classify/batch", json=LEADS[:4])
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        results = sorted(lines(response), key=lambda line: line["index"])
+        self.assertEqual([line["name"] for line in results], [lead["name"] for lead in LEADS[:4]])
+        single = self.client.post("/classify", json={"lead": LEADS[1], "offer": OFFER}).get_json()
+        self.assertEqual((results[1]["intent"], results[1]["points"]), (single["intent"], single["points"]))
+        self.assertEqual(results[1]["score"], results[1]["rule_score"] + results[1]["points"])
+        self.assertEqual(results[1]["final_intent"], scoring.intent_for_score(results[1]["score"]))
+
+    def test_ndjson_with_offer_line_and_bad_lines(self):
+        """Test NDJSON input with a leading offer line, blank lines and unparseable lines"""
+        offer = dict(OFFER, ideal_use_cases=["Retail"])
+        body = "\n".join([json.dumps({"offer": offer}), json.dumps(LEADS[0]), "", "{nope", "[1]"]) + "\n"
+        results = sorted(lines(self.client.post("/classify/batch", data=body, content_type="application/x-ndjson")),
+                         key=lambda line: line["index"])
+        self.assertEqual([line["index"] for line in results], [0, 1, 2])
+        self.assertEqual(results[0]["rule_score"], scoring.score_lead(LEADS[0], offer)["score"] - results[0]["points"])
+        self.assertIn("Invalid JSON", results[1]["error"])
+        self.assertEqual(results[2]["error"], "Lead must be a JSON object")
+
+    def test_streams_before_batch_finishes(self):
+        """Test that finished leads are sent while another lead is still being classified"""
+        release = threading.Event()
+
+        def classify(lead, offer):
+            if lead["name"] == "Lead 0":
+                release.wait(5)
+            return ai.mock_ai(lead, offer)[0], "ok", 10
+
+        with mock.patch.object(scoring, "ai_classify", side_effect=classify):
+            response = self.client.post("/classify/batch?max_workers=2", json=LEADS[:3], buffered=False)
+            first = json.loads(next(iter(response.response)).decode().splitlines()[0])
+            self.assertNotEqual(first["index"], 0)
+            release.set()
+            response.close()
+
+    def test_batched_provider_groups_requests(self):
+        """Test that remote providers classify AI_BATCH_SIZE leads per request"""
+        with mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"), \
+                mock.patch.object(ai, "AI_BATCH_SIZE", 5), \
+                mock.patch.object(scoring, "ai_classify_batch",
+                                  side_effect=lambda leads, offer: [("High", "remote", 50)] * len(leads)) as batch:
+            results = lines(self.client.post("/classify/batch", json={"offer": OFFER, "leads": LEADS}))
+        self.assertEqual(batch.call_count, 3)
+        self.assertEqual(sorted(line["index"] for line in results), list(range(len(LEADS))))
+        self.assertTrue(all(line["reasoning"] == "remote" for line in results))
+
+    def test_limits_and_validation(self):
+        """Test the per-request lead limit and bad bodies"""
+        import routes.score as score_routes
+
+        with mock.patch.object(score_routes, "CLASSIFY_BATCH_MAX_LEADS", 3):
+            self.assertEqual(self.client.post("/classify/batch", json=LEADS).status_code, 413)
+            body = "\n".join(json.dumps(lead) for lead in LEADS[:5])
+            results = lines(self.client.post("/classify/batch", data=body, content_type="application/x-ndjson"))
+        self.assertEqual(len(results), 4)
+        self.assertIn("At most 3 leads", results[-1]["error"])
+        self.assertEqual(self.client.post("/classify/batch", json={"lead": LEADS[0]}).status_code, 400)
+        self.assertEqual(self.client.post("/classify/batch?max_workers=0", json=LEADS).status_code, 400)
+        self.assertEqual(self.client.post("/classify/batch?max_workers=abc", json=LEADS).status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests for incremental CSV upload parsing
+"""
+
+import io
+import unittest
+
+from utils.csv_stream import CSVStream, UploadLimitExceeded
+
+HEADER = "name,role,company,industry,location,linkedin_bio\n"
+
+class TestCSVStream(unittest.TestCase):
+
+    def _stream(self, text, **kwargs):
+        return CSVStream(io.BytesIO(text.encode("utf-8")), **kwargs)
+
+    def test_header_before_rows(self):
+        """Test that the header is parsed without reading rows"""
+        stream = self._stream(HEADER + "Ava,CEO,Flow,SaaS,Pune,bio\n")
+        self.assertEqual(stream.fieldnames[:2], ["name", "role"])
+        self.assertEqual(stream.rows_read, 0)
+
+    def test_chunks_and_quoted_newlines(self):
+        """Test chunking and multi-line quoted fields"""
+        rows = "".join(f'Lead {i},CEO,Co,SaaS,Pune,"line one\nline two"\n' for i in range(25))
+        stream = self._stream(HEADER + rows, chunk_rows=10)
+        chunks = list(stream.chunks())
+        self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+        self.assertEqual(chunks[2][-1]["name"], "Lead 24")
+        self.assertEqual(chunks[0][0]["linkedin_bio"], "line one\nline two")
+
+    def test_empty_file(self):
+        """Test that an empty file has no header"""
+        self.assertIsNone(self._stream("").fieldnames)
+
+    def test_row_limit(self):
+        """Test the max rows limit"""
+        stream = self._stream(HEADER + "a,b,c,d,e,f\n" * 5, max_rows=3)
+        with self.assertRaises(UploadLimitExceeded):
+            list(stream.chunks())
+
+    def test_byte_limit(self):
+        """Test the max bytes limit"""
+        stream = self._stream(HEADER + "a,b,c,d,e,f\n" * 50000, max_bytes=64 * 1024)
+        with self.assertRaises(UploadLimitExceeded):
+            list(stream.chunks())
+
+    def test_invalid_encoding(self):
+        """Test that invalid UTF-8 raises UnicodeDecodeError"""
+        stream = CSVStream(io.BytesIO(HEADER.encode() + b"\xff\xfe,x,x,x,x,x\n"))
+        with self.assertRaises(UnicodeDecodeError):
+            list(stream.chunks())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+"""
+Unit tests for deadline-bounded scoring (provisional local scores upgraded as AI answers arrive)
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.jobs as jobs
+import services.scoring as scoring
+from utils.cache import TieredCache
+from utils.lead_store import LeadStore, ResultStore
+from utils.storage import MemoryStorage, SQLiteStorage
+
+OFFER = {"name": "AI Outreach", "ideal_use_cases": ["B2B SaaS"]}
+ROLES = ["CEO", "Marketing Manager", "Intern", "Engineer"]
+LEADS = [
+    {"name": f"Lead {i}", "role": ROLES[i % len(ROLES)], "company": f"Co {i}", "industry": "Retail",
+     "location": "Austin", "linkedin_bio": ""}
+    for i in range(12)
+]
+
+def make_leads(rows=LEADS):
+    leads = LeadStore()
+    leads.extend(rows)
+    return leads
+
+def provisional_results(leads=None):
+    leads = make_leads() if leads is None else leads
+    results = ResultStore(leads)
+    scoring.score_provisionally(results, leads, OFFER)
+    return results
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestProvisionalResults(unittest.TestCase):
+
+    def test_local_scores_flagged_provisional(self):
+        """Test that provisional results are the mock provider's scores, each row flagged"""
+        with mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"), \
+                mock.patch.object(ai, "_call_vertex_api_key", side_effect=AssertionError("remote call")):
+            results = provisional_results()
+        expected = scoring.score_leads(make_leads(), OFFER, incremental=False)
+        self.assertEqual([{k: v for k, v in row.items() if k != "provisional"} for row in results], expected)
+        self.assertEqual(results.provisional_count(), len(LEADS))
+        self.assertIs(results[0]["provisional"], True)
+        self.assertIsNone(ResultStore().provisional)
+
+    def test_update_replaces_rows_and_index(self):
+        """Test that update rewrites rows in place, clears their flag and refreshes queries"""
+        results = provisional_results()
+        high = results.query(intent="High")[0]
+        self.assertEqual(results[2]["intent"], "Low")
+        results.update([(2, "High", 99, "Remote says yes.")])
+        self.assertEqual(dict(results[2]), dict(
+            name="Lead 2", role="Intern", company="Co 2", intent="High", score=99, reasoning="Remote says yes."
+        ))
+        self.assertEqual(results.provisional_count(), len(LEADS) - 1)
+        self.assertEqual(results.query(sort="-score", limit=1)[1][0]["name"], "Lead 2")
+        self.assertEqual(results.query(intent="High")[0], high + 1)
+
+    def test_provisional_ai_answers_are_not_reused(self):
+        """Test that an incremental rerun keeps provisional rows' rule scores but reclassifies them"""
+        leads = make_leads()
+        finished = ResultStore(leads)
+        finished.extend(scoring.iter_score_leads(leads, OFFER, inputs=finished.inputs, incremental=True))
+        results = provisional_results(leads)
+        results.inputs = finished.inputs
+        results.update((row, r["intent"], r["score"], r["reasoning"]) for row, r in enumerate(finished) if row < 5)
+
+        stats = {}
+        scoring.score_leads(leads, OFFER, previous=results, stats=stats, incremental=True)
+        self.assertEqual(stats["incremental"]["rules_reused"], len(LEADS))
+        self.assertEqual(stats["incremental"]["ai_reused"], 5)
+
+class UpdateResultsContract:
+    """update_results behaviour shared by both backends"""
+
+    def test_update_and_supersede(self):
+        """Test that updates show up under a new generation until newer results replace the run"""
+        storage = self.make_storage()
+        results = provisional_results()
+        storage["results"] = results
+        generation = storage.results_generation()
+        self.assertTrue(storage.update_results(results, [(0, "High", 91, "Remote.")]))
+        self.assertNotEqual(storage.results_generation(), generation)
+        stored = storage["results"]
+        self.assertEqual([stored[0][field] for field in ("intent", "score", "reasoning")], ["High", 91, "Remote."])
+        self.assertIsNone(stored[0].get("provisional"))
+        self.assertTrue(stored[1]["provisional"])
+        rows = list(stored)
+        self.assertNotIn("provisional", rows[0])
+        self.assertIs(rows[1]["provisional"], True)
+        self.assertEqual(stored.query(sort="-score", limit=1)[1][0]["score"], 91)
+
+        storage["results"] = provisional_results()
+        generation = storage.results_generation()
+        self.assertFalse(storage.update_results(results, [(1, "High", 92, "Late.")]))
+        self.assertEqual(storage.results_generation(), generation)
+        self.assertNotEqual(storage["results"][1]["score"], 92)
+
+class TestMemoryUpdateResults(UpdateResultsContract, unittest.TestCase):
+
+    def make_storage(self):
+        return MemoryStorage()
+
+    def test_snapshot_keeps_flags(self):
+        """Test that provisional flags and updates survive a snapshot restart"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = MemoryStorage(tmpdir)
+            results = provisional_results()
+            storage["results"] = results
+            storage.update_results(results, [(0, "High", 91, "Remote.")])
+            restored = MemoryStorage(tmpdir)["results"]
+            self.assertEqual(restored.provisional_count(), len(LEADS) - 1)
+            self.assertEqual(restored.to_list(), results.to_list())
+
+            with mock.patch.object(storage.snapshot, "save") as save:
+                self.assertTrue(storage.update_results(results, [(1, "High", 92, "Remote.")], persist=False))
+            save.assert_not_called()
+            self.assertEqual(storage["results"][1]["score"], 92)
+
+class TestSQLiteUpdateResults(UpdateResultsContract, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def make_storage(self):
+        return SQLiteStorage(os.path.join(self.tmpdir.name, "storage.sqlite3"))
+
+    def test_inputs_appended_as_the_job_records_them(self):
+        """Test that updates add only the newly recorded inputs, both columns cut at one length"""
+        storage = self.make_storage()
+        results = provisional_results()
+        results.inputs.rules_fingerprint, results.inputs.ai_fingerprint = "rules", "ai"
+        for row in range(3):
+            results.inputs.append(row + 1, 10 + row)
+        # A job caught between its two appends: one more rule score than fingerprints
+        results.inputs.rule_scores.append(40)
+        storage["results"] = results
+        self.assertEqual(len(storage["results"].inputs.rule_scores), 3)
+
+        results.inputs.fingerprints.append(4)
+        results.inputs.append(5, 50)
+        storage.update_results(results, [(0, "High", 91, "Remote.")])
+        inputs = storage["results"].inputs
+        self.assertEqual(list(inputs.fingerprints), [1, 2, 3, 4, 5])
+        self.assertEqual(list(inputs.rule_scores), [10, 11, 12, 40, 50])
+
+class TestResultUpgrader(unittest.TestCase):
+
+    def test_persists_at_intervals_and_last(self):
+        """Test that flushes persist only every PROVISIONAL_PERSIST_SECONDS and on the last flush"""
+        job = jobs.ScoringJob(LEADS, OFFER)
+        applied = []
+        upgrader = jobs.ResultUpgrader(job, provisional_results(), lambda updates, persist: applied.append(
+            (len(updates), persist)) or True)
+        results = scoring.score_leads(LEADS, OFFER, incremental=False)
+        for stop, last in ((4, False), (4, False), (8, False), (12, True)):
+            job.results.extend(results[len(job.results):stop])
+            self.assertTrue(upgrader.flush(last=last))
+        self.assertEqual(applied, [(4, False), (4, False), (4, True)])
+
+    def test_superseded_results_cancel_the_job(self):
+        """Test that the upgrader stops and cancels its job once its results were replaced"""
+        job = jobs.ScoringJob(LEADS, OFFER)
+        job.results.extend(scoring.score_leads(LEADS, OFFER, incremental=False))
+        upgrader = jobs.ResultUpgrader(job, provisional_results(), lambda updates, persist: False)
+        self.assertFalse(upgrader.flush())
+        self.assertTrue(job._cancel.is_set())
+
+class TestDeadlineRoute(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        self.storage = storage
+        storage["offer"] = OFFER
+        storage["leads"] = make_leads()
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+
+        def remote(*args, **kwargs):
+            self.gate.wait(5)
+            return {"predictions": [{"content": "High - remote."}]}
+
+        for patch in (
+            mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"),
+            mock.patch.object(ai, "AI_BATCH_SIZE", 1),
+            mock.patch.object(ai, "_cache", TieredCache(path=None)),
+            mock.patch.object(ai, "_call_vertex_api_key", side_effect=remote),
+            mock.patch.object(jobs, "PROVISIONAL_FLUSH_SECONDS", 0.01),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_provisional_then_upgraded(self):
+        """Test that a missed deadline returns local scores that converge on the remote ones"""
+        response = self.client.post("/score", json={"deadline": 0.05, "cascade": "off", "incremental": False})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["total_leads"], len(LEADS))
+        self.assertEqual(body["provisional"], len(LEADS))
+        rows = self.client.get("/results").get_json()
+        self.assertTrue(all(row["provisional"] for row in rows))
+        generation = self.storage.results_generation()
+
+        self.gate.set()
+        self.assertTrue(_wait_for(lambda: self.storage["results"].provisional_count() == 0))
+        self.assertNotEqual(self.storage.results_generation(), generation)
+        rows = self.client.get("/results").get_json()
+        self.assertTrue(all("provisional" not in row for row in rows))
+        self.assertEqual({row["reasoning"] for row in rows}, {"remote."})
+        self.assertTrue(_wait_for(lambda: self.client.get(body["status_url"]).get_json()["status"] == "completed"))
+
+    def test_finished_within_deadline(self):
+        """Test that a run that beats the deadline publishes final scores only"""
+        self.gate.set()
+        response = self.client.post("/score?deadline=5", json={"cascade": "off", "incremental": False})
+        self.assertEqual(response.get_json()["provisional"], 0)
+        self.assertIsNone(self.storage["results"].provisional)
+
+    def test_invalid_deadline(self):
+        """Test that non-positive or non-numeric deadlines, and deadline with async, are rejected"""
+        for params in ({"deadline": 0}, {"deadline": "soon"}, {"deadline": True}, {"deadline": 1, "async": True}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.post("/score", json=params).status_code, 400)
+        self.assertEqual(self.client.post("/score?deadline=-1").status_code, 400)
+
+    def test_invalid_max_workers(self):
+        """Test that zero, negative, non-integer or boolean max_workers are rejected, not ignored"""
+        for query in ("max_workers=0", "max_workers=-3", "max_workers=abc", "max_workers=1.5"):
+            with self.subTest(query=query):
+                response = self.client.post(f"/score?{query}", json={"max_workers": 2, "incremental": False})
+                self.assertEqual(response.status_code, 400)
+        for value in (True, 0, "2", 1.5):
+            with self.subTest(value=value):
+                self.assertEqual(self.client.post("/score", json={"max_workers": value}).status_code, 400)
+        self.gate.set()
+        response = self.client.post("/score?max_workers=3", json={"max_workers": 2, "incremental": False})
+        self.assertEqual(response.get_json()["max_workers"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Unit tests for lead de-duplication (identity index at upload, one scoring unit per person)
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.scoring as scoring
+from utils.lead_store import DEDUPE_MODES, DedupeIndex, LeadStore, ResultStore, lead_identity
+from utils.storage import SQLiteStorage
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7 outreach"], "ideal_use_cases": ["B2B SaaS"]}
+LEADS = [
+    {"name": "Ava Patel", "role": "CEO", "company": "Flow", "industry": "SaaS", "location": "Pune", "linkedin_bio": "a"},
+    {"name": "Ben Ode", "role": "Intern", "company": "Acme", "industry": "Retail", "location": "Delhi", "linkedin_bio": ""},
+    {"name": " ava  PATEL", "role": "Chief Executive", "company": "flow ", "industry": "SaaS", "location": "Pune",
+     "linkedin_bio": "b"},
+    {"name": "Cy", "role": "VP Sales", "company": "Flow", "industry": "SaaS", "location": "Austin", "linkedin_bio": ""},
+    {"name": "Ben Ode", "role": "Intern", "company": "Acme", "industry": "Retail", "location": "Delhi", "linkedin_bio": ""},
+]
+
+def make_leads(rows, mode="name_company"):
+    leads = LeadStore(dedupe_fields=DEDUPE_MODES[mode])
+    leads.extend(rows)
+    return leads
+
+class TestDedupeIndex(unittest.TestCase):
+
+    def test_identity_normalises_case_and_whitespace(self):
+        """Test that case and extra whitespace don't change a lead's identity"""
+        fields = DEDUPE_MODES["name_company"]
+        self.assertEqual(lead_identity(LEADS[0], fields), lead_identity(LEADS[2], fields))
+        self.assertNotEqual(lead_identity(LEADS[0], fields), lead_identity(LEADS[3], fields))
+
+    def test_canonical_rows(self):
+        """Test that each duplicate points at the first row with its identity"""
+        leads = make_leads(LEADS)
+        self.assertEqual(list(leads.dedupe.canonical), [0, 1, 0, 3, 1])
+        self.assertEqual(leads.dedupe.duplicates, 2)
+        reloaded = DedupeIndex.from_identities(leads.dedupe.fields, leads.dedupe.identities)
+        self.assertEqual(reloaded.canonical, leads.dedupe.canonical)
+
+    def test_blank_identity_is_never_a_duplicate(self):
+        """Test that leads with blank name and company are scored on their own, not collapsed"""
+        rows = [dict(name="", company=" ", role=role, industry="SaaS") for role in ("CEO", "Intern", "VP Sales")]
+        leads = make_leads(rows + [dict(rows[1], name=None, company=None)])
+        self.assertEqual(list(leads.dedupe.canonical), [0, 1, 2, 3])
+        self.assertEqual(leads.dedupe.duplicates, 0)
+        reloaded = DedupeIndex.from_identities(leads.dedupe.fields, leads.dedupe.identities)
+        self.assertEqual(reloaded.canonical, leads.dedupe.canonical)
+        results = scoring.score_leads(leads, OFFER, incremental=False)
+        expected = scoring.score_leads(rows + [rows[1]], OFFER, incremental=False)
+        self.assertEqual([(r["score"], r["reasoning"]) for r in results],
+                         [(r["score"], r["reasoning"]) for r in expected])
+        self.assertNotEqual(results[0]["score"], results[1]["score"])
+
+    def test_bio_mode_is_stricter(self):
+        """Test that including the bio keeps same-name leads with different bios apart"""
+        self.assertEqual(list(make_leads(LEADS, "name_company_bio").dedupe.canonical), [0, 1, 2, 3, 1])
+        self.assertIsNone(make_leads(LEADS, "off").dedupe)
+
+class TestDedupedScoring(unittest.TestCase):
+
+    def _score(self, leads, **kwargs):
+        results = ResultStore(leads)
+        stats = {}
+        with mock.patch.object(scoring, "ai_classify", side_effect=ai.ai_classify) as classify:
+            results.extend(scoring.iter_score_leads(leads, OFFER, max_workers=2, stats=stats,
+                                                    inputs=results.inputs, **kwargs))
+        return results, stats, classify.call_count
+
+    def test_duplicates_scored_once_and_fanned_out(self):
+        """Test that each person is classified once and every row gets a result"""
+        results, stats, calls = self._score(make_leads(LEADS))
+        self.assertEqual(calls, 3)
+        self.assertEqual(stats["dedupe"], {"fields": ["name", "company"], "duplicates": 2})
+        rows = results.to_list()
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[2]["name"], " ava  PATEL")
+        self.assertEqual(rows[2]["role"], "Chief Executive")
+        self.assertEqual((rows[2]["score"], rows[2]["reasoning"]), (rows[0]["score"], rows[0]["reasoning"]))
+        self.assertEqual(len(results.inputs), 5)
+
+    def test_off_scores_every_row(self):
+        """Test that without a dedupe index every row is classified"""
+        _, stats, calls = self._score(make_leads(LEADS, "off"))
+        self.assertEqual(calls, 5)
+        self.assertEqual(stats["dedupe"]["duplicates"], 0)
+
+    def test_incremental_rescore_after_dedupe(self):
+        """Test that a rescore reuses first copies and still fans out to duplicates"""
+        leads = make_leads(LEADS)
+        first, _, _ = self._score(leads, incremental=True)
+        second, stats, calls = self._score(leads, previous=first, incremental=True)
+        self.assertEqual(calls, 0)
+        self.assertEqual(stats["incremental"]["ai_reused"], 3)
+        self.assertEqual(second.to_list(), first.to_list())
+
+    def test_batched_scoring(self):
+        """Test duplicates with the batched remote path"""
+        with mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"), \
+                mock.patch.object(ai, "AI_BATCH_SIZE", 2), \
+                mock.patch.object(scoring, "ai_classify_batch", side_effect=lambda leads, offer: [
+                    ("High", "remote", 50) for _ in leads]) as batch:
+            results = scoring.score_leads(make_leads(LEADS), OFFER, cascade="off")
+        self.assertEqual(sum(len(call.args[0]) for call in batch.call_args_list), 3)
+        self.assertEqual([r["name"] for r in results], [lead["name"] for lead in LEADS])
+
+class TestDedupeStorage(unittest.TestCase):
+
+    def test_sqlite_keeps_index_across_append(self):
+        """Test that the identity index is stored with the upload and extended on append"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = SQLiteStorage(os.path.join(tmpdir, "storage.sqlite3"))
+            storage["leads"] = make_leads(LEADS[:3])
+            before = storage["leads"]
+            storage.append_leads(make_leads(LEADS[3:]))
+            self.assertEqual(list(before.dedupe.canonical), [0, 1, 0])
+            self.assertEqual(list(storage["leads"].dedupe.canonical), [0, 1, 0, 3, 1])
+            storage["leads"] = make_leads(LEADS, "off")
+            self.assertIsNone(storage["leads"].dedupe)
+
+class TestUploadEndpoint(unittest.TestCase):
+
+    def _upload(self, query="", rows=LEADS):
+        from app import app
+
+        header = "name,role,company,industry,location,linkedin_bio\n"
+        body = header + "".join(",".join(lead[field] for field in header.strip().split(",")) + "\n"
+                                for lead in rows)
+        return app.test_client().post(f"/leads/upload{query}", data={"file": (io.BytesIO(body.encode()), "l.csv")},
+                                      content_type="multipart/form-data")
+
+    def test_upload_reports_duplicates(self):
+        """Test that the upload response counts duplicates, honours ?dedupe and is off by default"""
+        body = self._upload("?dedupe=name_company").get_json()
+        self.assertEqual((body["total_leads"], body["unique_leads"], body["duplicate_leads"]), (5, 3, 2))
+        self.assertEqual(self._upload().get_json()["duplicate_leads"], 0)
+        self.assertEqual(self._upload("?dedupe=email").status_code, 400)
+
+    def test_append_counts_duplicates_of_stored_rows(self):
+        """Test that an append reports the duplicates it added, including copies of stored rows"""
+        self.assertEqual(self._upload("?dedupe=name_company", LEADS[:3]).get_json()["duplicate_leads"], 1)
+        body = self._upload("?mode=append", LEADS[3:]).get_json()
+        self.assertEqual((body["total_leads"], body["duplicate_leads"]), (5, 1))
+
+if __name__ == "__main__":
+    unittest.main()
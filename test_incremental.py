@@ -0,0 +1,158 @@
+"""
+Unit tests for incremental rescoring (reusing results for unchanged leads and offer fields)
+"""
+
+import io
+import unittest
+from unittest import mock
+
+import services.ai as ai
+import services.scoring as scoring
+from utils.cache import TieredCache
+from utils.lead_store import LeadStore, ResultStore
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7 outreach"], "ideal_use_cases": ["B2B SaaS"]}
+ROLES = ["CEO", "Marketing Manager", "Intern", "VP Sales", "Engineer"]
+INDUSTRIES = ["SaaS", "Retail", "Technology", "Healthcare"]
+LEADS = [
+    {"name": f"Lead {i}", "role": ROLES[i % len(ROLES)], "company": f"Co {i}",
+     "industry": INDUSTRIES[i % len(INDUSTRIES)], "location": "Austin",
+     "linkedin_bio": "Growth leader" if i % 3 else ""}
+    for i in range(30)
+]
+
+def make_leads(rows):
+    leads = LeadStore()
+    leads.extend(rows)
+    return leads
+
+def run(leads, offer, previous=None, **kwargs):
+    """Score like POST /score does; returns (results, stats, ai_classify calls)"""
+    results = ResultStore(leads)
+    stats = {}
+    with mock.patch.object(scoring, "ai_classify", side_effect=ai.ai_classify) as classify:
+        results.extend(scoring.iter_score_leads(
+            leads, offer, max_workers=1, stats=stats, previous=previous, inputs=results.inputs,
+            incremental=True, **kwargs
+        ))
+    return results, stats, classify.call_count
+
+class TestIncrementalRescoring(unittest.TestCase):
+
+    def test_same_inputs_reuse_everything(self):
+        """Test that rescoring unchanged leads and offer reuses every part"""
+        leads = make_leads(LEADS)
+        first, stats, calls = run(leads, OFFER)
+        self.assertEqual(calls, len(LEADS))
+        self.assertEqual(stats["incremental"]["ai_reused"], 0)
+        second, stats, calls = run(leads, OFFER, previous=first)
+        self.assertEqual(calls, 0)
+        self.assertEqual(stats["incremental"]["rules_reused"], len(LEADS))
+        self.assertEqual(stats["incremental"]["ai_reused"], len(LEADS))
+        self.assertEqual(second.to_list(), first.to_list())
+
+    def test_new_upload_only_scores_new_or_changed_leads(self):
+        """Test that a re-upload with one edited and two new leads scores three"""
+        first, _, _ = run(make_leads(LEADS), OFFER)
+        changed = [dict(lead) for lead in LEADS] + [dict(LEADS[0], name="New 1"), dict(LEADS[1], name="New 2")]
+        changed[4]["role"] = "Founder"
+        second, stats, calls = run(make_leads(changed), OFFER, previous=first)
+        self.assertEqual(calls, 3)
+        self.assertEqual(second.to_list(), run(make_leads(changed), OFFER)[0].to_list())
+
+    def test_appended_leads_reuse_the_base(self):
+        """Test that leads appended in place only score the delta"""
+        leads = make_leads(LEADS)
+        first, _, _ = run(leads, OFFER)
+        leads.extend([dict(LEADS[2], name="Delta")])
+        second, _, calls = run(leads, OFFER, previous=first)
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(second), len(LEADS) + 1)
+
+    def test_offer_change_outside_inputs_reuses_results(self):
+        """Test that offer fields neither rules nor the mock read don't trigger recomputation"""
+        leads = make_leads(LEADS)
+        first, _, _ = run(leads, OFFER)
+        renamed = dict(OFFER, name="Renamed", value_props=["Other"])
+        _, stats, calls = run(leads, renamed, previous=first)
+        self.assertEqual(calls, 0)
+        self.assertEqual(stats["incremental"]["rules_reused"], len(LEADS))
+
+    def test_use_case_change_recomputes_both_parts(self):
+        """Test that ideal_use_cases feeds both the rules and the AI"""
+        leads = make_leads(LEADS)
+        first, _, _ = run(leads, OFFER)
+        retail = dict(OFFER, ideal_use_cases=["Retail"])
+        second, stats, calls = run(leads, retail, previous=first)
+        self.assertEqual(calls, len(LEADS))
+        self.assertEqual(stats["incremental"]["rules_reused"], 0)
+        self.assertEqual(second.to_list(), run(leads, retail)[0].to_list())
+
+    def test_vertex_value_props_change_keeps_rule_scores(self):
+        """Test that with Vertex a prompt-only change reuses rules but reclassifies"""
+        leads = make_leads(LEADS[:6])
+        with mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"), \
+                mock.patch.object(ai, "AI_BATCH_SIZE", 1), \
+                mock.patch.object(ai, "_cache", TieredCache(path=None)), \
+                mock.patch.object(ai, "_call_vertex_api_key",
+                                  return_value={"predictions": [{"content": "High - fit."}]}) as call:
+            first, _, _ = run(leads, OFFER)
+            second, stats, _ = run(leads, dict(OFFER, value_props=["New prop"]), previous=first)
+        self.assertEqual(call.call_count, 12)
+        self.assertEqual(stats["incremental"]["rules_reused"], 6)
+        self.assertEqual(stats["incremental"]["ai_reused"], 0)
+
+    def test_fallbacks_are_not_reused(self):
+        """Test that leads that fell back to the mock are retried next run"""
+        leads = make_leads(LEADS[:4])
+        with mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"), \
+                mock.patch.object(ai, "AI_BATCH_SIZE", 1), \
+                mock.patch.object(ai, "_cache", TieredCache(path=None)), \
+                mock.patch.object(ai, "_call_vertex_api_key", side_effect=RuntimeError("down")):
+            first, _, _ = run(leads, OFFER)
+            _, stats, calls = run(leads, OFFER, previous=first)
+        self.assertEqual(stats["incremental"]["ai_reused"], 0)
+        self.assertEqual(calls, 4)
+
+    def test_disabled(self):
+        """Test that incremental=False rescores everything and records nothing"""
+        leads = make_leads(LEADS)
+        first, _, _ = run(leads, OFFER)
+        results = ResultStore(leads)
+        results.extend(scoring.iter_score_leads(leads, OFFER, previous=first, inputs=results.inputs,
+                                                incremental=False))
+        self.assertEqual(len(results.inputs), 0)
+        self.assertEqual(results.to_list(), first.to_list())
+
+class TestAppendUpload(unittest.TestCase):
+
+    def test_append_then_incremental_score(self):
+        """Test uploading a delta with mode=append and rescoring only the new rows"""
+        from app import app
+        from utils.storage import storage
+
+        client = app.test_client()
+        header = "name,role,company,industry,location,linkedin_bio\n"
+
+        def upload(csv_text, mode=None):
+            url = "/leads/upload" + (f"?mode={mode}" if mode else "")
+            return client.post(url, data={"file": (io.BytesIO(csv_text.encode()), "leads.csv")},
+                               content_type="multipart/form-data")
+
+        storage["offer"] = OFFER
+        self.assertEqual(upload(header + "Ava,CEO,Flow,SaaS,Pune,growth\n").status_code, 200)
+        self.assertEqual(client.post("/score?incremental=true").status_code, 200)
+
+        response = upload(header + "Ben,Manager,Acme,Retail,Delhi,sales\n", mode="append")
+        self.assertEqual(response.get_json()["total_leads"], 2)
+        body = client.post("/score").get_json()
+        self.assertEqual(body["incremental"]["ai_reused"], 1)
+        self.assertEqual([row["name"] for row in client.get("/results").get_json()], ["Ava", "Ben"])
+
+        response = upload(header.strip() + ",email\nX,CEO,Co,SaaS,Pune,bio,x@y.z\n", mode="append")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("same columns", response.get_json()["error"])
+        self.assertEqual(upload(header + "Z,CEO,Co,SaaS,Pune,bio\n", mode="merge").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
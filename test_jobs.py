@@ -0,0 +1,129 @@
+"""
+Unit tests for background scoring jobs
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import services.jobs as jobs
+import services.scoring as scoring
+from services.jobs import ScoringJob, get_job, submit_job
+from utils.lead_store import LeadStore
+
+OFFER = {"name": "AI Outreach", "ideal_use_cases": ["B2B SaaS"]}
+LEADS = [{"name": f"Lead {i}", "role": "CEO", "company": "Co", "industry": "SaaS",
+          "location": "Austin", "linkedin_bio": "bio"} for i in range(30)]
+
+def make_leads():
+    leads = LeadStore()
+    leads.extend(LEADS)
+    return leads
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+
+class TestScoringJobs(unittest.TestCase):
+
+    def test_job_completes_and_publishes(self):
+        """Test that a job scores every lead and calls on_complete"""
+        published = []
+        job = submit_job(LEADS, OFFER, max_workers=4, on_complete=published.append)
+        _wait(job)
+        self.assertIs(get_job(job.id), job)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(published, [job])
+        self.assertEqual(job.results.to_list(), scoring.score_leads(LEADS, OFFER, max_workers=1))
+        progress = job.progress()
+        self.assertEqual((progress["done"], progress["total"]), (30, 30))
+
+    def test_cancel_keeps_partial_results(self):
+        """Test that cancelling stops the job and keeps finished rows"""
+        gate = threading.Event()
+        original = scoring.ai_classify
+
+        def slow(lead, offer):
+            if lead["name"] == "Lead 5":
+                gate.wait(5)
+            return original(lead, offer)
+
+        published = []
+        with mock.patch.object(scoring, "ai_classify", side_effect=slow):
+            job = ScoringJob(LEADS, OFFER, max_workers=1)
+            worker = threading.Thread(target=job.run, args=(published.append,))
+            worker.start()
+            while job.done < 5:
+                time.sleep(0.01)
+            self.assertTrue(job.cancel())
+            gate.set()
+            worker.join(5)
+
+        self.assertEqual(job.status, "cancelled")
+        self.assertLess(job.done, len(LEADS))
+        self.assertEqual(published, [])
+        self.assertFalse(job.cancel())
+
+class TestJobsInOtherWorkers(unittest.TestCase):
+    """Routes asked about a job another worker process runs, which they only see through storage"""
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        self.storage = storage
+        storage["offer"] = OFFER
+        storage["leads"] = make_leads()
+
+    def _forget(self, job_id):
+        with jobs._jobs_lock:
+            return jobs._jobs.pop(job_id)
+
+    def test_status_and_results(self):
+        """Test that a finished job's status and rows are served until newer results replace them"""
+        body = self.client.post("/score?async=true").get_json()
+        job = self._forget(body["job_id"])
+        self.assertTrue(job.wait(5))
+        status = self.client.get(body["status_url"])
+        self.assertEqual(status.status_code, 200)
+        self.assertEqual(status.get_json(), job.progress())
+        response = self.client.get(body["results_url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), job.results.to_list())
+        self.assertEqual(response.headers["X-Job-Progress"], "30/30")
+
+        self.client.post("/score", json={"incremental": False})
+        self.assertEqual(self.client.get(body["results_url"]).status_code, 409)
+        self.assertEqual(self.client.get("/score/jobs/nope").status_code, 404)
+
+    def test_cancel(self):
+        """Test that a cancel requested through storage stops the job at its next sync"""
+        gate = threading.Event()
+        original = scoring.ai_classify
+
+        def slow(lead, offer):
+            if lead["name"] == "Lead 5":
+                gate.wait(5)
+            return original(lead, offer)
+
+        with mock.patch.object(scoring, "ai_classify", side_effect=slow), \
+                mock.patch.object(jobs, "SCORE_JOB_SYNC_SECONDS", 0):
+            body = self.client.post("/score?async=true", json={"max_workers": 1}).get_json()
+            job = self._forget(body["job_id"])
+            while job.done < 5:
+                time.sleep(0.01)
+            self.assertEqual(self.client.get(body["results_url"]).status_code, 409)
+            self.assertEqual(self.client.delete(body["status_url"]).status_code, 202)
+            gate.set()
+            self.assertTrue(job.wait(5))
+
+        self.assertEqual(job.status, "cancelled")
+        self.assertLess(job.done, len(LEADS))
+        self.assertEqual(self.client.get(body["status_url"]).get_json()["status"], "cancelled")
+        self.assertEqual(self.client.delete(body["status_url"]).status_code, 409)
+
+if __name__ == "__main__":
+    unittest.main()
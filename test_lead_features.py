@@ -0,0 +1,101 @@
+"""
+Unit tests for single-pass lead feature extraction shared by the rules and the mock classifier
+"""
+
+import itertools
+import unittest
+
+from services.ai import mock_ai
+from services.lead_features import NO_FEATURES, FeatureExtractor, FeaturedLead, lead_features
+from services.rules import RuleScorer, calculate_rule_score
+from services.scoring import score_leads
+from utils.lead_store import LeadStore
+
+OFFERS = [
+    {"name": "Outreach", "ideal_use_cases": ["B2B SaaS mid-market"]},
+    {"name": "Retail POS", "ideal_use_cases": ["Retail stores"]},
+    {"name": "Empty"},
+]
+ROLES = ["CEO", "Head of Growth", "Team Lead", "Senior Engineer", "Intern", "CXO", "", None]
+INDUSTRIES = ["SaaS", "B2B Retail", "Software", "Technology", "Retail", "", None]
+BIOS = ["Drives growth and sales", "Loves hiking", "", None]
+
+def make_leads():
+    return [
+        {
+            "name": "Lead",
+            "role": role,
+            "company": "Co" if i % 5 else "",
+            "industry": industry,
+            "location": "Pune",
+            "linkedin_bio": bio,
+        }
+        for i, (role, industry, bio) in enumerate(itertools.product(ROLES, INDUSTRIES, BIOS))
+    ]
+
+def reference_mock_ai(lead, offer):
+    """mock_ai as written before feature extraction, as plain keyword checks"""
+    role = (lead.get("role") or "").lower()
+    industry = (lead.get("industry") or "").lower()
+    icp_saas = "saas" in " ".join(offer.get("ideal_use_cases") or []).lower()
+    if any(k in role for k in ["ceo", "founder", "cto", "cxo", "head", "vp", "director"]):
+        if icp_saas or any(k in industry for k in ["saas", "software"]):
+            return "High", "Decision-maker at an organization matching ICP (SaaS/software)."
+        return "High", "Senior decision-maker role detected."
+    if any(k in role for k in ["manager", "lead", "senior"]):
+        if icp_saas or any(k in industry for k in ["saas", "b2b", "software"]):
+            return "Medium", "Mid-level role in relevant industry; may influence purchasing decisions."
+        return "Medium", "Relevant role, but not a confirmed decision-maker."
+    bio = (lead.get("linkedin_bio") or "").lower()
+    if any(k in bio for k in ["growth", "sales", "revops", "outreach", "marketing"]):
+        return "Medium", "Role or bio mentions growth/marketing—may be receptive to outreach."
+    return "Low", "No strong signals in role, industry or bio."
+
+class TestLeadFeatures(unittest.TestCase):
+
+    def test_scorers_match_reference(self):
+        """Test that rules and mock AI give the same answers from stored, wrapped or no features"""
+        leads = make_leads()
+        store = LeadStore(featurize=FeatureExtractor())
+        store.extend(leads)
+        for offer in OFFERS:
+            scorer = RuleScorer(offer)
+            for lead, row in zip(leads, store):
+                with self.subTest(offer=offer["name"], lead=lead):
+                    expected = calculate_rule_score(lead, offer)
+                    self.assertEqual(scorer.score(lead), expected)
+                    self.assertEqual(scorer.score(row), expected)
+                    self.assertEqual(scorer.score(FeaturedLead(lead, lead_features(lead))), expected)
+                    self.assertEqual(mock_ai(lead, offer), reference_mock_ai(lead, offer))
+                    self.assertEqual(mock_ai(row, offer), reference_mock_ai(lead, offer))
+
+    def test_extractor_matches_lead_features(self):
+        """Test that the memoised extractor agrees with lead_features and stores one value per row"""
+        extractor = FeatureExtractor()
+        store = LeadStore(featurize=extractor)
+        store.extend(make_leads())
+        self.assertEqual(len(store.features), len(store))
+        for row in store:
+            self.assertEqual(row.features, lead_features(row))
+
+    def test_unreadable_lead_falls_back(self):
+        """Test that a lead the extractor can't read is stored as NO_FEATURES and still errors when scored"""
+        store = LeadStore(featurize=FeatureExtractor())
+        store.append({"name": "Bad", "role": 5, "industry": "SaaS"})
+        store.append({"name": "Good", "role": "CEO", "industry": "SaaS"})
+        self.assertEqual(store[0].features, NO_FEATURES)
+        self.assertIsNone(LeadStore([]).features)
+
+        results = score_leads(store, OFFERS[0], incremental=False)
+        self.assertEqual(results[0]["score"], 0)
+        self.assertTrue(results[0]["reasoning"].startswith("Error processing lead"))
+        self.assertEqual(results[1]["intent"], "High")
+
+    def test_non_string_bio_counts_as_empty(self):
+        """Test that a non-string bio doesn't stop the rules from scoring the lead"""
+        lead = {"name": "A", "role": "Intern", "industry": "Retail", "linkedin_bio": 7}
+        self.assertEqual(RuleScorer(OFFERS[0]).score(lead), calculate_rule_score(lead, OFFERS[0]))
+        self.assertEqual(mock_ai(lead, OFFERS[0])[0], "Low")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Unit tests for the columnar lead and result stores
+"""
+
+import unittest
+
+from services.rules import calculate_rule_score, calculate_rule_scores_batch
+from utils.lead_store import LeadStore, ResultStore
+
+class TestLeadStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a store with a few leads"""
+        self.leads = [
+            {"name": f"Lead {i}", "role": ["CEO", "Manager", "Intern"][i % 3], "company": f"Co {i}",
+             "industry": ["SaaS", "Retail"][i % 2], "location": "Austin", "linkedin_bio": "bio"}
+            for i in range(10)
+        ]
+        self.leads.append({"name": "Short Row", "role": "CTO", "company": "Co",
+                           "industry": None, "location": None, "linkedin_bio": None})
+        self.store = LeadStore()
+        self.store.extend(self.leads)
+
+    def test_rows_match_input(self):
+        """Test that row views read back the appended values"""
+        self.assertEqual(len(self.store), len(self.leads))
+        self.assertEqual([dict(row) for row in self.store], self.leads)
+        self.assertEqual(self.store[3]["role"], "CEO")
+        self.assertEqual(self.store[-1].get("industry", "x"), None)
+        self.assertEqual(self.store[0].get("email", "n/a"), "n/a")
+        with self.assertRaises(IndexError):
+            self.store[len(self.leads)]
+
+    def test_interned_columns(self):
+        """Test that low-cardinality columns share one vocabulary"""
+        values, codes = self.store.factorize("role")
+        self.assertEqual(values, ["CEO", "Manager", "Intern", "CTO"])
+        self.assertEqual(len(codes), len(self.leads))
+
+    def test_rows_have_no_dict(self):
+        """Test that row views use __slots__"""
+        self.assertFalse(hasattr(self.store[0], "__dict__"))
+
+    def test_batch_scores_from_store(self):
+        """Test that batch rule scoring reads the store columns correctly"""
+        offer = {"ideal_use_cases": ["B2B SaaS"]}
+        self.assertEqual(
+            calculate_rule_scores_batch(self.store, offer).tolist(),
+            [calculate_rule_score(lead, offer) for lead in self.leads]
+        )
+
+class TestResultStore(unittest.TestCase):
+
+    def test_results_join_lead_fields(self):
+        """Test that results read name/role/company from the lead store"""
+        store = LeadStore()
+        store.append({"name": "Ava", "role": "CEO", "company": "Flow", "industry": "SaaS",
+                      "location": "Pune", "linkedin_bio": "bio"})
+        results = ResultStore(store)
+        results.extend([{"intent": "High", "score": 90, "reasoning": "Strong fit."}])
+        self.assertEqual(results.to_list(), [{
+            "name": "Ava", "role": "CEO", "company": "Flow",
+            "intent": "High", "score": 90, "reasoning": "Strong fit."
+        }])
+        self.assertEqual(len(results), 1)
+        self.assertFalse(ResultStore())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for the Prometheus-style metrics registry and /metrics endpoint
+"""
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from utils.metrics import Counter, Histogram, Registry
+
+def _worker_increments(directory, count):
+    registry = Registry(directory=directory, enabled=True)
+    counter = Counter("jobs", "Jobs done", registry=registry)
+    for _ in range(count):
+        counter.inc()
+
+class TestRegistry(unittest.TestCase):
+
+    def test_counter_with_labels(self):
+        """Test that counters are rendered per label set with a _total suffix"""
+        registry = Registry(directory="", enabled=True)
+        counter = Counter("leads", "Leads scored", labelnames=("intent",), registry=registry)
+        counter.inc(3, intent="High")
+        counter.inc(intent="Low")
+        text = registry.render()
+        self.assertIn("# TYPE leads counter", text)
+        self.assertIn('leads_total{intent="High"} 3', text)
+        self.assertIn('leads_total{intent="Low"} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets, sum and count follow the exposition format"""
+        registry = Registry(directory="", enabled=True)
+        histogram = Histogram("latency", "Latency", buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+        text = registry.render()
+        self.assertIn('latency_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_bucket{le="1.0"} 3', text)
+        self.assertIn('latency_bucket{le="+Inf"} 4', text)
+        self.assertIn("latency_sum 6.05", text)
+        self.assertIn("latency_count 4", text)
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes and newlines in label values are escaped"""
+        registry = Registry(directory="", enabled=True)
+        counter = Counter("errors", "Errors", labelnames=("status",), registry=registry)
+        counter.inc(status='bad "x"\n')
+        self.assertIn('errors_total{status="bad \\"x\\"\\n"} 1', registry.render())
+
+    def test_disabled_registry_records_nothing(self):
+        """Test that METRICS_ENABLED=false turns updates into no-ops"""
+        registry = Registry(directory="", enabled=False)
+        Counter("leads", "Leads", registry=registry).inc()
+        self.assertEqual(registry.collect(), {})
+
+    def test_file_values_grow_and_reload(self):
+        """Test that the mmap store grows past its initial size and survives reopening"""
+        with tempfile.TemporaryDirectory() as directory:
+            registry = Registry(directory=directory, enabled=True)
+            counter = Counter("series", "Many series", labelnames=("n",), registry=registry)
+            for n in range(3000):
+                counter.inc(n, n=n)
+            reopened = Registry(directory=directory, enabled=True)
+            Counter("series", "Many series", labelnames=("n",), registry=reopened).inc(1, n=2999)
+            totals = reopened.collect()
+            self.assertEqual(len(totals), 3000)
+            self.assertEqual(registry.collect(), totals)
+            self.assertIn('series_total{n="2999"} 3000', reopened.render())
+
+    def test_workers_are_summed(self):
+        """Test that counters from several processes are added up when scraped"""
+        with tempfile.TemporaryDirectory() as directory:
+            context = multiprocessing.get_context("fork")
+            workers = [context.Process(target=_worker_increments, args=(directory, 100)) for _ in range(3)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.assertEqual(len(os.listdir(directory)), 3)
+            registry = Registry(directory=directory, enabled=True)
+            Counter("jobs", "Jobs done", registry=registry)
+            self.assertIn("jobs_total 300", registry.render())
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_pipeline_metrics_exposed(self):
+        """Test that an upload, scoring run and export show up on /metrics"""
+        from app import app
+        from utils.storage import storage
+        import io
+
+        client = app.test_client()
+        storage["offer"] = {"name": "Outreach", "value_props": ["x"], "ideal_use_cases": ["B2B SaaS"]}
+        csv_data = (
+            "name,role,company,industry,location,linkedin_bio\n"
+            "Ava,Head of Growth,Flow,SaaS,Pune,growth\n"
+            "Ben,Intern,Acme,Retail,Delhi,\n"
+        )
+        response = client.post(
+            "/leads/upload", data={"file": (io.BytesIO(csv_data.encode()), "leads.csv")},
+            content_type="multipart/form-data"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.post("/score").status_code, 200)
+        self.assertTrue(client.get("/results/export").get_data())
+
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        text = response.get_data(as_text=True)
+        self.assertIn("leads_csv_parse_seconds_count", text)
+        self.assertIn("leads_csv_rows_total", text)
+        self.assertIn('ai_classify_seconds_count{provider="mock",mode="single",outcome="success"}', text)
+        self.assertIn("scoring_leads_total", text)
+        self.assertIn('results_export_bytes_count{format="csv",encoding="identity"}', text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Unit tests for multi-offer scoring (leads × offers matrix and best offer per lead)
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import services.offer_matrix as offer_matrix
+from services.scoring import score_leads
+from utils.lead_store import DEDUPE_MODES, LeadStore
+from utils.storage import SQLiteStorage
+
+OFFERS = [
+    {"name": "Outreach", "value_props": ["24/7 outreach"], "ideal_use_cases": ["B2B SaaS"]},
+    {"name": "Retail POS", "ideal_use_cases": ["Retail stores"]},
+    {"name": "Fintech", "ideal_use_cases": ["Fintech", "banking software"]},
+    {"name": "Broken", "ideal_use_cases": [3]},
+]
+ROLES = ["CEO", "Head of Growth", "Intern", "Senior Engineer", "", None, "Marketing Manager"]
+INDUSTRIES = ["SaaS", "Retail", "Banking", "Software", "", "Healthcare"]
+BIOS = ["Drives growth and sales", "", None, "Loves hiking"]
+
+def make_leads(count=84):
+    leads = LeadStore()
+    leads.extend(
+        {
+            "name": f"Lead {i}",
+            "role": ROLES[i % len(ROLES)],
+            "company": f"Co {i % 9}" if i % 13 else "",
+            "industry": INDUSTRIES[i % len(INDUSTRIES)],
+            "location": "Pune",
+            "linkedin_bio": BIOS[i % len(BIOS)],
+        }
+        for i in range(count)
+    )
+    return leads
+
+class TestScoreMatrix(unittest.TestCase):
+
+    def test_matches_scoring_each_offer(self):
+        """Test that every column equals a full scoring run against that offer"""
+        leads = make_leads()
+        stats = {}
+        matrix = offer_matrix.score_matrix(leads, OFFERS, stats)
+        self.assertEqual(stats["path"], "shared_features")
+        for offer in OFFERS:
+            with self.subTest(offer=offer["name"]):
+                expected = [result["score"] for result in score_leads(leads, offer, incremental=False)]
+                self.assertEqual(list(matrix.offer_scores(offer["name"])), expected)
+
+    def test_duplicates_take_first_copy_scores(self):
+        """Test that leads indexed as duplicates get their first copy's scores, as in score_leads"""
+        leads = LeadStore(dedupe_fields=DEDUPE_MODES["name_company"])
+        leads.extend([
+            {"name": "Ava", "role": "CEO", "company": "Flow", "industry": "SaaS", "location": "Pune",
+             "linkedin_bio": "Drives growth"},
+            {"name": "Ava", "role": "Intern", "company": "Flow", "industry": "Retail", "location": "",
+             "linkedin_bio": ""},
+        ])
+        self.assertEqual(leads.dedupe.duplicates, 1)
+        for path, remote in (("shared_features", False), ("per_offer", True)):
+            stats = {}
+            with mock.patch.object(offer_matrix, "is_remote_provider", return_value=remote):
+                matrix = offer_matrix.score_matrix(leads, OFFERS, stats)
+            self.assertEqual(stats["path"], path)
+            for offer in OFFERS:
+                with self.subTest(path=path, offer=offer["name"]):
+                    expected = [result["score"] for result in score_leads(leads, offer, incremental=False)]
+                    self.assertEqual(expected[0], expected[1])
+                    self.assertEqual(list(matrix.offer_scores(offer["name"])), expected)
+
+    def test_non_ascii_text(self):
+        """Test that the shared-feature path matches scoring on text whose lowercase form is longer"""
+        leads = LeadStore()
+        leads.extend([
+            {"name": "A", "role": "software director İnc", "company": "İ", "industry": "software director İnc SaaS",
+             "location": "Pune", "linkedin_bio": "İİ growth"},
+            {"name": "B", "role": "İİİ Head", "company": "Straße", "industry": "ẞ retail stores",
+             "location": "Pune", "linkedin_bio": ""},
+        ])
+        stats = {}
+        matrix = offer_matrix.score_matrix(leads, OFFERS, stats)
+        self.assertEqual(stats["path"], "shared_features")
+        for offer in OFFERS:
+            with self.subTest(offer=offer["name"]):
+                expected = [result["score"] for result in score_leads(leads, offer, incremental=False)]
+                self.assertEqual(list(matrix.offer_scores(offer["name"])), expected)
+
+    def test_best_offer_is_first_highest(self):
+        """Test that the best offer is the highest score, the first offer winning ties"""
+        matrix = offer_matrix.score_matrix(make_leads(), OFFERS)
+        for row in matrix:
+            scores = list(row["scores"].values())
+            self.assertEqual(row["best_score"], max(scores))
+            self.assertEqual(row["best_offer"], matrix.offers[scores.index(max(scores))])
+
+    def test_best_offer_query(self):
+        """Test filtering by best offer and paging by best score"""
+        matrix = offer_matrix.score_matrix(make_leads(), OFFERS)
+        rows = matrix.to_list()
+        total, page = matrix.query(offer="Retail POS", sort="-score", offset=1, limit=3)
+        expected = sorted((row for row in rows if row["best_offer"] == "Retail POS"),
+                          key=lambda row: -row["best_score"])
+        self.assertEqual(total, len(expected))
+        self.assertEqual(page, expected[1:4])
+
+    def test_per_offer_fallback(self):
+        """Test that a remote provider scores each offer through score_leads"""
+        leads = make_leads(10)
+        stats = {}
+        with mock.patch.object(offer_matrix, "is_remote_provider", return_value=True):
+            matrix = offer_matrix.score_matrix(leads, OFFERS[:2], stats)
+        self.assertEqual(stats["path"], "per_offer")
+        self.assertEqual(matrix.to_list(), offer_matrix.score_matrix(leads, OFFERS[:2]).to_list())
+
+    def test_sqlite_round_trip(self):
+        """Test that the SQLite backend stores and reads back the matrix"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = SQLiteStorage(os.path.join(tmpdir, "storage.sqlite3"))
+            storage["leads"] = make_leads(30)
+            matrix = offer_matrix.score_matrix(storage["leads"], OFFERS)
+            storage["matrix"] = matrix
+            stored = storage["matrix"]
+            self.assertEqual(stored.to_list(), matrix.to_list())
+            query = dict(offer="Outreach", sort="-score", limit=10)
+            self.assertEqual(stored.query(**query), matrix.query(**query))
+
+class TestMatrixEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        self.storage = storage
+        storage["offers"] = {}
+        storage["matrix"] = None
+        storage["leads"] = make_leads()
+
+    def test_offers_are_kept_by_name(self):
+        """Test that POST /offer adds to the stored offers and DELETE removes one"""
+        for offer in OFFERS[:3]:
+            self.assertEqual(self.client.post("/offer", json=offer).status_code, 200)
+        self.assertEqual(sorted(self.client.get("/offers").get_json()), sorted(o["name"] for o in OFFERS[:3]))
+        self.assertEqual(self.client.delete("/offers/Fintech").status_code, 200)
+        self.assertEqual(self.client.delete("/offers/Fintech").status_code, 404)
+        self.assertEqual(self.storage["offer"]["name"], "Fintech")
+
+    def test_score_and_query_matrix(self):
+        """Test scoring the stored offers and reading best offers back"""
+        self.storage["offers"] = {offer["name"]: offer for offer in OFFERS[:3]}
+        response = self.client.post("/score/matrix", json={"offers": ["Fintech", "Outreach"]})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["offers"], ["Fintech", "Outreach"])
+        self.assertEqual(sum(body["best_offer_counts"].values()), body["total_leads"])
+
+        rows = self.client.get("/results/matrix").get_json()
+        self.assertEqual(len(rows), 84)
+        self.assertEqual(list(rows[0]["scores"]), ["Fintech", "Outreach"])
+
+        response = self.client.get("/results/matrix?offer=Outreach&intent=High&limit=5&sort=-score")
+        page = response.get_json()
+        self.assertTrue(all(row["best_offer"] == "Outreach" and row["best_score"] >= 70 for row in page))
+        expected = [row for row in rows if row["best_offer"] == "Outreach" and row["best_score"] >= 70]
+        self.assertEqual(response.headers["X-Total-Count"], str(len(expected)))
+
+    def test_matrix_errors(self):
+        """Test missing offers, unknown names and a missing matrix"""
+        self.assertEqual(self.client.post("/score/matrix").status_code, 400)
+        self.assertEqual(self.client.get("/results/matrix").status_code, 404)
+        self.storage["offers"] = {"Outreach": OFFERS[0]}
+        self.assertEqual(self.client.post("/score/matrix", json={"offers": ["Nope"]}).status_code, 400)
+        self.assertEqual(self.client.post("/score/matrix", json={"offers": []}).status_code, 400)
+        self.client.post("/score/matrix")
+        self.assertEqual(self.client.get("/results/matrix?offer=Nope").status_code, 400)
+        self.assertEqual(self.client.get("/results/matrix?intent=Huge").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
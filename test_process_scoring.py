@@ -0,0 +1,190 @@
+"""
+Unit tests for process-pool scoring over shared lead columns
+"""
+
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+import services.process_scoring as process_scoring
+import services.scoring as scoring
+from utils.lead_store import DEDUPE_MODES, LeadStore, ResultStore
+from utils.shared_columns import SharedLeadColumns, SharedLeadReader
+
+OFFER = {"name": "AI Outreach", "value_props": ["24/7 outreach"], "ideal_use_cases": ["B2B SaaS"]}
+ROLES = ["CEO", "Head of Growth", "Intern", "VP Sales", "Marketing Manager", None]
+INDUSTRIES = ["B2B SaaS", "Retail", "Software", ""]
+
+def make_rows(count):
+    return [
+        {
+            "name": f"Lead {i % 23}",
+            "role": ROLES[i % len(ROLES)],
+            "company": f"Company {i % 7}",
+            "industry": INDUSTRIES[i % len(INDUSTRIES)],
+            "location": "Zürich" if i % 2 else "Pune",
+            "linkedin_bio": None if i % 11 == 0 else f"Runs sales and outreach ✓ {i % 5}",
+        }
+        for i in range(count)
+    ]
+
+def make_leads(rows, mode="off"):
+    leads = LeadStore(dedupe_fields=DEDUPE_MODES[mode])
+    leads.extend(rows)
+    return leads
+
+def tearDownModule():
+    if process_scoring._pool is not None:
+        process_scoring._pool.shutdown()
+        process_scoring._pool = None
+
+class TestSharedLeadColumns(unittest.TestCase):
+
+    def test_rows_round_trip(self):
+        """Test that rows read back from the shared file equal the stored leads"""
+        rows = make_rows(40)
+        leads = make_leads(rows)
+        shared = SharedLeadColumns(leads)
+        try:
+            reader = SharedLeadReader(shared.path, shared.layout, shared.size)
+            try:
+                self.assertEqual(list(reader.rows(0, 40)), rows)
+                self.assertEqual(list(reader.rows(17, 19)), rows[17:19])
+            finally:
+                reader.close()
+        finally:
+            shared.close()
+
+    def test_empty_upload(self):
+        """Test that an upload without rows can still be shared"""
+        shared = SharedLeadColumns(make_leads([]))
+        try:
+            reader = SharedLeadReader(shared.path, shared.layout, shared.size)
+            self.assertEqual(list(reader.rows(0, 0)), [])
+            reader.close()
+        finally:
+            shared.close()
+
+    def test_non_string_text_rejected(self):
+        """Test that non-string values in a text column raise TypeError"""
+        with self.assertRaises(TypeError):
+            SharedLeadColumns(make_leads([{"name": 42}]))
+
+@mock.patch.object(process_scoring, "SCORE_PROCESS_MIN_LEADS", 10)
+@mock.patch.object(process_scoring, "SCORE_PROCESS_BLOCKS_PER_WORKER", 3)
+@mock.patch.object(process_scoring, "SCORE_PROCESSES", 2)
+class TestProcessScoring(unittest.TestCase):
+
+    def _score(self, leads, **kwargs):
+        results = ResultStore(leads)
+        stats = {}
+        process_scoring.score_into(results, leads, OFFER, stats=stats, **kwargs)
+        return results, stats
+
+    def _threaded(self, leads):
+        results = ResultStore(leads)
+        stats = {}
+        results.extend(scoring.iter_score_leads(leads, OFFER, stats=stats, inputs=results.inputs))
+        return results, stats
+
+    def test_matches_threaded_path(self):
+        """Test that worker processes produce the same results and inputs as threads"""
+        leads = make_leads(make_rows(200))
+        results, stats = self._score(leads)
+        expected, _ = self._threaded(leads)
+        self.assertEqual(stats["processes"], 2)
+        self.assertEqual(results.to_list(), expected.to_list())
+        self.assertEqual(results.inputs.fingerprints, expected.inputs.fingerprints)
+        self.assertEqual(results.inputs.rule_scores, expected.inputs.rule_scores)
+        self.assertEqual(results.inputs.ai_fingerprint, expected.inputs.ai_fingerprint)
+
+    def test_duplicates_across_blocks(self):
+        """Test that duplicates get their first copy's result even when it was scored in another block"""
+        leads = make_leads(make_rows(200), "name_company")
+        results, stats = self._score(leads)
+        expected, expected_stats = self._threaded(leads)
+        self.assertEqual(stats["dedupe"], expected_stats["dedupe"])
+        self.assertEqual(stats["dedupe"]["duplicates"], leads.dedupe.duplicates)
+        self.assertEqual(results.to_list(), expected.to_list())
+        self.assertEqual(results.inputs.rule_scores, expected.inputs.rule_scores)
+
+    def test_cancel_stops_between_blocks(self):
+        """Test that a cancelled run stops after the block being merged"""
+        leads = make_leads(make_rows(120))
+        results, _ = self._score(leads, cancelled=lambda: True)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(results.inputs), 20)
+
+    def test_falls_back_to_threads(self):
+        """Test that small uploads, remote providers and reusable runs stay on threads"""
+        leads = make_leads(make_rows(50))
+        self.assertTrue(process_scoring.use_processes(leads))
+        self.assertFalse(process_scoring.use_processes(make_leads(make_rows(5))))
+        self.assertFalse(process_scoring.use_processes(list(make_rows(50))))
+        previous, _ = self._threaded(leads)
+        self.assertFalse(process_scoring.use_processes(leads, previous))
+        self.assertFalse(process_scoring.use_processes(leads, previous, offer=OFFER))
+        self.assertTrue(process_scoring.use_processes(leads, previous, incremental=False))
+        with mock.patch.object(process_scoring, "is_remote_provider", return_value=True):
+            self.assertFalse(process_scoring.use_processes(leads))
+        with mock.patch.object(process_scoring, "SCORE_PROCESSES", 1):
+            self.assertFalse(process_scoring.use_processes(leads))
+            _, stats = self._score(leads)
+        self.assertEqual(stats["processes"], 1)
+
+    def test_unreusable_previous_runs_use_processes(self):
+        """Test that an empty previous run, another offer or another upload don't keep a run on threads"""
+        leads = make_leads(make_rows(50))
+        previous, _ = self._threaded(leads)
+        self.assertTrue(process_scoring.use_processes(leads, ResultStore()))
+        other_offer = dict(OFFER, ideal_use_cases=["Retail"], name="Retail POS")
+        self.assertTrue(process_scoring.use_processes(leads, previous, offer=other_offer))
+        other_upload = make_leads([dict(row, name=f"New {i}") for i, row in enumerate(make_rows(50))])
+        self.assertTrue(process_scoring.use_processes(other_upload, previous, offer=OFFER))
+
+    def test_broken_pool_scores_in_this_process(self):
+        """Test that blocks a broken pool didn't return are scored here rather than failing the run"""
+        leads = make_leads(make_rows(120))
+        broken = Future()
+        broken.set_exception(BrokenProcessPool())
+        pool = mock.Mock()
+        # The first block's worker dies, then the pool refuses new blocks
+        pool.submit.side_effect = [broken, BrokenProcessPool()]
+        with mock.patch.object(process_scoring, "_get_pool", return_value=pool):
+            results, stats = self._score(leads)
+        expected, _ = self._threaded(leads)
+        self.assertEqual(stats["processes"], 1)
+        self.assertEqual(results.to_list(), expected.to_list())
+        self.assertEqual(results.inputs.fingerprints, expected.inputs.fingerprints)
+        pool.shutdown.assert_called()
+
+class TestProcessScoringRoute(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import MemoryStorage
+
+        self.client = app.test_client()
+        self.storage = MemoryStorage()
+        self.storage["offer"] = OFFER
+        self.storage["leads"] = make_leads(make_rows(60))
+        for patch in (
+            mock.patch("routes.score.storage", self.storage),
+            mock.patch.object(process_scoring, "SCORE_PROCESS_MIN_LEADS", 10),
+            mock.patch.object(process_scoring, "SCORE_PROCESSES", 2),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_fresh_storage_scores_in_processes(self):
+        """Test that the first /score on a fresh store takes the process path, and a rerun reuses it"""
+        self.assertIsNotNone(self.storage.get("results").inputs)
+        body = self.client.post("/score").get_json()
+        self.assertEqual(body["processes"], 2)
+        body = self.client.post("/score").get_json()
+        self.assertEqual(body["processes"], 1)
+        self.assertEqual(body["incremental"]["ai_reused"], 60)
+
+if __name__ == "__main__":
+    unittest.main()
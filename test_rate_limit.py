@@ -0,0 +1,100 @@
+"""
+Unit tests for the AI call rate limiter and adaptive concurrency
+"""
+
+import threading
+import unittest
+
+from utils.rate_limit import AdaptiveConcurrency, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        """Test that a full bucket allows a burst and then paces at the rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertAlmostEqual(clock.now, 0.5)
+
+    def test_oversized_request_drains_bucket(self):
+        """Test that a request larger than capacity still goes through"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=100, clock=clock, sleep=clock.sleep)
+        bucket.acquire(500)
+        self.assertAlmostEqual(bucket.acquire(50), 5.0)
+
+    def test_disabled(self):
+        """Test that a zero rate never waits"""
+        bucket = TokenBucket(rate=0)
+        for _ in range(100):
+            self.assertEqual(bucket.acquire(), 0.0)
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+
+    def test_additive_increase(self):
+        """Test that fast successful calls raise the limit up to the maximum"""
+        limiter = AdaptiveConcurrency(initial=2, maximum=4, target_latency=1.0)
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(latency=0.1)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_multiplicative_decrease_once_per_window(self):
+        """Test that a burst of 429s halves the limit once, not per response"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrency(initial=16, maximum=16, target_latency=1.0, clock=clock)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(latency=0.1, throttled=True)
+        self.assertEqual(limiter.limit, 8)
+        clock.now += 1.0
+        limiter.acquire()
+        limiter.release(latency=2.0)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.info()["throttled"], 5)
+        self.assertEqual(limiter.info()["slow"], 1)
+
+    def test_in_flight_never_exceeds_limit(self):
+        """Test that callers block while the limit is reached"""
+        limiter = AdaptiveConcurrency(initial=2, maximum=2)
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def call():
+            with limiter.slot():
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                threading.Event().wait(0.01)
+                with lock:
+                    state["active"] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(state["peak"], 2)
+
+    def test_errors_count_as_throttled(self):
+        """Test that an exception inside a slot backs off the limit"""
+        limiter = AdaptiveConcurrency(initial=8, maximum=8)
+        with self.assertRaises(RuntimeError):
+            with limiter.slot():
+                raise RuntimeError("timeout")
+        self.assertEqual(limiter.limit, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Unit tests for generation-cached /results bodies, ETags and conditional GETs
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.lead_store import LeadStore, ResultStore
+from utils.result_cache import GenerationCache
+from utils.storage import MemoryStorage, SQLiteStorage
+
+def make_results(scores):
+    leads = LeadStore()
+    leads.extend({"name": f"Lead {i}", "role": "CEO", "company": "Co"} for i in range(len(scores)))
+    results = ResultStore(leads)
+    results.extend({"intent": "High" if score >= 70 else "Low", "score": score, "reasoning": "r"}
+                   for score in scores)
+    return results
+
+class TestGenerationCache(unittest.TestCase):
+
+    def test_new_generation_drops_entries(self):
+        """Test that entries are only served for the generation they were stored under"""
+        cache = GenerationCache()
+        self.assertIsNone(cache.get("g1", "a"))
+        cache.put("g1", "a", b"body", {"X-Total-Count": "3"})
+        self.assertEqual(cache.get("g1", "a"), (b"body", {"X-Total-Count": "3"}))
+        self.assertIsNone(cache.get("g2", "a"))
+        cache.put("g1", "a", b"stale")
+        self.assertIsNone(cache.get("g2", "a"))
+
+    def test_lru_limits(self):
+        """Test eviction by entry count and by total bytes"""
+        cache = GenerationCache(max_entries=2, max_bytes=10)
+        cache.get("g", None)
+        cache.put("g", "a", b"1234")
+        cache.put("g", "b", b"1234")
+        cache.get("g", "a")
+        cache.put("g", "c", b"1234")
+        self.assertIsNone(cache.get("g", "b"))
+        cache.put("g", "d", b"12345678")
+        self.assertEqual([cache.get("g", key) is not None for key in "acd"], [False, False, True])
+        cache.put("g", "e", b"12345678901")
+        self.assertIsNone(cache.get("g", "e"))
+
+    def test_tee_caches_complete_streams(self):
+        """Test that a streamed body is cached only after its last chunk and only if small enough"""
+        cache = GenerationCache(max_bytes=6)
+        cache.get("g", None)
+        stream = cache.tee("g", "small", iter([b"ab", b"cd"]))
+        self.assertEqual(next(stream), b"ab")
+        self.assertIsNone(cache.get("g", "small"))
+        self.assertEqual(list(stream), [b"cd"])
+        self.assertEqual(cache.get("g", "small")[0], b"abcd")
+        self.assertEqual(b"".join(cache.tee("g", "big", iter([b"abcd", b"efgh"]))), b"abcdefgh")
+        self.assertIsNone(cache.get("g", "big"))
+
+class TestResultsGeneration(unittest.TestCase):
+
+    def test_memory_generation_bumps(self):
+        """Test that storing results changes the in-memory generation"""
+        storage = MemoryStorage()
+        self.assertIsNone(storage.results_generation())
+        storage["results"] = make_results([10])
+        first = storage.results_generation()
+        storage["offer"] = {"name": "x"}
+        self.assertEqual(storage.results_generation(), first)
+        storage["results"] = make_results([10])
+        self.assertNotEqual(storage.results_generation(), first)
+
+    def test_sqlite_generation_is_shared(self):
+        """Test that every process on the same file sees the same generation"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "storage.sqlite3")
+            storage = SQLiteStorage(path)
+            self.assertIsNone(storage.results_generation())
+            storage["results"] = make_results([10, 90])
+            self.assertEqual(SQLiteStorage(path).results_generation(), storage.results_generation())
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        self.storage = storage
+        storage["results"] = make_results([95, 40, 75, 10])
+
+    def test_etag_and_304(self):
+        """Test that an unchanged generation answers If-None-Match with an empty 304"""
+        response = self.client.get("/results")
+        etag = response.headers["ETag"]
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        repeat = self.client.get("/results", headers={"If-None-Match": etag})
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.get_data(), b"")
+        self.assertEqual(repeat.headers["ETag"], etag)
+
+    def test_cached_body_skips_serialisation(self):
+        """Test that a repeat poll returns the same bytes without reading the results again"""
+        first = self.client.get("/results?top=2")
+        with mock.patch.object(self.storage, "get", side_effect=AssertionError("results read")):
+            second = self.client.get("/results?top=2")
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers["X-Total-Count"], "4")
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+
+    def test_new_run_changes_etag(self):
+        """Test that storing new results invalidates the ETag and the cached body"""
+        response = self.client.get("/results")
+        self.storage["results"] = make_results([50])
+        fresh = self.client.get("/results", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(len(fresh.get_json()), 1)
+        self.assertNotEqual(fresh.headers["ETag"], response.headers["ETag"])
+
+    def test_representations_have_their_own_etag(self):
+        """Test that queries, export formats and encodings don't share ETags"""
+        etags = {
+            self.client.get("/results").headers["ETag"],
+            self.client.get("/results?top=1").headers["ETag"],
+            self.client.get("/results/export").headers["ETag"],
+            self.client.get("/results/export", headers={"Accept-Encoding": "gzip"}).headers["ETag"],
+            self.client.get("/results/export?format=ndjson").headers["ETag"],
+        }
+        self.assertEqual(len(etags), 5)
+
+    def test_export_served_from_cache(self):
+        """Test that the second export comes from the cache with the same headers"""
+        first = self.client.get("/results/export", headers={"Accept-Encoding": "gzip"})
+        body = first.get_data()
+        with mock.patch.object(self.storage, "get", side_effect=AssertionError("results read")):
+            second = self.client.get("/results/export", headers={"Accept-Encoding": "gzip"})
+            not_modified = self.client.get("/results/export", headers={
+                "Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+        self.assertEqual(second.get_data(), body)
+        self.assertEqual(second.headers["Content-Encoding"], "gzip")
+        self.assertEqual(second.headers["Content-Disposition"], first.headers["Content-Disposition"])
+        self.assertEqual(not_modified.status_code, 304)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Unit tests for the streamed results export (CSV/NDJSON chunks, gzip)
+"""
+
+import csv
+import gzip
+import io
+import json
+import unittest
+
+from utils.result_export import gzip_chunks, iter_csv, iter_ndjson
+
+RESULTS = [
+    {"name": f"Lead {i}", "role": "CEO", "company": "Co, Inc", "intent": "High",
+     "score": 90 - i, "reasoning": 'Says "hi"\nline two'}
+    for i in range(25)
+]
+
+class TestResultExport(unittest.TestCase):
+
+    def test_csv_chunks_match_dictwriter(self):
+        """Test that chunked CSV is byte-identical to a one-shot DictWriter export"""
+        expected = io.StringIO()
+        writer = csv.DictWriter(expected, fieldnames=["name", "role", "company", "intent", "score", "reasoning"])
+        writer.writeheader()
+        writer.writerows(RESULTS)
+        chunks = list(iter_csv(RESULTS, chunk_rows=10))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b"".join(chunks).decode("utf-8"), expected.getvalue())
+
+    def test_empty_csv_is_just_the_header(self):
+        """Test that no results still give a header row"""
+        self.assertEqual(b"".join(iter_csv([])), b"name,role,company,intent,score,reasoning\r\n")
+
+    def test_ndjson_lines(self):
+        """Test that NDJSON has one parseable object per result"""
+        body = b"".join(iter_ndjson(RESULTS, chunk_rows=7)).decode("utf-8")
+        self.assertTrue(body.endswith("\n"))
+        self.assertEqual([json.loads(line) for line in body.splitlines()], RESULTS)
+
+    def test_gzip_round_trip(self):
+        """Test that gzipped chunks decompress to the plain stream and each chunk is flushed"""
+        plain = list(iter_csv(RESULTS, chunk_rows=5))
+        compressed = list(gzip_chunks(iter(plain)))
+        self.assertGreaterEqual(len(compressed), len(plain))
+        self.assertEqual(gzip.decompress(b"".join(compressed)), b"".join(plain))
+
+class TestExportEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        storage["results"] = RESULTS
+
+    def test_csv_default(self):
+        """Test that the default export is an attachment CSV"""
+        response = self.client.get("/results/export")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertIn("lead_scores.csv", response.headers["Content-Disposition"])
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))), len(RESULTS))
+
+    def test_ndjson_gzip(self):
+        """Test that ?format=ndjson with Accept-Encoding: gzip sends compressed NDJSON"""
+        response = self.client.get("/results/export?format=ndjson", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        lines = gzip.decompress(response.get_data()).decode("utf-8").splitlines()
+        self.assertEqual(json.loads(lines[0])["name"], "Lead 0")
+
+    def test_unknown_format(self):
+        """Test that an unsupported format is rejected"""
+        self.assertEqual(self.client.get("/results/export?format=xml").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Unit tests for indexed /results queries (filters, sort, pagination, top-k)
+"""
+
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+from utils.lead_store import LeadStore, ResultStore
+from utils.storage import SQLiteStorage
+
+def make_results(count=300, seed=7):
+    rng = random.Random(seed)
+    leads = LeadStore()
+    leads.extend({"name": f"Lead {i}", "role": "CEO", "company": f"Co {i}"} for i in range(count))
+    results = ResultStore(leads)
+    for _ in range(count):
+        score = rng.randint(0, 100)
+        intent = "High" if score >= 70 else "Medium" if score >= 40 else "Low"
+        results.extend([{"intent": intent, "score": score, "reasoning": "r"}])
+    return results
+
+def brute_force(rows, intent=None, min_score=None, max_score=None, sort="row", offset=0, limit=None):
+    """The reference answer: filter, then sort, then slice"""
+    numbered = [
+        (row_id, row) for row_id, row in enumerate(rows)
+        if (intent is None or row["intent"] == intent)
+        and (min_score is None or row["score"] >= min_score)
+        and (max_score is None or row["score"] <= max_score)
+    ]
+    if sort == "-score":
+        numbered.sort(key=lambda item: (-item[1]["score"], item[0]))
+    elif sort == "score":
+        numbered.sort(key=lambda item: (item[1]["score"], -item[0]))
+    stop = None if limit is None else offset + limit
+    return len(numbered), [row for _, row in numbered[offset:stop]]
+
+QUERIES = [
+    dict(intent=intent, min_score=low, max_score=high, sort=sort, offset=offset, limit=limit)
+    for intent, (low, high), sort, (offset, limit) in itertools.product(
+        (None, "High", "Medium", "Low", "Unknown"),
+        ((None, None), (60, None), (None, 45), (40, 69), (80, 20)),
+        ("row", "score", "-score"),
+        ((0, None), (0, 10), (25, 7), (295, 10), (400, 5)),
+    )
+]
+
+class TestResultIndex(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        """Test every filter/sort/page combination against filtering the full list"""
+        results = make_results()
+        rows = results.to_list()
+        for query in QUERIES:
+            with self.subTest(**query):
+                self.assertEqual(results.query(**query), brute_force(rows, **query))
+
+    def test_index_follows_appended_rows(self):
+        """Test that the index is rebuilt only after rows were added"""
+        results = make_results(20)
+        index = results.index()
+        self.assertIs(results.index(), index)
+        results.leads.append({"name": "Late"})
+        results.extend([{"intent": "High", "score": 100, "reasoning": "r"}])
+        self.assertEqual(results.query(sort="-score", limit=1)[1][0]["name"], "Late")
+
+    def test_unknown_sort(self):
+        """Test that an unknown sort raises"""
+        with self.assertRaises(ValueError):
+            make_results(5).query(sort="name")
+
+class TestSQLiteQuery(unittest.TestCase):
+
+    def test_matches_memory(self):
+        """Test that the SQLite backend answers every query like the in-memory index"""
+        results = make_results(120)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = SQLiteStorage(os.path.join(tmpdir, "storage.sqlite3"))
+            storage["results"] = results
+            stored = storage["results"]
+            for query in QUERIES:
+                with self.subTest(**query):
+                    self.assertEqual(stored.query(**query), results.query(**query))
+
+class TestResultsEndpoint(unittest.TestCase):
+
+    def setUp(self):
+        from app import app
+        from utils.storage import storage
+
+        self.client = app.test_client()
+        storage["results"] = make_results()
+        self.rows = storage["results"].to_list()
+
+    def test_plain_list_unchanged(self):
+        """Test that /results without query parameters still returns every result"""
+        response = self.client.get("/results")
+        self.assertEqual(response.get_json(), self.rows)
+        self.assertNotIn("X-Total-Count", response.headers)
+
+    def test_filtered_page(self):
+        """Test a score filter with limit/offset and the pagination headers"""
+        response = self.client.get("/results?min_score=60&sort=-score&offset=10&limit=20")
+        total, expected = brute_force(self.rows, min_score=60, sort="-score", offset=10, limit=20)
+        self.assertEqual(response.get_json(), expected)
+        self.assertEqual(response.headers["X-Total-Count"], str(total))
+        self.assertEqual(response.headers["X-Next-Offset"], "30")
+
+    def test_top_k(self):
+        """Test that ?top=k&intent=High returns the k best High-intent leads"""
+        body = self.client.get("/results?top=5&intent=High").get_json()
+        self.assertEqual(body, brute_force(self.rows, intent="High", sort="-score", limit=5)[1])
+
+    def test_invalid_parameters(self):
+        """Test that bad numbers, sorts and intents are rejected"""
+        for query in ("limit=-1", "offset=x", "sort=name", "top=", "min_score=1.5", "intent=high", "intent="):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/results?{query}").status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
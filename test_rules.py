@@ -2,8 +2,9 @@
 Unit tests for the rule-based scoring logic
 """
 
+import itertools
 import unittest
-from services.rules import calculate_rule_score
+from services.rules import calculate_rule_score, calculate_rule_scores_batch, RuleScorer
 
 class TestRuleScoring(unittest.TestCase):
     
@@ -142,5 +143,73 @@ class TestRuleScoring(unittest.TestCase):
         # Should get: 20 (role) + 10 (adjacent industry) + 10 (complete data) = 40
         self.assertEqual(score, 40)
 
+class TestCompiledRuleScorer(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a grid of leads and offers"""
+        roles = ["CEO", "Head of Growth", "Team Lead", "Senior Engineer", "Intern", "", None,
+                 "Vice President Sales", "Principal PM", "Co-Founder", "Director", "Chief Hacker"]
+        industries = ["SaaS", "B2B SaaS mid-market", "Technology", "Retail", "Fintech", "", None,
+                      "Healthcare Software", "mid-market retail"]
+        self.offers = [
+            {"ideal_use_cases": ["B2B SaaS mid-market"]},
+            {"ideal_use_cases": ["Healthcare", "Retail Ops"]},
+            {"ideal_use_cases": []},
+            {},
+        ]
+        self.leads = [
+            {
+                "name": "Test",
+                "role": role,
+                "company": "TestCorp",
+                "industry": industry,
+                "location": location,
+                "linkedin_bio": "bio"
+            }
+            for role, industry, location in itertools.product(roles, industries, ["Austin", "", "  "])
+        ]
+
+    def test_matches_calculate_rule_score(self):
+        """Test that the compiled scorer gives identical scores"""
+        for offer in self.offers:
+            scorer = RuleScorer(offer)
+            for lead in self.leads:
+                with self.subTest(lead=lead, offer=offer):
+                    self.assertEqual(scorer.score(lead), calculate_rule_score(lead, offer))
+
+    def test_batch_matches_calculate_rule_score(self):
+        """Test that vectorised batch scoring gives identical scores"""
+        for offer in self.offers:
+            expected = [calculate_rule_score(lead, offer) for lead in self.leads]
+            with self.subTest(offer=offer):
+                self.assertEqual(calculate_rule_scores_batch(self.leads, offer).tolist(), expected)
+
+    def test_batch_edge_cases(self):
+        """Test batch scoring on empty input and sparse leads"""
+        offer = {"ideal_use_cases": ["B2B SaaS"]}
+        self.assertEqual(len(calculate_rule_scores_batch([], offer)), 0)
+        leads = [{}, {"role": "CEO", "industry": "SaaS"}, {"name": 0, "role": "Manager"}]
+        self.assertEqual(
+            calculate_rule_scores_batch(leads, offer).tolist(),
+            [calculate_rule_score(lead, offer) for lead in leads]
+        )
+
+    def test_batch_non_ascii_text(self):
+        """Test that batch scoring matches on text whose lowercase form is longer"""
+        offer = {"ideal_use_cases": ["B2B SaaS mid-market"]}
+        leads = [
+            {"role": "software director İnc", "industry": "software director İnc SaaS", "company": "İ"},
+            {"role": "İİİ CEO", "industry": "ẞ Technology", "company": "Straße"},
+            {"role": "Head of Growth", "industry": "Retail Ⅻ saas", "company": "Ǆ"},
+        ]
+        self.assertEqual(
+            calculate_rule_scores_batch(leads, offer).tolist(),
+            [calculate_rule_score(lead, offer) for lead in leads]
+        )
+
+    def test_empty_lead_data(self):
+        """Test compiled scoring with empty lead data"""
+        self.assertEqual(RuleScorer({"ideal_use_cases": ["B2B SaaS"]}).score({}), 0)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Unit tests for the scoring pipeline
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import services.scoring as scoring
+from services.rules import calculate_rule_score
+from services.ai import ai_classify
+
+class TestScoringPipeline(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.sample_offer = {
+            "name": "AI Outreach Automation",
+            "value_props": ["24/7 outreach", "6x more meetings"],
+            "ideal_use_cases": ["B2B SaaS mid-market"]
+        }
+        roles = ["CEO", "Marketing Manager", "Intern", "VP Sales", "Engineer"]
+        industries = ["SaaS", "Retail", "Technology", "B2B SaaS", "Healthcare"]
+        self.leads = [
+            {
+                "name": f"Lead {i}",
+                "role": roles[i % len(roles)],
+                "company": f"Company {i}",
+                "industry": industries[i % len(industries)],
+                "location": "Austin",
+                "linkedin_bio": "Growth leader" if i % 3 else ""
+            }
+            for i in range(40)
+        ]
+
+    def test_intent_bands(self):
+        """Test score to intent mapping"""
+        self.assertEqual(scoring.intent_for_score(70), "High")
+        self.assertEqual(scoring.intent_for_score(69), "Medium")
+        self.assertEqual(scoring.intent_for_score(40), "Medium")
+        self.assertEqual(scoring.intent_for_score(39), "Low")
+
+    def test_matches_rule_plus_ai(self):
+        """Test that a scored lead combines rule and AI points"""
+        lead = self.leads[0]
+        result = scoring.score_lead(lead, self.sample_offer)
+        expected = calculate_rule_score(lead, self.sample_offer) + ai_classify(lead, self.sample_offer)[2]
+        self.assertEqual(result["score"], expected)
+
+    def test_concurrent_matches_sequential(self):
+        """Test that concurrent scoring keeps order and values"""
+        sequential = scoring.score_leads(self.leads, self.sample_offer, max_workers=1)
+        concurrent = scoring.score_leads(self.leads, self.sample_offer, max_workers=8)
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual([r["name"] for r in concurrent], [l["name"] for l in self.leads])
+
+    def test_batch_rule_scores_match(self):
+        """Test that the vectorised path gives the same results above the threshold"""
+        per_lead = scoring.score_leads(self.leads, self.sample_offer, max_workers=1)
+        with mock.patch.object(scoring, "RULE_BATCH_THRESHOLD", 1):
+            self.assertIsNotNone(scoring.batch_rule_scores(self.leads, self.sample_offer))
+            batched = scoring.score_leads(self.leads, self.sample_offer, max_workers=1)
+        self.assertEqual(batched, per_lead)
+
+    def test_error_isolation(self):
+        """Test that one failing lead does not affect the others"""
+        original = scoring.ai_classify
+
+        def flaky(lead, offer):
+            if lead["name"] == "Lead 5":
+                raise ValueError("boom")
+            return original(lead, offer)
+
+        with mock.patch.object(scoring, "ai_classify", side_effect=flaky):
+            results = scoring.score_leads(self.leads, self.sample_offer, max_workers=4)
+
+        self.assertEqual(len(results), len(self.leads))
+        self.assertEqual(results[5]["score"], 0)
+        self.assertIn("boom", results[5]["reasoning"])
+        self.assertNotEqual(results[0]["score"], 0)
+
+    def test_in_flight_is_bounded(self):
+        """Test that no more than max_workers calls run at once"""
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def work(item):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.005)
+            with lock:
+                state["active"] -= 1
+            return item
+
+        out = list(scoring.bounded_map(work, range(30), 3))
+        self.assertEqual(out, list(range(30)))
+        self.assertLessEqual(state["peak"], 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+"""
+Unit tests for the storage backends
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import utils.storage as storage_module
+from services.lead_features import FeatureExtractor
+from services.scoring import score_leads
+from utils.lead_store import LeadStore, ResultStore, ScoreInputs
+from utils.storage import MemoryStorage, SQLiteStorage, create_storage
+
+LEADS = [
+    {"name": "Ava", "role": "CEO", "company": "Flow", "industry": "SaaS", "location": "Pune", "linkedin_bio": "bio"},
+    {"name": "Bob", "role": "Intern", "company": "Shop", "industry": "Retail", "location": "", "linkedin_bio": None},
+]
+
+class StorageContract:
+    """Behaviour every backend must share"""
+
+    def make_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = self.make_storage()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _store_leads(self):
+        leads = LeadStore()
+        leads.extend(LEADS)
+        self.storage["leads"] = leads
+        return self.storage["leads"]
+
+    def test_empty_storage(self):
+        """Test the initial state"""
+        self.assertIsNone(self.storage.get("offer"))
+        self.assertFalse(self.storage.get("leads"))
+        self.assertFalse(self.storage.get("results"))
+
+    def test_offer_round_trip(self):
+        """Test storing and reading the offer"""
+        self.storage["offer"] = {"name": "X", "ideal_use_cases": ["B2B"]}
+        self.assertEqual(self.storage["offer"], {"name": "X", "ideal_use_cases": ["B2B"]})
+
+    def test_put_and_delete_offers(self):
+        """Test that offers are added, replaced in place and deleted one at a time"""
+        self.assertEqual(self.storage.put_offer("A", {"name": "A"}), 1)
+        self.assertEqual(self.storage.put_offer("B", {"name": "B"}), 2)
+        self.assertEqual(self.storage.put_offer("A", {"name": "A", "value_props": ["new"]}), 2)
+        self.assertEqual(list(self.storage["offers"]), ["A", "B"])
+        self.assertEqual(self.storage["offers"]["A"]["value_props"], ["new"])
+        self.assertEqual(self.storage.delete_offer("A"), 1)
+        self.assertIsNone(self.storage.delete_offer("A"))
+        self.assertEqual(self.storage["offers"], {"B": {"name": "B"}})
+
+    def test_concurrent_offer_writes_are_kept(self):
+        """Test that offers stored at the same time from several threads are all kept"""
+        threads = [
+            threading.Thread(target=lambda i=i: self.writer().put_offer(f"O{i}", {"name": f"O{i}"}))
+            for i in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(self.storage["offers"]), sorted(f"O{i}" for i in range(16)))
+
+    def test_job_records(self):
+        """Test that job progress and cancel requests are shared through storage, finished records pruned"""
+        record = {"job_id": "j1", "status": "running", "done": 3, "total": 10}
+        self.assertIsNone(self.storage.get_job_record("j1"))
+        self.assertFalse(self.storage.request_job_cancel("j1"))
+        self.assertFalse(self.storage.sync_job_record("j1", record))
+        other = self.writer()
+        self.assertEqual(other.get_job_record("j1"), record)
+        self.assertTrue(other.request_job_cancel("j1"))
+        self.assertTrue(self.storage.sync_job_record("j1", dict(record, done=4)))
+        self.assertTrue(self.storage.sync_job_record("j1", dict(record, status="cancelled")))
+        self.assertFalse(other.request_job_cancel("j1"))
+        self.assertEqual(other.get_job_record("j1")["status"], "cancelled")
+
+        with mock.patch.object(storage_module, "KEEP_FINISHED_JOBS", 2):
+            for i in range(2, 5):
+                self.storage.sync_job_record(f"j{i}", dict(record, job_id=f"j{i}", status="completed"))
+            self.storage.sync_job_record("j5", dict(record, job_id="j5"))
+        self.assertEqual([job_id for job_id in ("j1", "j2", "j3", "j4", "j5") if self.storage.get_job_record(job_id)],
+                         ["j3", "j4", "j5"])
+
+    def writer(self):
+        """Storage a concurrent writer uses: the same instance, or another worker's for SQLite"""
+        return self.storage
+
+    def test_leads_round_trip(self):
+        """Test storing and reading leads"""
+        leads = self._store_leads()
+        self.assertEqual(len(leads), 2)
+        self.assertEqual([dict(lead) for lead in leads], LEADS)
+        self.assertEqual(leads[1].get("role"), "Intern")
+
+    def test_results_round_trip(self):
+        """Test that results join name/role/company from their leads"""
+        results = ResultStore(self._store_leads())
+        results.extend([
+            {"intent": "High", "score": 90, "reasoning": "Fit."},
+            {"intent": "Low", "score": 10, "reasoning": "No fit."},
+        ])
+        self.storage["results"] = results
+        stored = self.storage["results"]
+        self.assertEqual(len(stored), 2)
+        self.assertEqual(stored.to_list()[1], {
+            "name": "Bob", "role": "Intern", "company": "Shop",
+            "intent": "Low", "score": 10, "reasoning": "No fit."
+        })
+
+    def test_results_survive_new_upload(self):
+        """Test that results keep pointing at the leads they were scored from"""
+        results = ResultStore(self._store_leads())
+        results.extend([{"intent": "High", "score": 90, "reasoning": "Fit."}] * 2)
+        self.storage["results"] = results
+        self.storage["leads"] = LeadStore()
+        self.assertEqual(self.storage["results"].to_list()[0]["name"], "Ava")
+
+    def test_append_leads(self):
+        """Test that appended leads follow the current upload"""
+        self._store_leads()
+        delta = LeadStore()
+        delta.extend([dict(LEADS[0], name="Cid")])
+        self.assertEqual(self.storage.append_leads(delta), 3)
+        self.assertEqual([lead["name"] for lead in self.storage["leads"]], ["Ava", "Bob", "Cid"])
+
+    def test_append_to_empty_storage(self):
+        """Test that appending without an upload starts one"""
+        delta = LeadStore()
+        delta.extend(LEADS)
+        self.assertEqual(self.storage.append_leads(delta), 2)
+        self.assertEqual(len(self.storage["leads"]), 2)
+
+    def test_append_rejects_other_columns(self):
+        """Test that an appended CSV must have the same columns"""
+        self._store_leads()
+        delta = LeadStore(["name", "role", "company", "industry", "location", "linkedin_bio", "email"])
+        delta.extend([dict(LEADS[0], email="a@b.c")])
+        with self.assertRaises(ValueError):
+            self.storage.append_leads(delta)
+        self.assertEqual(len(self.storage["leads"]), 2)
+
+    def test_results_keep_score_inputs(self):
+        """Test that a run's fingerprints are stored with its results"""
+        results = ResultStore(self._store_leads())
+        results.inputs.rules_fingerprint, results.inputs.ai_fingerprint = "r1", "a1"
+        results.inputs.append(2 ** 64 - 1, 40)
+        results.inputs.append(7, None)
+        results.extend([
+            {"intent": "High", "score": 90, "reasoning": "Fit."},
+            {"intent": "Low", "score": 0, "reasoning": "Error."},
+        ])
+        self.storage["results"] = results
+        inputs = self.storage["results"].inputs
+        self.assertEqual((inputs.rules_fingerprint, inputs.ai_fingerprint), ("r1", "a1"))
+        self.assertEqual(list(inputs.fingerprints), [2 ** 64 - 1, 7])
+        self.assertEqual(list(inputs.rule_scores), [40, ScoreInputs.NO_RULE_SCORE])
+        self.assertEqual(self.storage["results"][1]["reasoning"], "Error.")
+
+class TestMemoryStorage(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        return MemoryStorage()
+
+class TestSQLiteStorage(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        return SQLiteStorage(os.path.join(self.tmpdir.name, "storage.sqlite3"))
+
+    def writer(self):
+        return SQLiteStorage(self.storage.path)
+
+    def test_offers_migrated_from_kv(self):
+        """Test that offers stored as one kv value by an older version are read as rows"""
+        db = self.storage.connection()
+        db.execute("INSERT INTO kv VALUES ('offers', ?)", (json.dumps({"Old": {"name": "Old"}}),))
+        reopened = SQLiteStorage(self.storage.path)
+        self.assertEqual(reopened["offers"], {"Old": {"name": "Old"}})
+        self.assertEqual(reopened.put_offer("New", {"name": "New"}), 2)
+
+    def test_shared_between_instances(self):
+        """Test that a second connection (another worker) sees the same data"""
+        other = SQLiteStorage(self.storage.path)
+        self.storage["offer"] = {"name": "Shared"}
+        self._store_leads()
+        self.assertEqual(other["offer"]["name"], "Shared")
+        self.assertEqual(len(other["leads"]), 2)
+
+    def test_append_is_invisible_to_earlier_views(self):
+        """Test that a view read before an append keeps its snapshot"""
+        before = self._store_leads()
+        delta = LeadStore()
+        delta.extend([dict(LEADS[0], name="Cid")])
+        self.storage.append_leads(delta)
+        self.assertEqual(len(list(before)), 2)
+        with self.assertRaises(IndexError):
+            before[2]
+        self.assertEqual(self.storage["leads"][2]["name"], "Cid")
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with self.assertRaises(ValueError):
+            create_storage("redis", None)
+
+class TestSnapshotStorage(StorageContract, unittest.TestCase):
+
+    def make_storage(self):
+        return MemoryStorage(os.path.join(self.tmpdir.name, "snapshot"))
+
+    def restart(self):
+        """A new process's storage, started from the snapshot"""
+        return MemoryStorage(self.storage.snapshot.directory)
+
+    def _scored(self):
+        leads = LeadStore(dedupe_fields=("name", "company"), featurize=FeatureExtractor())
+        leads.extend(LEADS + [LEADS[0]])
+        self.storage["offer"] = {"name": "X", "ideal_use_cases": ["SaaS"]}
+        self.storage["leads"] = leads
+        results = ResultStore(leads)
+        results.extend(score_leads(leads, self.storage["offer"], inputs=results.inputs, incremental=True))
+        self.storage["results"] = results
+        return leads, results
+
+    def test_restart_restores_storage(self):
+        """Test that a restarted storage maps back offer, leads and results as read-only stores"""
+        leads, results = self._scored()
+        restored = self.restart()
+        self.assertEqual(restored["offer"], self.storage["offer"])
+        self.assertEqual([dict(lead) for lead in restored["leads"]], [dict(lead) for lead in leads])
+        self.assertEqual(list(restored["leads"].dedupe.canonical), list(leads.dedupe.canonical))
+        self.assertEqual([lead.features for lead in restored["leads"]], list(leads.features))
+        self.assertTrue(restored["leads"].read_only)
+        self.assertEqual(restored["results"].to_list(), results.to_list())
+        query = dict(intent="High", sort="-score", limit=2)
+        self.assertEqual(restored["results"].query(**query), results.query(**query))
+        self.assertIsNotNone(restored.results_generation())
+
+    def test_restored_results_feed_incremental_scoring(self):
+        """Test that a run after a restart reuses the restored results"""
+        leads, _ = self._scored()
+        restored = self.restart()
+        stats = {}
+        score_leads(restored["leads"], restored["offer"], stats=stats, previous=restored["results"], incremental=True)
+        self.assertEqual(stats["incremental"]["ai_reused"], 2)
+
+    def test_append_after_restart(self):
+        """Test that appending copies the mapped leads and is snapshotted too"""
+        self._store_leads()
+        restored = self.restart()
+        delta = LeadStore()
+        delta.extend([dict(LEADS[0], name="Cid")])
+        self.assertEqual(restored.append_leads(delta), 3)
+        self.assertEqual([lead["name"] for lead in MemoryStorage(restored.snapshot.directory)["leads"]],
+                         ["Ava", "Bob", "Cid"])
+
+    def test_results_keep_their_lead_fields(self):
+        """Test that restored results show their own leads even after a new upload"""
+        results = ResultStore(self._store_leads())
+        results.extend([{"intent": "High", "score": 90, "reasoning": "Fit."}] * 2)
+        self.storage["results"] = results
+        self.storage["leads"] = LeadStore()
+        self.assertEqual(self.restart()["results"].to_list()[1]["name"], "Bob")
+
+    def test_failed_or_unreadable_files_are_dropped(self):
+        """Test that a key that can't be written, or a corrupt file, restarts empty"""
+        self._store_leads()
+        bad = LeadStore()
+        bad.extend([dict(LEADS[0], name=5)])
+        self.storage["leads"] = bad
+        with open(self.storage.snapshot.path("offer"), "wb") as f:
+            f.write(b"{not json")
+        restored = self.restart()
+        self.assertFalse(restored.get("leads"))
+        self.assertIsNone(restored.get("offer"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the Vertex HTTP client against a local stub server
+"""
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import services.ai as ai
+from utils.circuit_breaker import CircuitBreaker
+
+class StubVertex(BaseHTTPRequestHandler):
+    """Replies with the queued status codes, then 200 with a High label"""
+
+    statuses = []
+    requests_seen = 0
+    connections = set()
+
+    def do_POST(self):
+        cls = type(self)
+        cls.requests_seen += 1
+        cls.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = cls.statuses.pop(0) if cls.statuses else 200
+        body = json.dumps({"predictions": [{"content": "High - stub says yes."}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestVertexClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        StubVertex.protocol_version = "HTTP/1.1"
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubVertex)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Point the vertex provider at the stub with fast retries"""
+        StubVertex.statuses = []
+        StubVertex.requests_seen = 0
+        StubVertex.connections = set()
+        self.clock = [0.0]
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: self.clock[0])
+        self.patches = [
+            mock.patch.object(ai, "AI_PROVIDER", "vertex_api_key"),
+            mock.patch.object(ai, "AI_CACHE_ENABLED", False),
+            mock.patch.object(ai, "GEMINI_API_KEY", "test-key"),
+            mock.patch.object(ai, "GOOGLE_PROJECT", "test-project"),
+            mock.patch.object(ai, "VERTEX_BASE_URL", f"http://127.0.0.1:{self.server.server_port}"),
+            mock.patch.object(ai, "AI_MAX_RETRIES", 2),
+            mock.patch.object(ai, "AI_RETRY_BACKOFF_SECONDS", 0.001),
+            mock.patch.object(ai, "vertex_breaker", self.breaker),
+            mock.patch.object(ai, "_session", None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.lead = {"name": "Ava", "role": "Intern", "company": "Flow", "industry": "Retail",
+                     "location": "Pune", "linkedin_bio": "bio"}
+        self.offer = {"name": "AI Outreach", "ideal_use_cases": ["B2B SaaS"]}
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def test_retries_then_succeeds(self):
+        """Test that 429/5xx responses are retried"""
+        StubVertex.statuses = [429, 503]
+        label, reasoning, _ = ai.ai_classify(self.lead, self.offer)
+        self.assertEqual((label, reasoning), ("High", "stub says yes."))
+        self.assertEqual(StubVertex.requests_seen, 3)
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_connection_is_reused(self):
+        """Test that consecutive calls share a keep-alive connection"""
+        for _ in range(3):
+            ai.ai_classify(self.lead, self.offer)
+        self.assertEqual(StubVertex.requests_seen, 3)
+        self.assertEqual(len(StubVertex.connections), 1)
+
+    def test_breaker_opens_and_probes(self):
+        """Test that repeated failures short-circuit to mock until a probe succeeds"""
+        StubVertex.statuses = [500] * 6
+        for _ in range(2):
+            _, reasoning, _ = ai.ai_classify(self.lead, self.offer)
+            self.assertIn("Fallback to mock", reasoning)
+        self.assertEqual(self.breaker.state, "open")
+        seen = StubVertex.requests_seen
+
+        label, reasoning, _ = ai.ai_classify(self.lead, self.offer)
+        self.assertIn("circuit open", reasoning)
+        self.assertEqual(label, "Low")
+        self.assertEqual(StubVertex.requests_seen, seen)
+
+        # After the reset timeout one probe goes through and closes the circuit
+        StubVertex.statuses = []
+        self.clock[0] += 11
+        self.assertEqual(self.breaker.state, "half_open")
+        label, _, _ = ai.ai_classify(self.lead, self.offer)
+        self.assertEqual(label, "High")
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_probe_reopens(self):
+        """Test that a failing half-open probe opens the circuit again"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock[0] += 11
+        StubVertex.statuses = [500] * 3
+        ai.ai_classify(self.lead, self.offer)
+        self.assertEqual(self.breaker.state, "open")
+
+if __name__ == "__main__":
+    unittest.main()
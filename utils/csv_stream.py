@@ -0,0 +1,74 @@
+import csv
+import io
+from typing import Iterator, List, Optional
+
+CHUNK_ROWS = 1000
+
+
+class UploadLimitExceeded(Exception):
+    """Raised when an upload goes over its configured row or byte limit"""
+
+
+class _CountingStream(io.RawIOBase):
+    """
+    Read-only raw stream over any object with ``read(n)``, counting bytes as they go.
+
+    Lets io.TextIOWrapper decode werkzeug's spooled upload files incrementally,
+    which it can't wrap directly on every Python version.
+    """
+
+    def __init__(self, stream, max_bytes: Optional[int] = None):
+        self._stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        if self.max_bytes and self.bytes_read > self.max_bytes:
+            raise UploadLimitExceeded(f"File exceeds the {self.max_bytes} byte upload limit")
+        return size
+
+
+class CSVStream:
+    """
+    Incremental CSV reader over a binary upload stream.
+
+    The header is available from ``fieldnames`` before any rows are read, and
+    rows come out of ``chunks()`` in lists of ``chunk_rows`` dicts.
+    """
+
+    def __init__(self, stream, encoding: str = "utf-8", max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None, chunk_rows: int = CHUNK_ROWS):
+        self.raw = _CountingStream(stream, max_bytes=max_bytes)
+        self.text = io.TextIOWrapper(io.BufferedReader(self.raw), encoding=encoding, newline="")
+        self.reader = csv.DictReader(self.text)
+        self.max_rows = max_rows
+        self.chunk_rows = chunk_rows
+        self.rows_read = 0
+
+    @property
+    def fieldnames(self) -> Optional[List[str]]:
+        return self.reader.fieldnames
+
+    @property
+    def bytes_read(self) -> int:
+        return self.raw.bytes_read
+
+    def chunks(self) -> Iterator[List[dict]]:
+        chunk = []
+        for row in self.reader:
+            self.rows_read += 1
+            if self.max_rows and self.rows_read > self.max_rows:
+                raise UploadLimitExceeded(f"File exceeds the {self.max_rows} row upload limit")
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,641 @@
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+LEAD_COLUMNS = ["name", "role", "company", "industry", "location", "linkedin_bio"]
+
+# Columns with few distinct values, stored as integer codes into a shared vocabulary
+INTERNED_COLUMNS = ("role", "industry", "location")
+
+RESULT_FIELDS = ["name", "role", "company", "intent", "score", "reasoning"]
+
+# Fields of a result still waiting for its AI classification (a deadline-bounded run)
+PROVISIONAL_RESULT_FIELDS = RESULT_FIELDS + ["provisional"]
+
+# Identity fields for each lead de-duplication mode
+DEDUPE_MODES = {
+    "off": (),
+    "name_company": ("name", "company"),
+    "name_company_bio": ("name", "company", "linkedin_bio"),
+}
+
+# Orders accepted by result queries: row order, score ascending, score descending
+RESULT_SORTS = ("row", "score", "-score")
+
+
+def lead_fingerprint(lead: Mapping) -> int:
+    """64-bit fingerprint of the lead fields scoring reads, stable across processes"""
+    payload = "\x1f".join([repr(lead.get(field)) for field in LEAD_COLUMNS])
+    return int.from_bytes(hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# Identity of a lead whose identity fields are all blank: it is never a duplicate of anything
+NO_IDENTITY = 0
+
+
+def lead_identity(lead: Mapping, fields: Sequence[str]) -> int:
+    """
+    64-bit identity of a lead: the given fields with case and whitespace
+    normalised, or NO_IDENTITY when they are all blank.
+    """
+    values = [" ".join(str(lead.get(field) or "").split()).casefold() for field in fields]
+    if not any(values):
+        return NO_IDENTITY
+    identity = int.from_bytes(hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=8).digest(), "little")
+    # Keep NO_IDENTITY for blank leads only
+    return identity or 1
+
+
+class DedupeIndex:
+    """
+    First row of every lead identity, built row by row as leads are added.
+
+    ``canonical[row]`` is the row whose result a duplicate reuses (the row
+    itself for a first occurrence, or a lead with blank identity fields);
+    ``identities`` is what gets persisted.
+    """
+
+    __slots__ = ("fields", "identities", "canonical", "duplicates", "_first")
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = tuple(fields)
+        self.identities = array("Q")
+        self.canonical = array("I")
+        self.duplicates = 0
+        self._first = {}
+
+    @classmethod
+    def mapped(cls, fields: Sequence[str], identities: Sequence[int], canonical: Sequence[int],
+               duplicates: int) -> "DedupeIndex":
+        """Read-only index over existing columns, e.g. views into a snapshot file"""
+        index = cls(fields)
+        index.identities = identities
+        index.canonical = canonical
+        index.duplicates = duplicates
+        index._first = None
+        return index
+
+    @classmethod
+    def from_identities(cls, fields: Sequence[str], identities: Iterable[int]) -> "DedupeIndex":
+        index = cls(fields)
+        for identity in identities:
+            index._add_identity(identity)
+        return index
+
+    def add(self, lead: Mapping) -> int:
+        """Index the next row and return its canonical row"""
+        return self._add_identity(lead_identity(lead, self.fields))
+
+    def _add_identity(self, identity: int) -> int:
+        row = len(self.canonical)
+        first = self._first.setdefault(identity, row) if identity != NO_IDENTITY else row
+        if first != row:
+            self.duplicates += 1
+        self.identities.append(identity)
+        self.canonical.append(first)
+        return first
+
+    def __len__(self) -> int:
+        return len(self.canonical)
+
+
+class InternedColumn:
+    """Column of repeated values stored as uint32 codes into a vocabulary"""
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self):
+        self.codes = array("I")
+        self.values = []
+        self._index = {}
+
+    @classmethod
+    def mapped(cls, values: Sequence, codes: Sequence[int]) -> "InternedColumn":
+        """Read-only column over existing codes and vocabulary, e.g. views into a snapshot file"""
+        column = cls.__new__(cls)
+        column.codes = codes
+        column.values = values
+        column._index = None
+        return column
+
+    def code(self, value) -> int:
+        """Code of ``value``, adding it to the vocabulary if it is new"""
+        if self._index is None:
+            self._index = {value: code for code, value in enumerate(self.values)}
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self._index[value] = code
+            self.values.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self.code(value))
+
+    def extend_codes(self, values: Sequence, codes: Iterable[int]) -> None:
+        """Append rows given as codes into another vocabulary ``values``"""
+        mapping = [self.code(value) for value in values]
+        self.codes.extend(map(mapping.__getitem__, codes))
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        values = self.values
+        return (values[code] for code in self.codes)
+
+
+class LeadRow(Mapping):
+    """Read-only dict-like view of one row of a LeadStore"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def row_id(self):
+        return self._row
+
+    @property
+    def features(self):
+        """Feature bitmask stored at upload (see services.lead_features), None if the store keeps none"""
+        features = self._store.features
+        return None if features is None else features[self._row]
+
+    def get(self, field, default=None):
+        column = self._store._columns.get(field)
+        if column is None:
+            return default
+        return column[self._row]
+
+    def __getitem__(self, field):
+        return self._store._columns[field][self._row]
+
+    def __iter__(self):
+        return iter(self._store.fieldnames)
+
+    def __len__(self):
+        return len(self._store.fieldnames)
+
+    def __contains__(self, field):
+        return field in self._store._columns
+
+    def __repr__(self):
+        return f"LeadRow({self._row}, {dict(self)!r})"
+
+
+class LeadStore:
+    """
+    Columnar store of uploaded leads.
+
+    Each CSV column is one list (or an InternedColumn for low-cardinality
+    columns) instead of one dict per row. Rows are exposed as LeadRow views,
+    so code written against lead dicts (``lead.get("role")``) keeps working.
+    Values outside the header (csv.DictReader's restkey overflow) are dropped.
+    With ``dedupe_fields``, duplicates are indexed as rows are added (``dedupe``).
+    With ``featurize``, each lead's feature bitmask is computed once as it is
+    added and kept in ``features`` (a uint16 column) for the scorers.
+    """
+
+    def __init__(self, fieldnames: Optional[Sequence[str]] = None,
+                 interned: Iterable[str] = INTERNED_COLUMNS, dedupe_fields: Sequence[str] = (),
+                 featurize: Optional[Callable[[Mapping], int]] = None):
+        self.fieldnames = list(fieldnames or LEAD_COLUMNS)
+        interned = set(interned)
+        self._columns = {
+            field: InternedColumn() if field in interned else []
+            for field in self.fieldnames
+        }
+        self.dedupe = DedupeIndex(dedupe_fields) if dedupe_fields else None
+        self.featurize = featurize
+        self.features = array("H") if featurize is not None else None
+        self.read_only = False
+        self._size = 0
+
+    @classmethod
+    def from_columns(cls, fieldnames: Sequence[str], columns: dict, size: int,
+                     dedupe: Optional[DedupeIndex] = None, features: Optional[Sequence[int]] = None) -> "LeadStore":
+        """
+        Read-only store over existing columns (a sequence or InternedColumn per
+        field), e.g. views into a snapshot file. ``append`` raises on it.
+        """
+        store = cls(fieldnames, interned=())
+        store._columns = {field: columns[field] for field in store.fieldnames}
+        store.dedupe = dedupe
+        store.features = features
+        store.read_only = True
+        store._size = size
+        return store
+
+    def append(self, lead: Mapping) -> int:
+        """Add a lead and return its row id"""
+        if self.read_only:
+            raise TypeError("LeadStore is read-only")
+        for field, column in self._columns.items():
+            column.append(lead.get(field))
+        if self.dedupe is not None:
+            self.dedupe.add(lead)
+        if self.featurize is not None:
+            self.features.append(self.featurize(lead))
+        self._size += 1
+        return self._size - 1
+
+    def extend(self, leads: Iterable[Mapping]) -> None:
+        for lead in leads:
+            self.append(lead)
+
+    def raw_column(self, field: str):
+        """The list or InternedColumn backing a column (None if absent), for bulk readers; don't modify"""
+        return self._columns.get(field)
+
+    def column(self, field: str) -> Sequence:
+        """All values of one column, in row order"""
+        column = self._columns.get(field)
+        if column is None:
+            return [None] * self._size
+        return list(column) if isinstance(column, InternedColumn) else column
+
+    def factorize(self, field: str):
+        """
+        (distinct values, uint32 code per row) for a column. Free for interned
+        columns, one dict pass otherwise.
+        """
+        column = self._columns.get(field)
+        if isinstance(column, InternedColumn):
+            # Copies, so leads appended meanwhile can't resize a buffer numpy is reading
+            return list(column.values), array("I", column.codes)
+        interned = InternedColumn()
+        for value in self.column(field):
+            interned.append(value)
+        return interned.values, interned.codes
+
+    def to_dict(self, row: int) -> dict:
+        return dict(self[row])
+
+    def __getitem__(self, row: int) -> LeadRow:
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError("lead row out of range")
+        return LeadRow(self, row)
+
+    def __iter__(self) -> Iterator[LeadRow]:
+        for row in range(self._size):
+            yield LeadRow(self, row)
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class ResultRow(Mapping):
+    """Read-only dict-like view of one scored lead, joined with its LeadStore row"""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def get(self, field, default=None):
+        store = self._store
+        if field == "intent":
+            return store._intents[self._row]
+        if field == "score":
+            return store._scores[self._row]
+        if field == "reasoning":
+            return store._reasonings[self._row]
+        if field in ("name", "role", "company"):
+            return store.leads[store._lead_ids[self._row]].get(field, "")
+        if field == "provisional" and self._provisional():
+            return True
+        return default
+
+    def _provisional(self):
+        provisional = self._store.provisional
+        return provisional is not None and bool(provisional[self._row])
+
+    def _fields(self):
+        return PROVISIONAL_RESULT_FIELDS if self._provisional() else RESULT_FIELDS
+
+    def __getitem__(self, field):
+        if field not in self._fields():
+            raise KeyError(field)
+        return self.get(field)
+
+    def __iter__(self):
+        return iter(self._fields())
+
+    def __len__(self):
+        return len(self._fields())
+
+    def __repr__(self):
+        return f"ResultRow({self._row}, {dict(self)!r})"
+
+
+class ScoreInputs:
+    """
+    What a scoring run's results were computed from, for incremental rescoring.
+
+    The rule and AI parts each have an offer fingerprint; per result row there
+    is the lead fingerprint and its rule score (NO_RULE_SCORE if it failed).
+    """
+
+    __slots__ = ("rules_fingerprint", "ai_fingerprint", "fingerprints", "rule_scores")
+
+    NO_RULE_SCORE = 0xFFFF
+
+    def __init__(self, rules_fingerprint: Optional[str] = None, ai_fingerprint: Optional[str] = None):
+        self.rules_fingerprint = rules_fingerprint
+        self.ai_fingerprint = ai_fingerprint
+        self.fingerprints = array("Q")
+        self.rule_scores = array("H")
+
+    def append(self, fingerprint: int, rule_score: Optional[int]) -> None:
+        self.rule_scores.append(self.NO_RULE_SCORE if rule_score is None else rule_score)
+        self.fingerprints.append(fingerprint)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+
+class ResultIndex:
+    """
+    Query indexes over the first ``size`` rows of a score column, bucketed by
+    an interned column (the intent for a ResultStore, the best offer for a
+    ScoreMatrix).
+
+    Rows are kept sorted by score (descending, ties in row order) once for all
+    rows and once per bucket, next to the negated scores so a score range is
+    two bisects. Scores are small integers, so building is a counting sort:
+    one pass over the rows, then only the distinct scores are sorted. A query
+    then costs O(log n + k) for a page of k rows, except row order combined
+    with a score range, which sorts the m matching rows.
+    """
+
+    __slots__ = ("size", "_sorted", "_buckets")
+
+    def __init__(self, scores: Sequence[int], buckets: InternedColumn, size: int):
+        self.size = size
+        bucket_codes = buckets.codes
+        bucket_values = buckets.values
+        by_score = {}
+        by_bucket_score = {}
+        in_row_order = {}
+        for row in range(size):
+            score = scores[row]
+            code = bucket_codes[row]
+            by_score.setdefault(score, []).append(row)
+            by_bucket_score.setdefault((code, score), []).append(row)
+            in_row_order.setdefault(code, array("I")).append(row)
+        self._sorted = self._build(by_score.items())
+        self._buckets = {
+            bucket_values[code]: (
+                self._build((score, group) for (c, score), group in by_bucket_score.items() if c == code),
+                rows
+            )
+            for code, rows in in_row_order.items()
+        }
+
+    @classmethod
+    def from_parts(cls, size: int, sorted_rows: tuple, buckets: dict) -> "ResultIndex":
+        """An index rebuilt from ``parts()``, e.g. views into a snapshot file"""
+        index = cls.__new__(cls)
+        index.size = size
+        index._sorted = sorted_rows
+        index._buckets = buckets
+        return index
+
+    def parts(self) -> tuple:
+        """
+        (keys, rows) by score for all rows and {bucket: ((keys, rows), rows in
+        row order)}, the arrays a query reads; don't modify
+        """
+        return self._sorted, self._buckets
+
+    @staticmethod
+    def _build(groups):
+        """(negated scores, row ids) from (score, rows) groups, by score descending"""
+        keys = array("i")
+        rows = array("I")
+        for score, group in sorted(groups, reverse=True):
+            keys.extend([-score] * len(group))
+            rows.extend(group)
+        return keys, rows
+
+    def query(self, bucket: Optional[str] = None, min_score: Optional[int] = None,
+              max_score: Optional[int] = None, sort: str = "row", offset: int = 0,
+              limit: Optional[int] = None):
+        """(number of matching rows, row ids of the requested page)"""
+        if sort not in RESULT_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(RESULT_SORTS)}")
+        if bucket is None:
+            (keys, rows), row_order = self._sorted, None
+        elif bucket in self._buckets:
+            (keys, rows), row_order = self._buckets[bucket]
+        else:
+            return 0, []
+        ranged = min_score is not None or max_score is not None
+        lo = bisect_left(keys, -max_score) if max_score is not None else 0
+        hi = bisect_right(keys, -min_score) if min_score is not None else len(keys)
+        total = max(0, hi - lo)
+        stop = total if limit is None else min(total, offset + limit)
+        if offset >= stop:
+            return total, []
+
+        if sort == "-score":
+            return total, rows[lo + offset:lo + stop]
+        if sort == "score":
+            return total, rows[hi - stop:hi - offset][::-1]
+        if ranged:
+            return total, sorted(rows[lo:hi])[offset:stop]
+        if row_order is not None:
+            return total, row_order[offset:stop]
+        return total, range(offset, stop)
+
+
+class ResultStore:
+    """
+    Scoring results that reference lead row ids instead of copying lead fields.
+
+    name/role/company are read from ``leads`` on access; intent and reasoning
+    are interned since a run produces few distinct values of each. ``inputs``
+    records what each row was computed from. ``provisional`` (None unless a
+    run set it) flags rows holding a local score until ``update`` replaces it.
+    """
+
+    def __init__(self, leads: Optional[Sequence[Mapping]] = None):
+        self.leads = leads if leads is not None else []
+        self.inputs = ScoreInputs()
+        self.provisional = None
+        self._lead_ids = array("I")
+        self._intents = InternedColumn()
+        self._scores = array("H")
+        self._reasonings = InternedColumn()
+        self._index = None
+        # Counts update calls; an index built before the latest one is stale even at the same size
+        self._updates = 0
+        self._index_updates = 0
+
+    @classmethod
+    def from_columns(cls, leads: Sequence[Mapping], lead_ids: Sequence[int], intents: InternedColumn,
+                     scores: Sequence[int], reasonings: InternedColumn, inputs: ScoreInputs,
+                     index: Optional[ResultIndex] = None, provisional: Optional[Sequence[int]] = None) -> "ResultStore":
+        """Read-only store over existing columns (and optionally its query index), e.g. views into a snapshot file"""
+        store = cls(leads)
+        store.inputs = inputs
+        store.provisional = provisional
+        store._lead_ids = lead_ids
+        store._intents = intents
+        store._scores = scores
+        store._reasonings = reasonings
+        store._index = index
+        return store
+
+    def columns(self) -> tuple:
+        """The backing (lead_ids, intents, scores, reasonings) columns, for bulk writers; don't modify"""
+        return self._lead_ids, self._intents, self._scores, self._reasonings
+
+    def append(self, lead_id: int, intent: str, score: int, reasoning: str) -> int:
+        self._intents.append(intent)
+        self._scores.append(score)
+        self._reasonings.append(reasoning)
+        # Length follows _lead_ids, so append it last for readers on other threads
+        self._lead_ids.append(lead_id)
+        return len(self._lead_ids) - 1
+
+    def extend(self, results: Iterable[Mapping]) -> None:
+        """Add score_lead results, the n-th result belonging to lead row n"""
+        for result in results:
+            self.append(len(self._lead_ids), result["intent"], result["score"], result["reasoning"])
+
+    def extend_columns(self, intents: InternedColumn, scores: Sequence[int], reasonings: InternedColumn) -> None:
+        """Add a block of results for the next rows in column form, e.g. from a scoring worker process"""
+        start = len(self._lead_ids)
+        self._intents.extend_codes(intents.values, intents.codes)
+        self._scores.extend(scores)
+        self._reasonings.extend_codes(reasonings.values, reasonings.codes)
+        self._lead_ids.extend(range(start, start + len(scores)))
+
+    def update(self, updates: Iterable[tuple]) -> None:
+        """Replace rows in place from (row, intent, score, reasoning), clearing their provisional flag"""
+        for row, intent, score, reasoning in updates:
+            self._intents.codes[row] = self._intents.code(intent)
+            self._scores[row] = score
+            self._reasonings.codes[row] = self._reasonings.code(reasoning)
+            if self.provisional is not None:
+                self.provisional[row] = 0
+        self._updates += 1
+
+    def provisional_count(self) -> int:
+        return bytes(self.provisional).count(1) if self.provisional is not None else 0
+
+    def to_list(self) -> List[dict]:
+        return [dict(row) for row in self]
+
+    def index(self) -> ResultIndex:
+        """Query indexes, built on first use and again after rows were added or updated"""
+        index = self._index
+        updates = self._updates
+        if index is None or index.size != len(self) or self._index_updates != updates:
+            index = self._index = ResultIndex(self._scores, self._intents, len(self))
+            self._index_updates = updates
+        return index
+
+    def query(self, intent: Optional[str] = None, min_score: Optional[int] = None,
+              max_score: Optional[int] = None, sort: str = "row", offset: int = 0,
+              limit: Optional[int] = None):
+        """(number of matching results, list of the requested page's rows as dicts)"""
+        total, rows = self.index().query(intent, min_score, max_score, sort, offset, limit)
+        return total, [dict(ResultRow(self, row)) for row in rows]
+
+    def __getitem__(self, row: int) -> ResultRow:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("result row out of range")
+        return ResultRow(self, row)
+
+    def __iter__(self) -> Iterator[ResultRow]:
+        for row in range(len(self)):
+            yield ResultRow(self, row)
+
+    def __len__(self) -> int:
+        return len(self._lead_ids)
+
+
+class ScoreMatrix:
+    """
+    Final scores of every lead against several offers, stored row-major (lead × offer).
+
+    Each lead's best offer (the first listed on ties) and its score are kept as
+    columns, so best-offer queries use a ResultIndex bucketed by offer name.
+    """
+
+    def __init__(self, leads: Sequence[Mapping], offers: Sequence[str], scores: array, best: array,
+                 best_scores: array):
+        self.leads = leads
+        self.offers = list(offers)
+        self.scores = scores
+        self.best_scores = best_scores
+        self._best = InternedColumn()
+        for offer in self.offers:
+            self._best.code(offer)
+        self._best.codes = best
+        self._index = None
+
+    @property
+    def best(self) -> array:
+        """Position in ``offers`` of each lead's best offer"""
+        return self._best.codes
+
+    def offer_scores(self, offer: str) -> array:
+        """One offer's column of the matrix"""
+        return self.scores[self.offers.index(offer)::len(self.offers)]
+
+    def _row(self, row: int, lead: Mapping) -> dict:
+        width = len(self.offers)
+        return {
+            "name": lead.get("name", ""),
+            "role": lead.get("role", ""),
+            "company": lead.get("company", ""),
+            "scores": dict(zip(self.offers, self.scores[row * width:(row + 1) * width])),
+            "best_offer": self.offers[self._best.codes[row]],
+            "best_score": self.best_scores[row],
+        }
+
+    def __getitem__(self, row: int) -> dict:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("matrix row out of range")
+        return self._row(row, self.leads[row])
+
+    def __iter__(self) -> Iterator[dict]:
+        for row, lead in zip(range(len(self)), self.leads):
+            yield self._row(row, lead)
+
+    def to_list(self) -> List[dict]:
+        return list(self)
+
+    def index(self) -> ResultIndex:
+        """Best-score indexes bucketed by best offer, built on first use"""
+        if self._index is None:
+            self._index = ResultIndex(self.best_scores, self._best, len(self))
+        return self._index
+
+    def query(self, offer: Optional[str] = None, min_score: Optional[int] = None,
+              max_score: Optional[int] = None, sort: str = "row", offset: int = 0,
+              limit: Optional[int] = None):
+        """(number of leads matching, requested page) filtered and sorted by best offer and best score"""
+        total, rows = self.index().query(offer, min_score, max_score, sort, offset, limit)
+        return total, [self[row] for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.best_scores)
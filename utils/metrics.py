@@ -0,0 +1,325 @@
+"""
+Minimal Prometheus-style metrics with gunicorn multi-worker support.
+
+Without METRICS_DIR, values live in this process. With METRICS_DIR set, every
+process writes its values into its own memory-mapped file in that directory
+(one struct.pack_into per update, no syscalls), and /metrics in any worker
+sums the files of all workers, the same approach as prometheus_client's
+multiprocess mode. Files of exited workers are kept so counters never go back.
+"""
+
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Sequence, Tuple
+
+# -------------------------
+# Environment variables
+# -------------------------
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Shared directory for per-worker metric files; empty keeps metrics per process
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_HEADER = struct.Struct("<Q")
+_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_FILE_SIZE = 64 * 1024
+
+
+class MemoryValues:
+    """Metric values for a single process"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def observe(self, bucket_key: str, sum_key: str, count_key: str, value: float) -> None:
+        values = self._values
+        with self._lock:
+            values[bucket_key] = values.get(bucket_key, 0.0) + 1.0
+            values[sum_key] = values.get(sum_key, 0.0) + value
+            values[count_key] = values.get(count_key, 0.0) + 1.0
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def items(self) -> Iterable[Tuple[str, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class MmapValues:
+    """
+    Metric values in a memory-mapped file only this process writes to.
+
+    Layout: an 8-byte used-length header, then entries of
+    [uint32 key length][utf-8 key padded to 8 bytes][float64 value].
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets = {}
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(_INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if not exists:
+            _HEADER.pack_into(self._map, 0, _HEADER.size)
+        for key, _, offset in _read_entries(self._map):
+            self._offsets[key] = offset
+
+    def _offset(self, key: str) -> int:
+        offset = self._offsets.get(key)
+        if offset is not None:
+            return offset
+        encoded = key.encode("utf-8")
+        padded = len(encoded) + (-(_LENGTH.size + len(encoded)) % 8)
+        entry_size = _LENGTH.size + padded + _VALUE.size
+        used = _HEADER.unpack_from(self._map, 0)[0]
+        if used + entry_size > len(self._map):
+            self._grow(used + entry_size)
+        _LENGTH.pack_into(self._map, used, len(encoded))
+        self._map[used + _LENGTH.size:used + _LENGTH.size + len(encoded)] = encoded
+        offset = used + _LENGTH.size + padded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        # Publish the entry only after it is fully written
+        _HEADER.pack_into(self._map, 0, used + entry_size)
+        self._offsets[key] = offset
+        return offset
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def add(self, key: str, amount: float) -> None:
+        with self._lock:
+            offset = self._offset(key)
+            _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def observe(self, bucket_key: str, sum_key: str, count_key: str, value: float) -> None:
+        with self._lock:
+            for key, amount in ((bucket_key, 1.0), (sum_key, value), (count_key, 1.0)):
+                offset = self._offset(key)
+                _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            _VALUE.pack_into(self._map, self._offset(key), value)
+
+    def items(self) -> Iterable[Tuple[str, float]]:
+        with self._lock:
+            return [(key, value) for key, value, _ in _read_entries(self._map)]
+
+
+def _read_entries(buffer):
+    used = _HEADER.unpack_from(buffer, 0)[0]
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        key = bytes(buffer[position + _LENGTH.size:position + _LENGTH.size + length]).decode("utf-8")
+        padded = length + (-(_LENGTH.size + length) % 8)
+        offset = position + _LENGTH.size + padded
+        yield key, _VALUE.unpack_from(buffer, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+def _read_file(path: str) -> Iterable[Tuple[str, float]]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        return []
+    return [(key, value) for key, value, _ in _read_entries(data)]
+
+
+class Registry:
+    def __init__(self, directory: str = METRICS_DIR, enabled: bool = METRICS_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self._metrics = {}
+        self._values = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def values(self):
+        """This process's value store, reopened after a fork"""
+        if self._values is None or self._pid != os.getpid():
+            with self._lock:
+                if self._values is None or self._pid != os.getpid():
+                    if self.directory:
+                        os.makedirs(self.directory, exist_ok=True)
+                        path = os.path.join(self.directory, f"metrics_{os.getpid()}.db")
+                        self._values = MmapValues(path)
+                    else:
+                        self._values = MemoryValues()
+                    self._pid = os.getpid()
+        return self._values
+
+    def collect(self) -> Dict[str, float]:
+        """Sum of every series across all processes sharing the directory"""
+        totals = {}
+        if self.directory:
+            sources = [_read_file(path) for path in glob.glob(os.path.join(self.directory, "metrics_*.db"))]
+        else:
+            sources = [self.values().items()]
+        for source in sources:
+            for key, value in source:
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        totals = {}
+        for key, value in self.collect().items():
+            name, suffix, labels = json.loads(key)
+            totals.setdefault(name, []).append((suffix, labels, value))
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render(totals.get(name, [])))
+        return "\n".join(lines) + "\n"
+
+
+def _key(name: str, suffix: str, labels: Sequence[Tuple[str, str]]) -> str:
+    return json.dumps([name, suffix, list(labels)], separators=(",", ":"))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._keys = {}
+        self.registry.register(self)
+
+    def _labels(self, labels: dict) -> Tuple[Tuple[str, str], ...]:
+        return tuple((name, str(labels.get(name, ""))) for name in self.labelnames)
+
+    def _series_key(self, suffix: str, labels: dict) -> str:
+        # Serialising the key costs more than the update itself, so remember it per label set
+        cache_key = (suffix, *map(labels.get, self.labelnames))
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = self._keys[cache_key] = _key(self.name, suffix, self._labels(labels))
+        return key
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self, samples):
+        lines = self._header()
+        for suffix, labels, value in sorted(samples, key=lambda s: (s[1], s[0])):
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if self.registry.enabled:
+            self.registry.values().add(self._series_key("_total", labels), amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        if self.registry.enabled:
+            self.registry.values().set(self._series_key("", labels), value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if self.registry.enabled:
+            self.registry.values().add(self._series_key("", labels), amount)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        cache_key = tuple(map(labels.get, self.labelnames))
+        keys = self._keys.get(cache_key)
+        if keys is None:
+            label_pairs = self._labels(labels)
+            bounds = [repr(b) for b in self.buckets] + ["+Inf"]
+            keys = self._keys[cache_key] = (
+                [_key(self.name, "_bucket", label_pairs + (("le", bound),)) for bound in bounds],
+                _key(self.name, "_sum", label_pairs),
+                _key(self.name, "_count", label_pairs)
+            )
+        bucket_keys, sum_key, count_key = keys
+        # Buckets are stored non-cumulative and accumulated when rendered
+        self.registry.values().observe(bucket_keys[bisect.bisect_left(self.buckets, value)], sum_key, count_key, value)
+
+    def render(self, samples):
+        lines = self._header()
+        series = {}
+        for suffix, labels, value in samples:
+            labels = tuple(tuple(pair) for pair in labels)
+            if suffix == "_bucket":
+                base, bound = labels[:-1], labels[-1][1]
+                series.setdefault(base, {}).setdefault("buckets", {})[bound] = value
+            else:
+                series.setdefault(labels, {})[suffix] = value
+        for labels in sorted(series):
+            data = series[labels]
+            cumulative = 0.0
+            for bound in [repr(b) for b in self.buckets] + ["+Inf"]:
+                cumulative += data.get("buckets", {}).get(bound, 0.0)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels + (('le', bound),))} {_format_value(cumulative)}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(data.get('_sum', 0.0))}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(data.get('_count', 0.0))}")
+        return lines
+
+
+REGISTRY = Registry()
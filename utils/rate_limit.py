@@ -0,0 +1,120 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at ``rate`` tokens per second up to ``capacity``.
+
+    A rate of 0 disables the bucket: acquire() never waits.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens, sleeping until they are available. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        # A request bigger than the bucket would wait forever; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    self.waited_seconds += waited
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit for calls to a rate-limited service.
+
+    Each call holds a slot while in flight. Successful fast calls grow the
+    limit by about one per limit's worth of calls (additive increase); a
+    throttled (429) or slower-than-target call halves it (multiplicative
+    decrease), at most once per ``target_latency`` so one burst of 429s
+    doesn't collapse it to the minimum.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16,
+                 target_latency: float = 10.0, decrease_factor: float = 0.5, clock=time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self._clock = clock
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._in_flight = 0
+        self._last_decrease = None
+        self._cond = threading.Condition()
+        self.throttled = 0
+        self.slow = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, throttled: bool = False) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if throttled or latency > self.target_latency:
+                if throttled:
+                    self.throttled += 1
+                else:
+                    self.slow += 1
+                now = self._clock()
+                if self._last_decrease is None or now - self._last_decrease >= self.target_latency:
+                    self._limit = max(self.minimum, self._limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for one call; set ``outcome["throttled"]`` inside to report a 429"""
+        self.acquire()
+        outcome = {"throttled": False}
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException:
+            # Errors (timeouts, refused connections) back off just like a 429
+            outcome["throttled"] = True
+            raise
+        finally:
+            self.release(time.perf_counter() - started, throttled=outcome["throttled"])
+
+    def info(self) -> dict:
+        with self._cond:
+            return {
+                "concurrency_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "throttled": self.throttled,
+                "slow": self.slow
+            }
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, Iterator, Mapping, Optional, Tuple
+
+
+class GenerationCache:
+    """
+    Serialised response bodies for the current results generation.
+
+    Every entry belongs to one generation; the first lookup or store with a
+    newer generation drops them all, so nothing has to be invalidated
+    explicitly. Least recently used entries are evicted past ``max_entries``
+    or ``max_bytes``. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.generation = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _switch(self, generation):
+        if generation != self.generation:
+            self.generation = generation
+            self._entries.clear()
+            self._bytes = 0
+
+    def get(self, generation: str, key: Hashable) -> Optional[Tuple[bytes, Mapping]]:
+        """(body, headers) stored for ``key`` in this generation, or None"""
+        with self._lock:
+            self._switch(generation)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, generation: str, key: Hashable, body: bytes, headers: Optional[Mapping] = None) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                # Built from results that have been replaced since
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = (body, dict(headers or {}))
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def tee(self, generation: str, key: Hashable, chunks: Iterable[bytes],
+            headers: Optional[Mapping] = None) -> Iterator[bytes]:
+        """Pass a streamed body through, caching it once complete unless it outgrew max_bytes"""
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self.put(generation, key, b"".join(parts), headers)
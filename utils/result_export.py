@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Mapping, Sequence
+
+from utils.lead_store import RESULT_FIELDS
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "lead_scores.csv"),
+    "ndjson": ("application/x-ndjson", "lead_scores.ndjson"),
+}
+
+
+def iter_csv(results: Iterable[Mapping], fieldnames: Sequence[str] = RESULT_FIELDS,
+             chunk_rows: int = 1000) -> Iterator[bytes]:
+    """CSV export in chunks of ``chunk_rows`` rows, reusing one small buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    rows = 0
+    for result in results:
+        writer.writerow([result.get(field, "") for field in fieldnames])
+        rows += 1
+        if rows == chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(results: Iterable[Mapping], fieldnames: Sequence[str] = RESULT_FIELDS,
+                chunk_rows: int = 1000) -> Iterator[bytes]:
+    """One JSON object per line, in chunks of ``chunk_rows`` rows"""
+    lines = []
+    for result in results:
+        lines.append(json.dumps({field: result.get(field) for field in fieldnames}, ensure_ascii=False))
+        if len(lines) == chunk_rows:
+            lines.append("")
+            yield "\n".join(lines).encode("utf-8")
+            lines = []
+    if lines:
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into one gzip member, flushing a block per input chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        # Z_SYNC_FLUSH so the client gets data as it is produced, not when the buffer fills
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,147 @@
+import mmap
+import os
+import tempfile
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+from typing import Iterator, Optional
+
+from utils.lead_store import LEAD_COLUMNS, InternedColumn, LeadStore
+
+# tmpfs, so the mapped file never touches disk
+_SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def write_text(f, values: Sequence[Optional[str]]) -> tuple:
+    """
+    Write a text column at the file's position: UTF-8 bytes, uint64 end
+    offsets (8-byte aligned) and a null byte per row. Returns the three
+    offsets; raises TypeError for values that are not strings or None.
+    """
+    nulls = bytes(value is None for value in values)
+    encoded = [str.encode(value, "utf-8") if value is not None else b"" for value in values]
+    ends = array("Q", accumulate(map(len, encoded)))
+    data_at = f.tell()
+    f.write(b"".join(encoded))
+    # uint64 offsets must be 8-byte aligned in the mapping
+    f.write(b"\0" * (-f.tell() % 8))
+    ends_at = f.tell()
+    f.write(ends.tobytes())
+    nulls_at = f.tell()
+    f.write(nulls)
+    return data_at, ends_at, nulls_at
+
+
+class MappedText(Sequence):
+    """Read-only view of a column written by write_text, decoded a row at a time"""
+
+    __slots__ = ("_data", "_ends", "_nulls")
+
+    def __init__(self, data: memoryview, ends: memoryview, nulls: memoryview):
+        self._data = data
+        self._ends = ends
+        self._nulls = nulls
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if self._nulls[row]:
+            return None
+        return str(self._data[self._ends[row - 1] if row else 0:self._ends[row]], "utf-8")
+
+    def __len__(self) -> int:
+        return len(self._nulls)
+
+
+class SharedLeadColumns:
+    """
+    A LeadStore's lead columns written once to a memory-mapped file.
+
+    Worker processes map the file read-only (SharedLeadReader) and rebuild
+    only the rows they were handed, so leads are never pickled per task.
+    Interned columns are stored as their uint32 codes, with the vocabulary
+    in ``layout``; text columns as UTF-8 bytes, uint64 end offsets and a
+    null byte per row. Raises TypeError for text columns holding non-strings.
+    """
+
+    def __init__(self, leads: LeadStore, fields: Sequence[str] = LEAD_COLUMNS):
+        self.size = len(leads)
+        self.layout = {}
+        fd, self.path = tempfile.mkstemp(prefix="leads_", suffix=".cols", dir=_SHARED_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for field in fields:
+                    column = leads.raw_column(field)
+                    if column is None:
+                        continue
+                    if isinstance(column, InternedColumn):
+                        self.layout[field] = ("interned", list(column.values), f.tell())
+                        f.write(column.codes[:self.size].tobytes())
+                    else:
+                        self.layout[field] = ("text",) + write_text(f, column[:self.size])
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Remove the file; workers still mapping it keep their view until they drop it"""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class SharedLeadReader:
+    """Worker-side view of a SharedLeadColumns file"""
+
+    def __init__(self, path: str, layout: dict, size: int):
+        self.path = path
+        self.size = size
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+        view = memoryview(self._map) if self._map is not None else memoryview(b"")
+        # Every view must be released before the mapping can be closed
+        self._views = [view]
+        self._columns = []
+        for field, spec in layout.items():
+            if spec[0] == "interned":
+                _, values, codes_at = spec
+                codes = self._view(view, codes_at, 4 * size, "I")
+                self._columns.append((field, values, codes, None, None))
+            else:
+                _, data_at, ends_at, nulls_at = spec
+                self._columns.append((
+                    field, None, self._view(view, data_at, ends_at - data_at),
+                    self._view(view, ends_at, 8 * size, "Q"), self._view(view, nulls_at, size)
+                ))
+
+    def _view(self, view, start, length, fmt=None):
+        part = view[start:start + length]
+        self._views.append(part)
+        if fmt is not None:
+            part = part.cast(fmt)
+            self._views.append(part)
+        return part
+
+    def rows(self, start: int, stop: int) -> Iterator[dict]:
+        """Lead dicts for rows ``start`` to ``stop``"""
+        for row in range(start, stop):
+            lead = {}
+            for field, values, data, ends, nulls in self._columns:
+                if values is not None:
+                    lead[field] = values[data[row]]
+                elif nulls[row]:
+                    lead[field] = None
+                else:
+                    lead[field] = str(data[ends[row - 1] if row else 0:ends[row]], "utf-8")
+            yield lead
+
+    def close(self) -> None:
+        self._columns = []
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
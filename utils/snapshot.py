@@ -0,0 +1,308 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+
+from utils.lead_store import DedupeIndex, InternedColumn, LeadStore, ResultIndex, ResultStore, ScoreInputs
+from utils.metrics import Counter, Histogram
+from utils.shared_columns import MappedText, write_text
+
+# Ends every column file: footer length (uint64) + format tag
+_MAGIC = b"LEADSNP1"
+_TRAILER = struct.Struct("<Q8s")
+
+# Lead fields a results snapshot carries itself, so it never depends on which leads are stored
+_RESULT_LEAD_FIELDS = ("name", "role", "company")
+
+# Storage key -> file name; keys not listed (the matrix) are not snapshotted
+_FILES = {"offer": "offer.json", "offers": "offers.json", "leads": "leads.bin", "results": "results.bin"}
+
+SNAPSHOT_WRITES = Counter(
+    "storage_snapshot_writes", "Snapshot writes by storage key and outcome (ok or error)",
+    labelnames=("key", "outcome")
+)
+SNAPSHOT_WRITE_SECONDS = Histogram(
+    "storage_snapshot_write_seconds", "Time spent writing one storage key to the snapshot", labelnames=("key",)
+)
+SNAPSHOT_LOAD_SECONDS = Histogram("storage_snapshot_load_seconds", "Time spent mapping the snapshot at startup")
+
+
+class ColumnWriter:
+    """
+    Writes named columns to one file, then a JSON footer locating them.
+
+    Arrays are raw machine values, 8-byte aligned so they can be mapped and
+    cast in place; text is stored like SharedLeadColumns (write_text);
+    interned columns as uint32 codes plus their vocabulary as text.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._columns = {}
+
+    def _align(self):
+        self._f.write(b"\0" * (-self._f.tell() % 8))
+
+    def array(self, name: str, values: array) -> None:
+        self._align()
+        self._columns[name] = ("array", values.typecode, self._f.tell(), len(values))
+        self._f.write(values.tobytes())
+
+    def text(self, name: str, values) -> None:
+        self._align()
+        self._columns[name] = ("text", len(values)) + write_text(self._f, values)
+
+    def interned(self, name: str, column: InternedColumn, size: int) -> None:
+        self.array(f"{name}.codes", array("I", column.codes[:size]))
+        self.text(f"{name}.values", list(column.values))
+        self._columns[name] = ("interned",)
+
+    def finish(self, meta: dict) -> None:
+        footer = json.dumps({"meta": meta, "columns": self._columns}).encode("utf-8")
+        self._f.write(footer)
+        self._f.write(_TRAILER.pack(len(footer), _MAGIC))
+
+
+class ColumnFile:
+    """
+    Read side of a ColumnWriter file, memory-mapped. Columns are views into
+    the mapping, so opening costs the footer parse only; text is decoded per
+    row on access. The mapping lives as long as any column taken from it.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if len(view) < _TRAILER.size:
+            raise ValueError(f"{path} is not a snapshot file")
+        footer_size, magic = _TRAILER.unpack(view[-_TRAILER.size:])
+        if magic != _MAGIC or footer_size > len(view) - _TRAILER.size:
+            raise ValueError(f"{path} is not a snapshot file")
+        footer_at = len(view) - _TRAILER.size - footer_size
+        footer = json.loads(str(view[footer_at:footer_at + footer_size], "utf-8"))
+        self.meta = footer["meta"]
+        self._columns = footer["columns"]
+        self._view = view
+
+    def array(self, name: str) -> memoryview:
+        _, typecode, start, count = self._columns[name]
+        itemsize = array(typecode).itemsize
+        return self._view[start:start + count * itemsize].cast(typecode)
+
+    def text(self, name: str) -> MappedText:
+        _, count, data_at, ends_at, nulls_at = self._columns[name]
+        return MappedText(
+            self._view[data_at:ends_at], self._view[ends_at:ends_at + 8 * count].cast("Q"),
+            self._view[nulls_at:nulls_at + count]
+        )
+
+    def interned(self, name: str) -> InternedColumn:
+        return InternedColumn.mapped(self.text(f"{name}.values"), self.array(f"{name}.codes"))
+
+    def column(self, name: str):
+        """An array, text or interned column by name, whichever it was written as"""
+        kind = self._columns[name][0]
+        if kind == "interned":
+            return self.interned(name)
+        return self.text(name) if kind == "text" else self.array(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+
+def write_leads(f, leads: LeadStore) -> None:
+    """Write a LeadStore's columns, dedupe identities and features, every row of each"""
+    size = len(leads)
+    writer = ColumnWriter(f)
+    for field in leads.fieldnames:
+        column = leads.raw_column(field)
+        if isinstance(column, InternedColumn):
+            writer.interned(field, column, size)
+        else:
+            writer.text(field, column[:size])
+    meta = {"fieldnames": leads.fieldnames, "size": size, "dedupe_fields": None}
+    dedupe = leads.dedupe
+    if dedupe is not None:
+        meta["dedupe_fields"] = list(dedupe.fields)
+        meta["duplicates"] = dedupe.duplicates
+        writer.array("dedupe.identities", array("Q", dedupe.identities[:size]))
+        writer.array("dedupe.canonical", array("I", dedupe.canonical[:size]))
+    if leads.features is not None:
+        writer.array("features", array("H", leads.features[:size]))
+    writer.finish(meta)
+
+
+def read_leads(columns: ColumnFile) -> LeadStore:
+    """A read-only LeadStore over a write_leads file"""
+    meta = columns.meta
+    dedupe = None
+    if meta["dedupe_fields"] is not None:
+        dedupe = DedupeIndex.mapped(
+            meta["dedupe_fields"], columns.array("dedupe.identities"), columns.array("dedupe.canonical"),
+            meta["duplicates"]
+        )
+    features = columns.array("features") if "features" in columns else None
+    return LeadStore.from_columns(
+        meta["fieldnames"], {field: columns.column(field) for field in meta["fieldnames"]}, meta["size"],
+        dedupe=dedupe, features=features
+    )
+
+
+def write_results(f, results: ResultStore) -> None:
+    """Write a ResultStore's columns, its scoring inputs and the lead fields its rows show"""
+    size = len(results)
+    lead_ids, intents, scores, reasonings = results.columns()
+    writer = ColumnWriter(f)
+    writer.interned("intent", intents, size)
+    writer.array("score", array("H", scores[:size]))
+    writer.interned("reasoning", reasonings, size)
+    leads = [results.leads[lead_id] for lead_id in lead_ids[:size]]
+    for field in _RESULT_LEAD_FIELDS:
+        writer.text(field, [lead.get(field, "") for lead in leads])
+    if results.provisional is not None:
+        writer.array("provisional", array("B", results.provisional[:size]))
+
+    inputs = results.inputs
+    # Same order as ScoreInputs.append: the length follows fingerprints
+    recorded = len(inputs)
+    writer.array("inputs.fingerprints", array("Q", inputs.fingerprints[:recorded]))
+    writer.array("inputs.rule_scores", array("H", inputs.rule_scores[:recorded]))
+
+    # The query index too, so a restarted worker answers /results without rebuilding it
+    (keys, rows), buckets = results.index().parts()
+    writer.array("index.keys", array("i", keys))
+    writer.array("index.rows", array("I", rows))
+    for i, ((bucket_keys, bucket_rows), row_order) in enumerate(buckets.values()):
+        writer.array(f"index.{i}.keys", array("i", bucket_keys))
+        writer.array(f"index.{i}.rows", array("I", bucket_rows))
+        writer.array(f"index.{i}.row_order", array("I", row_order))
+    writer.finish({
+        "size": size, "rules_fingerprint": inputs.rules_fingerprint, "ai_fingerprint": inputs.ai_fingerprint,
+        "index_buckets": list(buckets)
+    })
+
+
+def read_results(columns: ColumnFile) -> ResultStore:
+    """A read-only ResultStore over a write_results file, its rows reading the lead fields stored with it"""
+    meta = columns.meta
+    size = meta["size"]
+    leads = LeadStore.from_columns(
+        _RESULT_LEAD_FIELDS, {field: columns.text(field) for field in _RESULT_LEAD_FIELDS}, size
+    )
+    inputs = ScoreInputs(meta["rules_fingerprint"], meta["ai_fingerprint"])
+    inputs.fingerprints = columns.array("inputs.fingerprints")
+    inputs.rule_scores = columns.array("inputs.rule_scores")
+    index = ResultIndex.from_parts(size, (columns.array("index.keys"), columns.array("index.rows")), {
+        bucket: (
+            (columns.array(f"index.{i}.keys"), columns.array(f"index.{i}.rows")),
+            columns.array(f"index.{i}.row_order")
+        )
+        for i, bucket in enumerate(meta["index_buckets"])
+    })
+    return ResultStore.from_columns(
+        leads, range(size), columns.interned("intent"), columns.array("score"),
+        columns.interned("reasoning"), inputs, index=index,
+        provisional=columns.array("provisional") if "provisional" in columns else None
+    )
+
+
+class Snapshot:
+    """
+    On-disk copy of MemoryStorage, one file per storage key.
+
+    ``save`` rewrites only the key that changed, but that key's file in full:
+    an append of a few leads rewrites every lead column, the dedupe and the
+    feature arrays, so a save costs time in proportion to the total rows, not
+    the batch. The new file goes to a temporary path that replaces the old
+    one, so a crash mid-write keeps the previous version and readers still
+    mapping the old file are unaffected. Leads and results use
+    the mapped column format above, so ``load`` returns read-only stores
+    backed by the files without decoding them; offers are small JSON files.
+    A key that fails to save has its file removed rather than left stale.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, _FILES[key])
+
+    def save(self, key: str, value) -> None:
+        """Write one storage key; errors are counted, never raised"""
+        if key not in _FILES:
+            return
+        started = time.perf_counter()
+        with self._lock:
+            try:
+                self._write(key, value)
+            except Exception:
+                SNAPSHOT_WRITES.inc(key=key, outcome="error")
+                self._remove(key)
+                return
+        SNAPSHOT_WRITES.inc(key=key, outcome="ok")
+        SNAPSHOT_WRITE_SECONDS.observe(time.perf_counter() - started, key=key)
+
+    def _write(self, key: str, value) -> None:
+        path = self.path(key)
+        if value is None or (key in ("leads", "results") and not isinstance(value, (LeadStore, ResultStore))):
+            self._remove(key)
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{key}_", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if key == "leads":
+                    write_leads(f, value)
+                elif key == "results":
+                    write_results(f, value)
+                else:
+                    f.write(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._sync_directory()
+
+    def _remove(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            return
+        self._sync_directory()
+
+    def _sync_directory(self) -> None:
+        """fsync the snapshot directory, so a rename or unlink in it survives a crash"""
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def load(self) -> dict:
+        """Every key with a readable file; unreadable files are skipped"""
+        started = time.perf_counter()
+        loaded = {}
+        for key in _FILES:
+            path = self.path(key)
+            if not os.path.exists(path):
+                continue
+            try:
+                if key == "leads":
+                    loaded[key] = read_leads(ColumnFile(path))
+                elif key == "results":
+                    loaded[key] = read_results(ColumnFile(path))
+                else:
+                    with open(path, "rb") as f:
+                        loaded[key] = json.loads(f.read().decode("utf-8"))
+            except (OSError, ValueError, KeyError, TypeError, struct.error):
+                continue
+        SNAPSHOT_LOAD_SECONDS.observe(time.perf_counter() - started)
+        return loaded
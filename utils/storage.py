@@ -1,5 +1,790 @@
-storage = {
-    "offer": None,
-    "leads": [],
-    "results": []
-}
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from array import array
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from utils.lead_store import (
+    LEAD_COLUMNS, RESULT_FIELDS, RESULT_SORTS, DedupeIndex, LeadStore, ResultStore, ScoreInputs, ScoreMatrix,
+    lead_identity
+)
+from utils.snapshot import Snapshot
+
+# -------------------------
+# Environment variables
+# -------------------------
+# "memory" keeps everything in this process; "sqlite" shares it between gunicorn workers
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").lower()
+STORAGE_PATH = os.getenv("STORAGE_PATH", "leads_storage.sqlite3")
+# Directory the memory backend snapshots to after every change and maps back in on startup; empty = off
+STORAGE_SNAPSHOT_DIR = os.getenv("STORAGE_SNAPSHOT_DIR", "")
+
+STORAGE_KEYS = ("offer", "offers", "leads", "results", "matrix")
+
+# Older uploads kept around so a scoring run still reading one isn't cut short
+KEEP_RECENT_UPLOADS = 2
+
+# Records of finished scoring jobs kept for GET /score/jobs/<id> from any worker
+KEEP_FINISHED_JOBS = 100
+FINISHED_JOB_STATUSES = ("completed", "cancelled", "failed")
+
+_READ_CHUNK = 1000
+
+# A result row's provisional flag, joined onto results r
+_PROVISIONAL_JOIN = "LEFT JOIN provisional_rows p ON p.run_id = r.run_id AND p.row_id = r.row_id "
+
+# ORDER BY per query sort, matching ResultIndex (ties in row order, reversed for ascending)
+_RESULT_ORDER = {"row": "r.row_id", "score": "r.score, r.row_id DESC", "-score": "r.score DESC, r.row_id"}
+
+
+def _check_append_columns(current_fieldnames, fieldnames):
+    if set(current_fieldnames) != set(fieldnames):
+        raise ValueError("Appended CSV must have the same columns as the current upload")
+
+
+def _result_dict(row) -> dict:
+    """A selected RESULT_FIELDS row plus its provisional flag, shaped like a ResultRow"""
+    result = dict(zip(RESULT_FIELDS, row))
+    if row[len(RESULT_FIELDS)]:
+        result["provisional"] = True
+    return result
+
+
+class MemoryStorage(dict):
+    """
+    In-process storage: a plain dict, one copy per worker process.
+
+    With ``snapshot_dir`` every change is also written to a Snapshot there,
+    and a new process starts from it: leads and results come back as
+    read-only stores mapped from the snapshot files. Each worker writes its
+    own state, so run a single worker (or use SQLite) to share one snapshot.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        super().__init__(offer=None, offers={}, leads=LeadStore(), results=ResultStore(), matrix=None)
+        # Distinguishes this process's generations from a previous run of the server
+        self._boot = os.urandom(4).hex()
+        self._results_generation = 0
+        # Serialises changes so the snapshot is written in the same order
+        self._write_lock = threading.Lock()
+        # Scoring job id -> [progress record, cancel requested], oldest first
+        self._jobs = OrderedDict()
+        self.snapshot = Snapshot(snapshot_dir) if snapshot_dir else None
+        if self.snapshot is not None:
+            self._restore(self.snapshot.load())
+
+    def _restore(self, values: dict) -> None:
+        """Set keys read from the snapshot without writing them back"""
+        for key, value in values.items():
+            super().__setitem__(key, value)
+            if key == "results":
+                self._results_generation += 1
+
+    def __setitem__(self, key, value):
+        with self._write_lock:
+            super().__setitem__(key, value)
+            if key == "results":
+                # Bumped after the new results are visible, never before
+                self._results_generation += 1
+            if self.snapshot is not None:
+                self.snapshot.save(key, value)
+
+    def results_generation(self) -> Optional[str]:
+        """Token that changes whenever new results are stored, None before the first run"""
+        if not self._results_generation:
+            return None
+        return f"{self._boot}-{self._results_generation}"
+
+    def put_offer(self, name: str, offer: dict) -> int:
+        """Store one offer by name, keeping the others; returns how many are stored"""
+        with self._write_lock:
+            # Copied, so a reader holding the previous dict never sees it change
+            offers = dict(dict.get(self, "offers") or {})
+            offers[name] = offer
+            super().__setitem__("offers", offers)
+            if self.snapshot is not None:
+                self.snapshot.save("offers", offers)
+        return len(offers)
+
+    def delete_offer(self, name: str) -> Optional[int]:
+        """Remove one offer by name; returns how many are left, None if it wasn't stored"""
+        with self._write_lock:
+            offers = dict(dict.get(self, "offers") or {})
+            if offers.pop(name, None) is None:
+                return None
+            super().__setitem__("offers", offers)
+            if self.snapshot is not None:
+                self.snapshot.save("offers", offers)
+        return len(offers)
+
+    def sync_job_record(self, job_id: str, record: dict) -> bool:
+        """Store a scoring job's progress record; returns whether a cancel was requested for it"""
+        with self._write_lock:
+            entry = self._jobs.pop(job_id, None)
+            cancel = entry is not None and entry[1]
+            self._jobs[job_id] = [record, cancel]
+            finished = [key for key, (other, _) in self._jobs.items() if other["status"] in FINISHED_JOB_STATUSES]
+            for key in finished[:max(0, len(finished) - KEEP_FINISHED_JOBS)]:
+                del self._jobs[key]
+        return cancel
+
+    def get_job_record(self, job_id: str) -> Optional[dict]:
+        entry = self._jobs.get(job_id)
+        return dict(entry[0]) if entry is not None else None
+
+    def request_job_cancel(self, job_id: str) -> bool:
+        """Ask the process running a job to cancel it; False if it is unknown or already finished"""
+        with self._write_lock:
+            entry = self._jobs.get(job_id)
+            if entry is None or entry[0]["status"] in FINISHED_JOB_STATUSES:
+                return False
+            entry[1] = True
+        return True
+
+    def update_results(self, results: ResultStore, updates, persist: bool = True) -> bool:
+        """
+        Apply ResultStore.update to ``results`` if it is still the stored run;
+        False (nothing changed) once newer results replaced it.
+
+        The snapshot is rewritten whole, so callers updating often pass
+        ``persist=False`` and persist only now and then. The query index is
+        rebuilt lazily, on the next query.
+        """
+        with self._write_lock:
+            if dict.get(self, "results") is not results:
+                return False
+            results.update(updates)
+            self._results_generation += 1
+            if persist and self.snapshot is not None:
+                self.snapshot.save("results", results)
+        return True
+
+    def append_leads(self, leads) -> int:
+        """Add leads to the current upload in place; returns the new total"""
+        current = self["leads"]
+        if not current:
+            self["leads"] = leads
+            return len(leads)
+        _check_append_columns(current.fieldnames, leads.fieldnames)
+        with self._write_lock:
+            current = self["leads"]
+            if current.read_only:
+                # Leads mapped from the snapshot can't grow, so they are copied first
+                current = _writable_copy(current, leads.featurize)
+                super().__setitem__("leads", current)
+            current.extend(leads)
+            if self.snapshot is not None:
+                # A full rewrite of leads.bin, base rows included
+                self.snapshot.save("leads", current)
+        return len(current)
+
+
+def _writable_copy(leads: LeadStore, featurize=None) -> LeadStore:
+    copy = LeadStore(
+        leads.fieldnames, dedupe_fields=leads.dedupe.fields if leads.dedupe is not None else (), featurize=featurize
+    )
+    copy.extend(leads)
+    return copy
+
+
+class SQLiteLeads:
+    """
+    Read-only view of one stored upload.
+
+    Uploads are only ever replaced or appended to, so the view (bounded by its
+    size when it was read) is a consistent snapshot even if another worker
+    changes the leads while it is being read.
+    """
+
+    def __init__(self, backend, upload_id, fieldnames, size):
+        self.backend = backend
+        self.upload_id = upload_id
+        self.fieldnames = fieldnames
+        self._size = size
+        self._dedupe = False
+
+    @property
+    def dedupe(self) -> Optional[DedupeIndex]:
+        """Duplicate index of the upload's first ``size`` rows, loaded on first use"""
+        if self._dedupe is False:
+            row = self.backend.connection().execute(
+                "SELECT fields, identities FROM lead_identities WHERE upload_id = ?", (self.upload_id,)
+            ).fetchone()
+            self._dedupe = None
+            if row is not None:
+                identities = array("Q")
+                identities.frombytes(row[1])
+                self._dedupe = DedupeIndex.from_identities(json.loads(row[0]), identities[:self._size])
+        return self._dedupe
+
+    def _to_dict(self, row):
+        lead = dict(zip(LEAD_COLUMNS, row[1:7]))
+        if row[7]:
+            lead.update(json.loads(row[7]))
+        return {field: lead.get(field) for field in self.fieldnames}
+
+    def __getitem__(self, row_id):
+        if row_id < 0:
+            row_id += self._size
+        if not 0 <= row_id < self._size:
+            raise IndexError("lead row out of range")
+        row = self.backend.connection().execute(
+            "SELECT row_id, name, role, company, industry, location, linkedin_bio, extra "
+            "FROM leads WHERE upload_id = ? AND row_id = ?",
+            (self.upload_id, row_id)
+        ).fetchone()
+        if row is None:
+            raise IndexError("lead row out of range")
+        return self._to_dict(row)
+
+    def __iter__(self) -> Iterator[dict]:
+        last = -1
+        db = self.backend.connection()
+        while True:
+            rows = db.execute(
+                "SELECT row_id, name, role, company, industry, location, linkedin_bio, extra "
+                "FROM leads WHERE upload_id = ? AND row_id > ? AND row_id < ? ORDER BY row_id LIMIT ?",
+                (self.upload_id, last, self._size, _READ_CHUNK)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_dict(row)
+            last = rows[-1][0]
+
+    def __len__(self):
+        return self._size
+
+
+class SQLiteResults:
+    """Read-only view of one stored scoring run, joined with its upload on read"""
+
+    def __init__(self, backend, run_id, size):
+        self.backend = backend
+        self.run_id = run_id
+        self._size = size
+        self._inputs = None
+
+    @property
+    def inputs(self) -> Optional[ScoreInputs]:
+        """Fingerprints the run was computed from, loaded on first use"""
+        if self._inputs is None:
+            row = self.backend.connection().execute(
+                "SELECT rules_fingerprint, ai_fingerprint, fingerprints, rule_scores "
+                "FROM run_inputs WHERE run_id = ?", (self.run_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            inputs = ScoreInputs(row[0], row[1])
+            inputs.fingerprints.frombytes(row[2])
+            inputs.rule_scores.frombytes(row[3])
+            self._inputs = inputs
+        return self._inputs
+
+    def __getitem__(self, row_id):
+        row = self.backend.connection().execute(
+            "SELECT r.intent, r.score, r.reasoning, p.row_id IS NOT NULL FROM results r "
+            f"{_PROVISIONAL_JOIN}WHERE r.run_id = ? AND r.row_id = ?",
+            (self.run_id, row_id)
+        ).fetchone()
+        if row is None:
+            raise IndexError("result row out of range")
+        result = dict(zip(("intent", "score", "reasoning"), row))
+        if row[3]:
+            result["provisional"] = True
+        return result
+
+    def __iter__(self) -> Iterator[dict]:
+        last = -1
+        db = self.backend.connection()
+        while True:
+            rows = db.execute(
+                "SELECT r.row_id, l.name, l.role, l.company, r.intent, r.score, r.reasoning, p.row_id IS NOT NULL "
+                "FROM results r JOIN runs ON runs.run_id = r.run_id "
+                "LEFT JOIN leads l ON l.upload_id = runs.upload_id AND l.row_id = r.lead_id "
+                f"{_PROVISIONAL_JOIN}WHERE r.run_id = ? AND r.row_id > ? ORDER BY r.row_id LIMIT ?",
+                (self.run_id, last, _READ_CHUNK)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _result_dict(row[1:])
+            last = rows[-1][0]
+
+    def query(self, intent=None, min_score=None, max_score=None, sort="row", offset=0, limit=None):
+        """Same as ResultStore.query, answered from the results table's score indexes"""
+        if sort not in RESULT_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(RESULT_SORTS)}")
+        where = ["r.run_id = ?"]
+        params = [self.run_id]
+        for clause, value in (("r.intent = ?", intent), ("r.score >= ?", min_score), ("r.score <= ?", max_score)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        where = " AND ".join(where)
+        db = self.backend.connection()
+        total = db.execute(f"SELECT COUNT(*) FROM results r WHERE {where}", params).fetchone()[0]
+        rows = db.execute(
+            "SELECT l.name, l.role, l.company, r.intent, r.score, r.reasoning, p.row_id IS NOT NULL "
+            "FROM results r JOIN runs ON runs.run_id = r.run_id "
+            "LEFT JOIN leads l ON l.upload_id = runs.upload_id AND l.row_id = r.lead_id "
+            f"{_PROVISIONAL_JOIN}WHERE {where} ORDER BY {_RESULT_ORDER[sort]} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset]
+        ).fetchall()
+        return total, [_result_dict(row) for row in rows]
+
+    def to_list(self):
+        return list(self)
+
+    def __len__(self):
+        return self._size
+
+
+class SQLiteStorage:
+    """
+    Storage shared by every process that opens the same SQLite file (WAL mode).
+
+    Behaves like the in-memory dict for the ``offer``, ``offers``, ``leads``,
+    ``results`` and ``matrix`` keys. Leads and results are read back as lazy views, so workers don't each
+    hold a full copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # ResultStore -> the run it was stored as, so update_results can find its rows
+        self._runs = weakref.WeakKeyDictionary()
+        db = self.connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS offers (name TEXT PRIMARY KEY, offer TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY, record TEXT NOT NULL, finished INTEGER NOT NULL,
+                cancel INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS uploads (
+                upload_id INTEGER PRIMARY KEY AUTOINCREMENT, fieldnames TEXT NOT NULL, size INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS leads (
+                upload_id INTEGER NOT NULL, row_id INTEGER NOT NULL,
+                name TEXT, role TEXT, company TEXT, industry TEXT, location TEXT, linkedin_bio TEXT, extra TEXT,
+                PRIMARY KEY (upload_id, row_id));
+            CREATE TABLE IF NOT EXISTS lead_identities (
+                upload_id INTEGER PRIMARY KEY, fields TEXT NOT NULL, identities BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT, upload_id INTEGER NOT NULL, size INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS results (
+                run_id INTEGER NOT NULL, row_id INTEGER NOT NULL, lead_id INTEGER NOT NULL,
+                intent TEXT, score INTEGER, reasoning TEXT,
+                PRIMARY KEY (run_id, row_id));
+            CREATE INDEX IF NOT EXISTS results_by_score ON results (run_id, score DESC, row_id);
+            CREATE INDEX IF NOT EXISTS results_by_intent ON results (run_id, intent, score DESC, row_id);
+            CREATE TABLE IF NOT EXISTS provisional_rows (
+                run_id INTEGER NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (run_id, row_id));
+            CREATE TABLE IF NOT EXISTS run_inputs (
+                run_id INTEGER PRIMARY KEY, rules_fingerprint TEXT, ai_fingerprint TEXT,
+                fingerprints BLOB, rule_scores BLOB);
+            CREATE TABLE IF NOT EXISTS matrices (
+                matrix_id INTEGER PRIMARY KEY AUTOINCREMENT, upload_id INTEGER NOT NULL, offers TEXT NOT NULL,
+                scores BLOB NOT NULL, best BLOB NOT NULL, best_scores BLOB NOT NULL);
+        """)
+        self._migrate_offers(db)
+
+    def _migrate_offers(self, db):
+        """Move offers stored as one kv value (older files) into their own rows"""
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            value = self._get_kv(db, "offers")
+            if value is not None:
+                self._replace_offers(db, json.loads(value))
+                db.execute("DELETE FROM kv WHERE key = 'offers'")
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after gunicorn forks
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _get_kv(self, db, key):
+        row = db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_kv(self, db, key, value):
+        db.execute("INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, value))
+
+    def _leads_view(self, db, upload_id):
+        row = db.execute(
+            "SELECT fieldnames, size FROM uploads WHERE upload_id = ?", (upload_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return SQLiteLeads(self, upload_id, json.loads(row[0]), row[1])
+
+    def _insert_upload(self, db, leads) -> int:
+        fieldnames = list(getattr(leads, "fieldnames", None) or LEAD_COLUMNS)
+        extra_fields = [field for field in fieldnames if field not in LEAD_COLUMNS]
+        upload_id = db.execute(
+            "INSERT INTO uploads (fieldnames, size) VALUES (?, ?)", (json.dumps(fieldnames), len(leads))
+        ).lastrowid
+        self._insert_leads(db, upload_id, leads, extra_fields, 0)
+        dedupe = getattr(leads, "dedupe", None)
+        if dedupe is not None:
+            db.execute(
+                "INSERT INTO lead_identities VALUES (?, ?, ?)",
+                (upload_id, json.dumps(dedupe.fields), dedupe.identities[:len(leads)].tobytes())
+            )
+        return upload_id
+
+    def _insert_leads(self, db, upload_id, leads, extra_fields, start):
+        rows = (
+            (upload_id, row_id) + tuple(lead.get(field) for field in LEAD_COLUMNS) + (
+                json.dumps({field: lead.get(field) for field in extra_fields}) if extra_fields else None,
+            )
+            for row_id, lead in enumerate(leads, start)
+        )
+        while True:
+            chunk = list(itertools.islice(rows, _READ_CHUNK))
+            if not chunk:
+                break
+            db.executemany("INSERT INTO leads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", chunk)
+
+    def append_leads(self, leads) -> int:
+        """
+        Add leads to the current upload in place; returns the new total.
+
+        Views read earlier keep their size, so they never see the new rows.
+        """
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            upload_id = self._get_kv(db, "leads_upload")
+            current = self._leads_view(db, int(upload_id)) if upload_id is not None else None
+            if current is None or not len(current):
+                self._set_kv(db, "leads_upload", str(self._insert_upload(db, leads)))
+                total = len(leads)
+            else:
+                _check_append_columns(current.fieldnames, getattr(leads, "fieldnames", None) or LEAD_COLUMNS)
+                extra_fields = [field for field in current.fieldnames if field not in LEAD_COLUMNS]
+                self._insert_leads(db, current.upload_id, leads, extra_fields, len(current))
+                total = len(current) + len(leads)
+                db.execute("UPDATE uploads SET size = ? WHERE upload_id = ?", (total, current.upload_id))
+                self._append_identities(db, current.upload_id, leads)
+            self._collect_garbage(db)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return total
+
+    def _append_identities(self, db, upload_id, leads):
+        """Extend the upload's duplicate index, keyed on the fields it was built with"""
+        row = db.execute(
+            "SELECT fields, identities FROM lead_identities WHERE upload_id = ?", (upload_id,)
+        ).fetchone()
+        if row is None:
+            return
+        fields = json.loads(row[0])
+        identities = array("Q", [lead_identity(lead, fields) for lead in leads])
+        db.execute(
+            "UPDATE lead_identities SET identities = ? WHERE upload_id = ?",
+            (row[1] + identities.tobytes(), upload_id)
+        )
+
+    def _collect_garbage(self, db):
+        """Drop uploads and runs no longer referenced by the current leads/results"""
+        run_id = self._get_kv(db, "results_run")
+        run_id = int(run_id) if run_id is not None else None
+        db.execute("DELETE FROM results WHERE run_id IS NOT ?", (run_id,))
+        db.execute("DELETE FROM runs WHERE run_id IS NOT ?", (run_id,))
+        db.execute("DELETE FROM run_inputs WHERE run_id IS NOT ?", (run_id,))
+        db.execute("DELETE FROM provisional_rows WHERE run_id IS NOT ?", (run_id,))
+        matrix_id = self._get_kv(db, "matrix")
+        db.execute("DELETE FROM matrices WHERE matrix_id IS NOT ?", (int(matrix_id) if matrix_id else None,))
+        keep = [self._get_kv(db, "leads_upload")]
+        keep += [row[0] for row in db.execute("SELECT upload_id FROM runs")]
+        keep += [row[0] for row in db.execute("SELECT upload_id FROM matrices")]
+        keep += [row[0] for row in db.execute(
+            "SELECT upload_id FROM uploads ORDER BY upload_id DESC LIMIT ?", (KEEP_RECENT_UPLOADS,)
+        )]
+        keep = [int(upload_id) for upload_id in keep if upload_id is not None] or [-1]
+        marks = ",".join("?" * len(keep))
+        db.execute(f"DELETE FROM leads WHERE upload_id NOT IN ({marks})", keep)
+        db.execute(f"DELETE FROM lead_identities WHERE upload_id NOT IN ({marks})", keep)
+        db.execute(f"DELETE FROM uploads WHERE upload_id NOT IN ({marks})", keep)
+
+    def __getitem__(self, key):
+        if key not in STORAGE_KEYS:
+            raise KeyError(key)
+        db = self.connection()
+        # Read the pointer and what it points to from one snapshot
+        db.execute("BEGIN")
+        try:
+            return self._read(db, key)
+        finally:
+            db.execute("COMMIT")
+
+    def _read(self, db, key):
+        if key == "offer":
+            value = self._get_kv(db, "offer")
+            return json.loads(value) if value is not None else None
+        if key == "offers":
+            # rowid keeps insertion order, like the in-memory dict
+            rows = db.execute("SELECT name, offer FROM offers ORDER BY rowid")
+            return {name: json.loads(offer) for name, offer in rows}
+        if key == "matrix":
+            matrix_id = self._get_kv(db, "matrix")
+            return self._read_matrix(db, int(matrix_id)) if matrix_id is not None else None
+        if key == "leads":
+            upload_id = self._get_kv(db, "leads_upload")
+            view = self._leads_view(db, int(upload_id)) if upload_id is not None else None
+            return view if view is not None else LeadStore()
+        if key == "results":
+            run_id = self._get_kv(db, "results_run")
+            row = db.execute("SELECT size FROM runs WHERE run_id = ?", (run_id,)).fetchone() if run_id else None
+            return SQLiteResults(self, int(run_id), row[0]) if row else ResultStore()
+
+    def __setitem__(self, key, value):
+        if key not in STORAGE_KEYS:
+            raise KeyError(key)
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if key == "offer":
+                self._set_kv(db, key, json.dumps(value))
+            elif key == "offers":
+                self._replace_offers(db, value or {})
+            elif key == "matrix" and value is None:
+                db.execute("DELETE FROM kv WHERE key = 'matrix'")
+            elif key == "matrix":
+                self._set_kv(db, "matrix", str(self._insert_matrix(db, value)))
+            elif key == "leads":
+                self._set_kv(db, "leads_upload", str(self._insert_upload(db, value)))
+            else:
+                run_id = self._insert_run(db, value)
+                self._set_kv(db, "results_run", str(run_id))
+                if isinstance(value, ResultStore):
+                    self._runs[value] = run_id
+            self._collect_garbage(db)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def _replace_offers(self, db, offers):
+        db.execute("DELETE FROM offers")
+        rows = ((name, json.dumps(offer)) for name, offer in offers.items())
+        db.executemany("INSERT INTO offers VALUES (?, ?)", rows)
+
+    def put_offer(self, name: str, offer: dict) -> int:
+        """Store one offer by name, keeping the others and its own place; returns how many are stored"""
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO offers VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET offer = excluded.offer",
+                (name, json.dumps(offer))
+            )
+            count = db.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return count
+
+    def delete_offer(self, name: str) -> Optional[int]:
+        """Remove one offer by name; returns how many are left, None if it wasn't stored"""
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = db.execute("DELETE FROM offers WHERE name = ?", (name,)).rowcount
+            count = db.execute("SELECT COUNT(*) FROM offers").fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return count if deleted else None
+
+    def sync_job_record(self, job_id: str, record: dict) -> bool:
+        """Store a scoring job's progress record; returns whether a cancel was requested for it"""
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT INTO jobs (job_id, record, finished, updated) VALUES (?, ?, ?, ?) ON CONFLICT (job_id) "
+                "DO UPDATE SET record = excluded.record, finished = excluded.finished, updated = excluded.updated",
+                (job_id, json.dumps(record), record["status"] in FINISHED_JOB_STATUSES, time.time())
+            )
+            cancel = db.execute("SELECT cancel FROM jobs WHERE job_id = ?", (job_id,)).fetchone()[0]
+            db.execute(
+                "DELETE FROM jobs WHERE finished AND job_id NOT IN "
+                "(SELECT job_id FROM jobs WHERE finished ORDER BY updated DESC, rowid DESC LIMIT ?)",
+                (KEEP_FINISHED_JOBS,)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return bool(cancel)
+
+    def get_job_record(self, job_id: str) -> Optional[dict]:
+        row = self.connection().execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def request_job_cancel(self, job_id: str) -> bool:
+        """Ask the process running a job to cancel it; False if it is unknown or already finished"""
+        cursor = self.connection().execute("UPDATE jobs SET cancel = 1 WHERE job_id = ? AND NOT finished", (job_id,))
+        return cursor.rowcount > 0
+
+    def _upload_for(self, db, leads) -> int:
+        if isinstance(leads, SQLiteLeads) and leads.backend is self:
+            return leads.upload_id
+        # Scored over leads this backend hasn't seen (e.g. restored in memory)
+        return self._insert_upload(db, leads if leads is not None else [])
+
+    def _insert_matrix(self, db, matrix) -> int:
+        return db.execute(
+            "INSERT INTO matrices (upload_id, offers, scores, best, best_scores) VALUES (?, ?, ?, ?, ?)",
+            (self._upload_for(db, matrix.leads), json.dumps(matrix.offers), matrix.scores.tobytes(),
+             matrix.best.tobytes(), matrix.best_scores.tobytes())
+        ).lastrowid
+
+    def _read_matrix(self, db, matrix_id) -> Optional[ScoreMatrix]:
+        row = db.execute(
+            "SELECT upload_id, offers, scores, best, best_scores FROM matrices WHERE matrix_id = ?", (matrix_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        columns = [array(typecode) for typecode in ("B", "I", "H")]
+        for column, data in zip(columns, row[2:]):
+            column.frombytes(data)
+        return ScoreMatrix(self._leads_view(db, row[0]), json.loads(row[1]), *columns)
+
+    def _insert_run(self, db, results) -> int:
+        upload_id = self._upload_for(db, getattr(results, "leads", None))
+        run_id = db.execute(
+            "INSERT INTO runs (upload_id, size) VALUES (?, ?)", (upload_id, len(results))
+        ).lastrowid
+        lead_ids = getattr(results, "_lead_ids", None)
+        rows = (
+            (run_id, row_id, lead_ids[row_id] if lead_ids is not None else row_id,
+             result["intent"], result["score"], result["reasoning"])
+            for row_id, result in enumerate(results)
+        )
+        while True:
+            chunk = list(itertools.islice(rows, _READ_CHUNK))
+            if not chunk:
+                break
+            db.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)", chunk)
+
+        provisional = getattr(results, "provisional", None)
+        if provisional is not None:
+            db.executemany(
+                "INSERT INTO provisional_rows VALUES (?, ?)",
+                ((run_id, row_id) for row_id in range(len(results)) if provisional[row_id])
+            )
+        self._write_inputs(db, run_id, results)
+        return run_id
+
+    def _write_inputs(self, db, run_id, results):
+        inputs = getattr(results, "inputs", None)
+        # One length for both columns: a running job may still be appending to them
+        recorded = min(len(inputs), len(results)) if inputs is not None else 0
+        if recorded:
+            db.execute(
+                "INSERT INTO run_inputs VALUES (?, ?, ?, ?, ?)",
+                (run_id, inputs.rules_fingerprint, inputs.ai_fingerprint,
+                 inputs.fingerprints[:recorded].tobytes(), inputs.rule_scores[:recorded].tobytes())
+            )
+
+    def _append_inputs(self, db, run_id, results):
+        """Add the inputs a running job recorded since the run's were last written"""
+        inputs = getattr(results, "inputs", None)
+        if inputs is None:
+            return
+        row = db.execute("SELECT length(fingerprints) / 8 FROM run_inputs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            self._write_inputs(db, run_id, results)
+            return
+        stored, recorded = row[0], min(len(inputs), len(results))
+        if recorded > stored:
+            # || yields text; cast back, the bytes are kept as they are
+            db.execute(
+                "UPDATE run_inputs SET fingerprints = CAST(fingerprints || ? AS BLOB), "
+                "rule_scores = CAST(rule_scores || ? AS BLOB) WHERE run_id = ?",
+                (inputs.fingerprints[stored:recorded].tobytes(), inputs.rule_scores[stored:recorded].tobytes(), run_id)
+            )
+
+    def update_results(self, results: ResultStore, updates, persist: bool = True) -> bool:
+        """
+        Rewrite rows of the run ``results`` was stored as, from (row, intent,
+        score, reasoning), and clear their provisional flag; False (nothing
+        changed) once newer results replaced that run. Every call is durable,
+        so ``persist`` is ignored.
+        """
+        updates = list(updates)
+        run_id = self._runs.get(results)
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if run_id is None or self._get_kv(db, "results_run") != str(run_id):
+                db.execute("ROLLBACK")
+                return False
+            db.executemany(
+                "UPDATE results SET intent = ?, score = ?, reasoning = ? WHERE run_id = ? AND row_id = ?",
+                ((intent, score, reasoning, run_id, row) for row, intent, score, reasoning in updates)
+            )
+            db.executemany(
+                "DELETE FROM provisional_rows WHERE run_id = ? AND row_id = ?",
+                ((run_id, row) for row, _, _, _ in updates)
+            )
+            # The rows' inputs were recorded as they were scored
+            self._append_inputs(db, run_id, results)
+            version = self._get_kv(db, "results_version")
+            self._set_kv(db, "results_version", str(int(version or 0) + 1))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        results.update(updates)
+        return True
+
+    def results_generation(self) -> Optional[str]:
+        """Token that changes whenever results are stored or updated, None before the first run"""
+        kv = dict(self.connection().execute(
+            "SELECT key, value FROM kv WHERE key IN ('results_run', 'results_version')"
+        ).fetchall())
+        run_id = kv.get("results_run")
+        if run_id is None:
+            return None
+        version = kv.get("results_version")
+        return f"run{run_id}" if version is None else f"run{run_id}.{version}"
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def create_storage(backend: str = STORAGE_BACKEND, path: Optional[str] = STORAGE_PATH,
+                   snapshot_dir: Optional[str] = STORAGE_SNAPSHOT_DIR):
+    if backend == "memory":
+        return MemoryStorage(snapshot_dir or None)
+    if backend == "sqlite":
+        return SQLiteStorage(path)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_storage()